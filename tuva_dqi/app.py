@@ -2,10 +2,13 @@ import os
 
 import dash
 import dash_bootstrap_components as dbc
+import flask
 from dash import Dash, html
 
 from db import init_db
 from pages.components import get_footer_component, get_navbar_component
+from services.cache import cache_stats
+from services.job_service import schedule_vacuum_job, submit_backfill_job
 
 app = Dash(
     __name__,
@@ -44,9 +47,18 @@ def toggle_navbar_collapse(n, is_open):
 
 server = app.server  # Expose Flask server for gunicorn
 
+
+# Query cache counters for the worker that serves the request
+@server.route("/cache-stats")
+def get_cache_stats():
+    return flask.jsonify(cache_stats())
+
+
 if __name__ == "__main__":
     # Get port from environment variable or use 8080 as default
     init_db()
+    submit_backfill_job()
+    schedule_vacuum_job()
     port = int(os.environ.get("PORT", 8080))
     dev_flag = int(os.environ.get("DEV_FLAG", 0))
     app.run(host="0.0.0.0", port=port, debug=(dev_flag == 1))
@@ -0,0 +1,75 @@
+"""Compare the legacy row-by-row upload insert with the streaming upload path.
+
+Both loaders get the same encoded CSV upload. Run from the ``tuva_dqi``
+directory::
+
+    python -m benchmarks.bench_ingest --rows 500000
+"""
+
+import argparse
+import base64
+import io
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import encode_upload, make_test_results
+from db import close_db_connections, get_db_connection, init_db
+from services.ingest_service import create_staging_table, ingest_upload
+
+
+def legacy_insert(conn, contents) -> float:
+    """Load the upload the way the upload callback used to, one execute per row.
+
+    The live table now carries the summary counter triggers the upload
+    callback never had, so the rows go into a trigger-free staging copy.
+    """
+    table_name = create_staging_table(conn, "test_results")
+    start = time.perf_counter()
+    decoded = base64.b64decode(contents.split(",")[1])
+    df = pd.read_csv(io.StringIO(decoded.decode("utf-8")))
+    df.columns = [col.upper() for col in df.columns]
+    schema_columns = [
+        row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")
+    ]
+    valid_columns = [col for col in df.columns if col in schema_columns]
+    cursor = conn.cursor()
+    for _, row in df[valid_columns].iterrows():
+        columns = ", ".join(valid_columns)
+        placeholders = ", ".join(["?"] * len(valid_columns))
+        sql = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+        cursor.execute(sql, tuple(row[valid_columns]))
+    conn.commit()
+    return time.perf_counter() - start
+
+
+def upload_insert(conn, contents) -> float:
+    """Load the upload through ingest_upload, as an upload job does."""
+    return ingest_upload(conn, contents)["seconds"]
+
+
+def run(rows: int) -> None:
+    contents = encode_upload(make_test_results(rows))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        timings = {}
+        for name, loader in [("legacy", legacy_insert), ("upload", upload_insert)]:
+            db_path = os.path.join(tmp_dir, f"{name}.db")
+            init_db(db_path)
+            conn = get_db_connection(db_path)
+            timings[name] = loader(conn, contents)
+            close_db_connections()
+            print(
+                f"{name:>8}: {timings[name]:8.2f} s "
+                f"({int(rows / timings[name]):,} rows/sec)"
+            )
+
+    print(f" speedup: {timings['legacy'] / timings['upload']:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    run(parser.parse_args().rows)
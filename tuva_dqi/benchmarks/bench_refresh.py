@@ -0,0 +1,79 @@
+"""Compare dashboard refresh latency with fresh and managed SQLite connections.
+
+Run from the ``tuva_dqi`` directory::
+
+    python -m benchmarks.bench_refresh --rows 50000 --refreshes 20
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from benchmarks.synthetic import encode_upload, make_test_results
+from db import close_db_connections, get_db_connection, init_db
+from services import dqi_service
+from services.cache import clear_cache
+from services.ingest_service import ingest_upload
+
+
+def fresh_connection(db_file_name="app_data.db", read_only=False):
+    """Open a new connection per call, the way get_db_connection used to."""
+    conn = sqlite3.connect(db_file_name)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def refresh() -> float:
+    """Run the service calls one analytics page refresh makes, uncached."""
+    clear_cache()
+    start = time.perf_counter()
+    dqi_service.get_data_from_test_results(limit=10)
+    dqi_service.get_data_quality_grade()
+    dqi_service.get_tests_completed_count()
+    dqi_service.get_last_test_run_time()
+    dqi_service.get_mart_statuses()
+    dqi_service.get_outstanding_errors()
+    dqi_service.get_available_charts()
+    dqi_service.get_data_availability()
+    return time.perf_counter() - start
+
+
+def run(rows: int, refreshes: int) -> None:
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # The service functions open app_data.db in the working directory
+        os.chdir(tmp_dir)
+        try:
+            init_db()
+            ingest_upload(get_db_connection(), encode_upload(make_test_results(rows)))
+
+            variants = {"fresh": fresh_connection, "managed": get_db_connection}
+            samples = {name: [] for name in variants}
+            # Alternate the variants so drift in machine load affects both alike
+            for i in range(refreshes + 1):
+                for name, connect in variants.items():
+                    dqi_service.get_db_connection = connect
+                    seconds = refresh()
+                    if i > 0:  # The first round only warms up the page cache
+                        samples[name].append(seconds)
+
+            timings = {name: statistics.median(samples[name]) for name in variants}
+            for name, seconds in timings.items():
+                print(f"{name:>8}: {seconds * 1000:8.1f} ms per refresh")
+        finally:
+            dqi_service.get_db_connection = get_db_connection
+            close_db_connections()
+            os.chdir(cwd)
+
+    print(f" speedup: {timings['fresh'] / timings['managed']:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--refreshes", type=int, default=20)
+    args = parser.parse_args()
+    run(args.rows, args.refreshes)
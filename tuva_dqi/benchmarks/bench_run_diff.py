@@ -0,0 +1,62 @@
+"""Time a run-over-run diff between two nightly runs of synthetic test results.
+
+Run from the ``tuva_dqi`` directory::
+
+    python -m benchmarks.bench_run_diff --rows 200000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import encode_upload, make_test_results
+from db import close_db_connections, get_db_connection, init_db
+from services.history_service import diff_runs
+from services.ingest_service import ingest_upload
+
+
+def run(rows: int, changed_fraction: float) -> None:
+    base = make_test_results(rows)
+    # The next night: a small share of tests flip status and change failure counts
+    target = base.copy()
+    rng = np.random.default_rng(1)
+    changed = rng.random(rows) < changed_fraction
+    target.loc[changed, "STATUS"] = np.where(
+        target.loc[changed, "STATUS"] == "pass", "fail", "pass"
+    )
+    target.loc[changed, "FAILURES"] += 1
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # The service functions open app_data.db in the working directory
+        os.chdir(tmp_dir)
+        try:
+            init_db()
+            conn = get_db_connection()
+            # Each upload records its run in the history
+            run_ids = [
+                ingest_upload(conn, encode_upload(df))["run_id"]
+                for df in (base, target)
+            ]
+
+            start = time.perf_counter()
+            diff = diff_runs(*run_ids)
+            seconds = time.perf_counter() - start
+        finally:
+            close_db_connections()
+            os.chdir(cwd)
+
+    for category, df in diff.items():
+        print(f"{category:>17}: {len(df):,} tests")
+    print(f"{'diff':>17}: {seconds:.3f} s for {rows:,} tests per run")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--changed", type=float, default=0.02)
+    args = parser.parse_args()
+    run(args.rows, args.changed)
@@ -0,0 +1,70 @@
+"""Time faceted test searches over synthetic test results.
+
+Run from the ``tuva_dqi`` directory::
+
+    python -m benchmarks.bench_search --rows 500000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.synthetic import encode_upload, make_test_results
+from db import close_db_connections, get_db_connection, init_db
+from services.cache import clear_cache
+from services.ingest_service import ingest_upload
+from services.search_service import search_tests
+
+# Searches a user narrows down step by step, each one round-trip
+SEARCHES = {
+    "everything": {},
+    "failing": {"status": "failing"},
+    "severity 1-2": {"selections": (("SEVERITY_LEVEL", (1, 2)),)},
+    "one mart": {"selections": (("MART", ("CCSR",)),)},
+    "mart + category": {
+        "selections": (("MART", ("CCSR",)), ("TEST_CATEGORY", ("validity",)))
+    },
+    "one table": {"selections": (("TABLE_NAME", ("table_7",)),)},
+    "failing, sorted": {
+        "status": "failing",
+        "selections": (("QUALITY_DIMENSION", ("completeness",)),),
+        "sort_by": (("TABLE_NAME", "asc"),),
+        "page": 50,
+    },
+}
+
+
+def run(rows: int, repeats: int) -> None:
+    contents = encode_upload(make_test_results(rows))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # The service functions open app_data.db in the working directory
+        os.chdir(tmp_dir)
+        try:
+            init_db()
+            ingest_upload(get_db_connection(), contents)
+
+            for name, kwargs in SEARCHES.items():
+                samples = []
+                for _ in range(repeats):
+                    clear_cache()
+                    start = time.perf_counter()
+                    result = search_tests(**kwargs)
+                    samples.append(time.perf_counter() - start)
+                print(
+                    f"{name:>16}: {statistics.median(samples) * 1000:7.1f} ms "
+                    f"for {result['total']:,} matching tests"
+                )
+        finally:
+            close_db_connections()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.repeats)
@@ -0,0 +1,66 @@
+"""Compare peak Python memory of whole-file and streaming upload parsing.
+
+Run from the ``tuva_dqi`` directory::
+
+    python -m benchmarks.bench_upload_memory --rows 50000 200000
+"""
+
+import argparse
+import base64
+import io
+import os
+import tempfile
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import encode_upload, make_test_results
+from db import close_db_connections, get_db_connection, init_db
+from services.ingest_service import ingest_upload, replace_table_data
+
+
+def whole_file_ingest(conn, contents) -> None:
+    """Parse the upload the way the callback used to, in one DataFrame."""
+    decoded = base64.b64decode(contents.split(",")[1])
+    df = pd.read_csv(io.StringIO(decoded.decode("utf-8")))
+    df.columns = [col.upper() for col in df.columns]
+    replace_table_data(conn, "test_results", df)
+
+
+def streaming_ingest(conn, contents) -> None:
+    ingest_upload(conn, contents)
+
+
+def measure(loader, contents, db_path) -> float:
+    """Return the peak traced memory in MB while loading ``contents``."""
+    init_db(db_path)
+    conn = get_db_connection(db_path)
+    tracemalloc.start()
+    loader(conn, contents)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    close_db_connections()
+    return peak / 1024 / 1024
+
+
+def run(row_counts: list) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in row_counts:
+            contents = encode_upload(make_test_results(rows))
+            upload_mb = len(contents) / 1024 / 1024
+            for name, loader in [
+                ("whole-file", whole_file_ingest),
+                ("streaming", streaming_ingest),
+            ]:
+                db_path = os.path.join(tmp_dir, f"{name}-{rows}.db")
+                peak = measure(loader, contents, db_path)
+                print(
+                    f"{rows:>9,} rows ({upload_mb:7.1f} MB upload) "
+                    f"{name:>10}: peak {peak:8.1f} MB"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[50_000, 200_000])
+    run(parser.parse_args().rows)
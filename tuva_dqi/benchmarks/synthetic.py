@@ -0,0 +1,64 @@
+import base64
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+MART_FLAGS = [
+    "FLAG_SERVICE_CATEGORIES",
+    "FLAG_CCSR",
+    "FLAG_CMS_CHRONIC_CONDITIONS",
+    "FLAG_TUVA_CHRONIC_CONDITIONS",
+    "FLAG_CMS_HCCS",
+    "FLAG_ED_CLASSIFICATION",
+    "FLAG_FINANCIAL_PMPM",
+    "FLAG_QUALITY_MEASURES",
+    "FLAG_READMISSION",
+]
+
+
+def make_test_results(rows: int, seed: int = 0) -> DataFrame:
+    """Build a synthetic dbt test summary shaped like a real test_results export."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(rows)
+    tables = np.array([f"table_{i}" for i in range(200)])
+    columns = np.array([f"column_{i}" for i in range(50)])
+    categories = np.array(["validity", "completeness", "plausibility", "timeliness"])
+    dimensions = np.array(["validity", "completeness", "consistency", "uniqueness"])
+
+    df = pd.DataFrame(
+        {
+            "UNIQUE_ID": [f"test.the_tuva_project.synthetic_{i}" for i in ids],
+            "DATABASE_NAME": "synthetic_db",
+            "SCHEMA_NAME": "input_layer",
+            "TABLE_NAME": tables[ids % len(tables)],
+            "TEST_NAME": [f"synthetic_test_{i}" for i in ids],
+            "TEST_SHORT_NAME": "accepted_values",
+            "TEST_COLUMN_NAME": columns[ids % len(columns)],
+            "SEVERITY": "warn",
+            "TEST_ORIGINAL_NAME": "accepted_values",
+            "TEST_DESCRIPTION": "Synthetic test generated for benchmarking.",
+            "TEST_TYPE": "generic",
+            "GENERATED_AT": "2025-03-05 20:24:04",
+            "METADATA_HASH": [f"{i:032x}" for i in ids],
+            "QUALITY_DIMENSION": dimensions[rng.integers(0, len(dimensions), rows)],
+            "DETECTED_AT": "2025-03-12 17:10:48.000000000",
+            "CREATED_AT": "2025-03-12 10:11:24.525000000",
+            "TEST_SUB_TYPE": "generic",
+            "TEST_RESULTS_QUERY": "select * from synthetic where value_field is null",
+            "STATUS": np.where(rng.random(rows) < 0.05, "fail", "pass"),
+            "FAILURES": rng.integers(0, 100, rows),
+            "FAILED_ROW_COUNT": rng.integers(0, 1000, rows).astype(str),
+            "TEST_CATEGORY": categories[ids % len(categories)],
+            "SEVERITY_LEVEL": rng.integers(1, 6, rows),
+        }
+    )
+    for flag in MART_FLAGS:
+        df[flag] = (rng.random(rows) < 0.2).astype(int)
+    return df
+
+
+def encode_upload(df: DataFrame) -> str:
+    """Encode a DataFrame as the contents string produced by dcc.Upload."""
+    payload = base64.b64encode(df.to_csv(index=False).encode("utf-8")).decode()
+    return f"data:text/csv;base64,{payload}"
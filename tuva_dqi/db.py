@@ -1,18 +1,1024 @@
+import os
 import sqlite3
+import threading
+import uuid
+import weakref
+from datetime import datetime, timezone
 
+import pandas as pd
+from pandas import DataFrame
 
-def get_db_connection(db_file_name="app_data.db") -> sqlite3.Connection:
-    """Create a connection to the SQLite database."""
-    conn = sqlite3.connect(db_file_name)
+# Data marts registered in every database. Test results flag the marts a test
+# affects with FLAG_<mart> columns, and marts flagged by newer uploads are
+# added to the registry as they are loaded.
+MART_NAMES = [
+    "SERVICE_CATEGORIES",
+    "CCSR",
+    "CMS_CHRONIC_CONDITIONS",
+    "TUVA_CHRONIC_CONDITIONS",
+    "CMS_HCCS",
+    "ED_CLASSIFICATION",
+    "FINANCIAL_PMPM",
+    "QUALITY_MEASURES",
+    "READMISSION",
+]
+
+# Column definitions for each table, shared by init_db and the staging tables
+# that ingest loads into before swapping them into place
+TABLE_SCHEMAS = {
+    "test_results": """
+        UNIQUE_ID TEXT PRIMARY KEY,
+        DATABASE_NAME TEXT,
+        SCHEMA_NAME TEXT,
+        TABLE_NAME TEXT,
+        TEST_NAME TEXT,
+        TEST_SHORT_NAME TEXT,
+        TEST_COLUMN_NAME TEXT,
+        SEVERITY TEXT,
+        WARN_IF TEXT,
+        ERROR_IF TEXT,
+        TEST_PARAMS TEXT,
+        TEST_ORIGINAL_NAME TEXT,
+        TEST_TAGS TEXT,
+        TEST_DESCRIPTION TEXT,
+        TEST_PACKAGE_NAME TEXT,
+        TEST_TYPE TEXT,
+        GENERATED_AT INTEGER,
+        METADATA_HASH TEXT,
+        QUALITY_DIMENSION TEXT,
+        DETECTED_AT INTEGER,
+        CREATED_AT INTEGER,
+        COLUMN_NAME TEXT,
+        TEST_SUB_TYPE TEXT,
+        TEST_RESULTS_DESCRIPTION TEXT,
+        TEST_RESULTS_QUERY TEXT,
+        STATUS TEXT,
+        FAILURES INTEGER,
+        FAILED_ROW_COUNT INTEGER,
+        TEST_CATEGORY TEXT,
+        SEVERITY_LEVEL INTEGER,
+        FLAG_SERVICE_CATEGORIES INTEGER,
+        FLAG_CCSR INTEGER,
+        FLAG_CMS_CHRONIC_CONDITIONS INTEGER,
+        FLAG_TUVA_CHRONIC_CONDITIONS INTEGER,
+        FLAG_CMS_HCCS INTEGER,
+        FLAG_ED_CLASSIFICATION INTEGER,
+        FLAG_FINANCIAL_PMPM INTEGER,
+        FLAG_QUALITY_MEASURES INTEGER,
+        FLAG_READMISSION INTEGER,
+        ROW_HASH TEXT
+""",
+    "chart_data": """
+        GRAPH_ID INTEGER,
+        Y_AXIS TEXT,
+        X_AXIS TEXT,
+        CHART_FILTER TEXT,
+        VALUE REAL,
+        Y_AXIS_NUMBER REAL,
+        Y_AXIS_DATE INTEGER,
+        X_AXIS_NUMBER REAL,
+        X_AXIS_DATE INTEGER
+""",
+    "ingest_jobs": """
+        JOB_ID TEXT PRIMARY KEY,
+        FILENAME TEXT,
+        STATE TEXT,
+        ROWS_PROCESSED INTEGER,
+        PROGRESS REAL,
+        ERROR TEXT,
+        RESULT TEXT,
+        CREATED_AT TEXT,
+        UPDATED_AT TEXT
+""",
+    "ingest_runs": """
+        RUN_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        GENERATED_AT TEXT,
+        LOADED_AT TEXT,
+        MODE TEXT,
+        TEST_COUNT INTEGER
+""",
+    "test_result_history": """
+        RUN_ID INTEGER NOT NULL,
+        UNIQUE_ID TEXT NOT NULL,
+        TABLE_NAME TEXT,
+        TEST_NAME TEXT,
+        QUALITY_DIMENSION TEXT,
+        TEST_CATEGORY TEXT,
+        STATUS TEXT,
+        SEVERITY_LEVEL INTEGER,
+        FAILURES INTEGER,
+        PRIMARY KEY (RUN_ID, UNIQUE_ID)
+""",
+    "run_summaries": """
+        RUN_ID INTEGER PRIMARY KEY,
+        GRADE TEXT,
+        TEST_COUNT INTEGER,
+        FAILING_COUNT INTEGER,
+        SEV1_FAILURES INTEGER,
+        SEV2_FAILURES INTEGER,
+        SEV3_FAILURES INTEGER,
+        SEV4_FAILURES INTEGER,
+        SEV5_FAILURES INTEGER
+""",
+    "run_mart_statuses": """
+        RUN_ID INTEGER NOT NULL,
+        MART TEXT NOT NULL,
+        STATUS TEXT,
+        PRIMARY KEY (RUN_ID, MART)
+""",
+    "data_version": """
+        ID INTEGER PRIMARY KEY CHECK (ID = 1),
+        DATABASE_ID TEXT,
+        VERSION INTEGER
+""",
+    "upload_digests": """
+        TABLE_NAME TEXT PRIMARY KEY,
+        DIGEST TEXT,
+        ROWS INTEGER,
+        LOADED_AT TEXT
+""",
+    "marts": """
+        MART TEXT PRIMARY KEY,
+        DISPLAY_NAME TEXT,
+        SORT_ORDER INTEGER
+""",
+    "test_mart": """
+        UNIQUE_ID TEXT NOT NULL,
+        MART TEXT NOT NULL,
+        PRIMARY KEY (MART, UNIQUE_ID)
+""",
+    "schema_backfills": """
+        NAME TEXT PRIMARY KEY,
+        TABLE_NAME TEXT,
+        LAST_ROWID INTEGER,
+        SCHEDULED_AT TEXT,
+        COMPLETED_AT TEXT
+""",
+    "severity_summary": """
+        SEVERITY_LEVEL INTEGER,
+        STATUS TEXT,
+        TESTS INTEGER
+""",
+    "mart_summary": """
+        MART TEXT,
+        SEVERITY_LEVEL INTEGER,
+        STATUS TEXT,
+        TESTS INTEGER
+""",
+    "category_summary": """
+        TEST_CATEGORY TEXT,
+        STATUS TEXT,
+        TESTS INTEGER
+""",
+    "facet_summary": """
+        TABLE_NAME TEXT,
+        TEST_COLUMN_NAME TEXT,
+        QUALITY_DIMENSION TEXT,
+        TEST_CATEGORY TEXT,
+        SEVERITY_LEVEL INTEGER,
+        STATUS TEXT,
+        TESTS INTEGER
+""",
+    "mart_facet_summary": """
+        MART TEXT,
+        TABLE_NAME TEXT,
+        TEST_COLUMN_NAME TEXT,
+        QUALITY_DIMENSION TEXT,
+        TEST_CATEGORY TEXT,
+        SEVERITY_LEVEL INTEGER,
+        STATUS TEXT,
+        TESTS INTEGER
+""",
+    "run_meta": """
+        ID INTEGER PRIMARY KEY CHECK (ID = 1),
+        LAST_RUN TEXT,
+        TEST_COUNT INTEGER,
+        DATABASE_NAME TEXT
+""",
+    "chart_catalog": """
+        GRAPH_ID INTEGER PRIMARY KEY,
+        GRAPH_NAME TEXT UNIQUE,
+        DATA_QUALITY_CATEGORY TEXT,
+        LEVEL_OF_DETAIL TEXT,
+        Y_AXIS_DESCRIPTION TEXT,
+        X_AXIS_DESCRIPTION TEXT,
+        FILTER_DESCRIPTION TEXT,
+        SUM_DESCRIPTION TEXT,
+        FILTER_VALUES TEXT,
+        ROW_COUNT INTEGER,
+        Y_AXIS_KIND TEXT,
+        X_AXIS_KIND TEXT
+""",
+}
+
+# Table options appended after the column definitions; history rows are
+# clustered on their primary key so one run's rows sit together on disk
+TABLE_OPTIONS = {
+    "test_result_history": "WITHOUT ROWID",
+    "run_mart_statuses": "WITHOUT ROWID",
+    "test_mart": "WITHOUT ROWID",
+}
+
+# Columns uploads carry as text that are stored as integers, per table, as
+# column -> "integer" for whole numbers or "timestamp" for seconds since the
+# epoch. Ingest converts them and reports the values it could not parse.
+TYPED_COLUMNS = {
+    "test_results": {
+        "GENERATED_AT": "timestamp",
+        "DETECTED_AT": "timestamp",
+        "CREATED_AT": "timestamp",
+        "FAILURES": "integer",
+        "FAILED_ROW_COUNT": "integer",
+        "SEVERITY_LEVEL": "integer",
+    },
+}
+
+# Columns of test_results the test search counts tests by, besides their marts.
+# facet_summary counts the tests with each combination of their values, and
+# mart_facet_summary does the same for every mart.
+FACET_COLUMNS = [
+    "TABLE_NAME",
+    "TEST_COLUMN_NAME",
+    "QUALITY_DIMENSION",
+    "TEST_CATEGORY",
+    "SEVERITY_LEVEL",
+    "STATUS",
+]
+
+# Secondary indexes built for each table as (name suffix, indexed columns and
+# an optional WHERE clause for a partial index). Each one serves a query in
+# the service layer; tests/test_services.py checks their query plans.
+TABLE_INDEXES = {
+    "test_results": [
+        # Status counts, and a mart's tests with a given status
+        ("status_severity", "(STATUS, SEVERITY_LEVEL)"),
+        # Outstanding errors and a mart's failing tests, in severity order
+        ("failing_severity", "(SEVERITY_LEVEL) WHERE STATUS != 'pass'"),
+        # Covers the grade and test counts, grouped in index order
+        ("severity_level_status", "(SEVERITY_LEVEL, STATUS)"),
+        ("generated_at", "(GENERATED_AT)"),
+        ("category_status", "(TEST_CATEGORY, STATUS)"),
+    ],
+    "chart_data": [
+        # A graph's rows, already in axis order
+        (
+            "graph_filter",
+            "(GRAPH_ID, CHART_FILTER, Y_AXIS_DATE, Y_AXIS_NUMBER, X_AXIS_DATE, "
+            "X_AXIS_NUMBER)",
+        ),
+    ],
+    "test_result_history": [
+        ("unique_id", "(UNIQUE_ID, RUN_ID)"),
+    ],
+    # Finds the marts of the failing tests
+    "test_mart": [
+        ("unique_id", "(UNIQUE_ID, MART)"),
+    ],
+    # Find the counter a changed test feeds
+    "facet_summary": [
+        ("facets", f"({', '.join(FACET_COLUMNS)})"),
+    ],
+    "mart_facet_summary": [
+        ("facets", f"(MART, {', '.join(FACET_COLUMNS)})"),
+    ],
+}
+
+# Summary tables the dashboard reads instead of aggregating the raw tables, as
+# name -> (tables it is derived from, query producing its rows). They are
+# rebuilt in the same transaction as a load that replaces a source table, so
+# page loads cost the same however many tests were uploaded.
+SUMMARY_TABLES = {
+    "severity_summary": (
+        ("test_results",),
+        """
+        SELECT SEVERITY_LEVEL, STATUS, COUNT(*) FROM test_results
+        GROUP BY SEVERITY_LEVEL, STATUS
+        """,
+    ),
+    "mart_summary": (
+        ("test_results", "test_mart"),
+        """
+        SELECT test_mart.MART, test_results.SEVERITY_LEVEL, test_results.STATUS,
+            COUNT(*)
+        FROM test_mart
+        JOIN test_results ON test_results.UNIQUE_ID = test_mart.UNIQUE_ID
+        GROUP BY test_mart.MART, test_results.SEVERITY_LEVEL, test_results.STATUS
+        """,
+    ),
+    "category_summary": (
+        ("test_results",),
+        """
+        SELECT TEST_CATEGORY, STATUS, COUNT(*) FROM test_results
+        GROUP BY TEST_CATEGORY, STATUS
+        """,
+    ),
+    "facet_summary": (
+        ("test_results",),
+        f"""
+        SELECT {", ".join(FACET_COLUMNS)}, COUNT(*) FROM test_results
+        GROUP BY {", ".join(FACET_COLUMNS)}
+        """,
+    ),
+    "mart_facet_summary": (
+        ("test_results", "test_mart"),
+        f"""
+        SELECT test_mart.MART, {", ".join(FACET_COLUMNS)}, COUNT(*)
+        FROM test_mart
+        JOIN test_results ON test_results.UNIQUE_ID = test_mart.UNIQUE_ID
+        GROUP BY test_mart.MART, {", ".join(FACET_COLUMNS)}
+        """,
+    ),
+    "run_meta": (
+        ("test_results",),
+        """
+        SELECT 1, datetime(MAX(GENERATED_AT), 'unixepoch'), COUNT(*),
+            (SELECT DATABASE_NAME FROM test_results LIMIT 1)
+        FROM test_results
+        """,
+    ),
+}
+
+
+# Chart metadata stored once per graph in chart_catalog. Uploaded chart rows
+# repeat these columns on every row, while chart_data only keeps the GRAPH_ID
+# of the catalog row along with the axis, filter and value columns.
+CHART_CATALOG_COLUMNS = [
+    "GRAPH_NAME",
+    "DATA_QUALITY_CATEGORY",
+    "LEVEL_OF_DETAIL",
+    "Y_AXIS_DESCRIPTION",
+    "X_AXIS_DESCRIPTION",
+    "FILTER_DESCRIPTION",
+    "SUM_DESCRIPTION",
+]
+
+# Chart axes stored as text, each with typed companion columns parsed once at
+# ingest: {axis}_NUMBER for numeric values and {axis}_DATE, in seconds since
+# the epoch, for dates, which include years and other date formats on axes
+# described as dates. The catalog's {axis}_KIND is "number" or "date" when
+# every value of the graph's axis parsed as one, and "text" otherwise.
+CHART_AXES = ["Y_AXIS", "X_AXIS"]
+
+# Range of the whole numbers taken as years on an axis described as a date
+MIN_AXIS_YEAR = 1000
+MAX_AXIS_YEAR = 9999
+
+# Chart rows in display order. A value fills at most one typed column, so
+# numbers and dates both sort correctly, and text axes keep upload order.
+CHART_AXIS_ORDER = ", ".join(
+    f"{axis}_{kind}" for axis in CHART_AXES for kind in ("DATE", "NUMBER")
+)
+
+# Test counters kept in step with row changes by triggers, so merging a few
+# changed tests does not rebuild the summaries. Maps each table to the
+# counters its rows feed, as (summary, grouping columns, query giving the
+# groups a row counts towards, with {row} standing for NEW or OLD).
+SUMMARY_COUNTERS = {
+    "test_results": [
+        (
+            "severity_summary",
+            ("SEVERITY_LEVEL", "STATUS"),
+            "SELECT {row}.SEVERITY_LEVEL AS SEVERITY_LEVEL, {row}.STATUS AS STATUS",
+        ),
+        (
+            "category_summary",
+            ("TEST_CATEGORY", "STATUS"),
+            "SELECT {row}.TEST_CATEGORY AS TEST_CATEGORY, {row}.STATUS AS STATUS",
+        ),
+        (
+            "mart_summary",
+            ("MART", "SEVERITY_LEVEL", "STATUS"),
+            """
+            SELECT MART, {row}.SEVERITY_LEVEL AS SEVERITY_LEVEL,
+                {row}.STATUS AS STATUS
+            FROM test_mart WHERE UNIQUE_ID = {row}.UNIQUE_ID
+            """,
+        ),
+        (
+            "facet_summary",
+            tuple(FACET_COLUMNS),
+            "SELECT " + ", ".join(f"{{row}}.{col} AS {col}" for col in FACET_COLUMNS),
+        ),
+        (
+            "mart_facet_summary",
+            ("MART", *FACET_COLUMNS),
+            "SELECT MART, "
+            + ", ".join(f"{{row}}.{col} AS {col}" for col in FACET_COLUMNS)
+            + " FROM test_mart WHERE UNIQUE_ID = {row}.UNIQUE_ID",
+        ),
+    ],
+    "test_mart": [
+        (
+            "mart_summary",
+            ("MART", "SEVERITY_LEVEL", "STATUS"),
+            """
+            SELECT {row}.MART AS MART, SEVERITY_LEVEL, STATUS
+            FROM test_results WHERE UNIQUE_ID = {row}.UNIQUE_ID
+            """,
+        ),
+        (
+            "mart_facet_summary",
+            ("MART", *FACET_COLUMNS),
+            f"SELECT {{row}}.MART AS MART, {', '.join(FACET_COLUMNS)} "
+            "FROM test_results WHERE UNIQUE_ID = {row}.UNIQUE_ID",
+        ),
+    ],
+}
+
+# run_meta changes per inserted, updated and deleted test. The last run time
+# is looked up again through the GENERATED_AT index and stored as text.
+RUN_META_CHANGES = {
+    "INSERT": """
+        TEST_COUNT = TEST_COUNT + 1,
+        LAST_RUN = (
+            SELECT datetime(MAX(GENERATED_AT), 'unixepoch') FROM test_results
+        ),
+        DATABASE_NAME = COALESCE(DATABASE_NAME, NEW.DATABASE_NAME)
+    """,
+    "UPDATE": """
+        LAST_RUN = (
+            SELECT datetime(MAX(GENERATED_AT), 'unixepoch') FROM test_results
+        ),
+        DATABASE_NAME = COALESCE(DATABASE_NAME, NEW.DATABASE_NAME)
+    """,
+    "DELETE": """
+        TEST_COUNT = TEST_COUNT - 1,
+        LAST_RUN = (
+            SELECT datetime(MAX(GENERATED_AT), 'unixepoch') FROM test_results
+        ),
+        DATABASE_NAME = CASE WHEN TEST_COUNT = 1 THEN NULL ELSE DATABASE_NAME END
+    """,
+}
+
+# Columns of test_results whose changes reach the counters or run_meta
+COUNTED_COLUMNS = [
+    "UNIQUE_ID",
+    "SEVERITY_LEVEL",
+    "STATUS",
+    "TEST_CATEGORY",
+    "TABLE_NAME",
+    "TEST_COLUMN_NAME",
+    "QUALITY_DIMENSION",
+    "GENERATED_AT",
+    "DATABASE_NAME",
+]
+
+# Rows each trigger event takes out of (-1) and adds to (+1) the counters
+TRIGGER_ROW_DELTAS = {
+    "INSERT": [("NEW", 1)],
+    "UPDATE": [("OLD", -1), ("NEW", 1)],
+    "DELETE": [("OLD", -1)],
+}
+
+# Pragmas applied to every managed connection. NORMAL sync is durable in WAL
+# mode except for the last commits before a power loss, busy_timeout makes
+# writers wait for each other instead of failing, and the mmap and page cache
+# sizes (in bytes and KiB) keep hot tables in memory between queries.
+CONNECTION_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+}
+
+# Rows updated per transaction by a schema backfill, small enough that readers
+# and ingest jobs never wait long for the write lock
+BACKFILL_BATCH_SIZE = int(os.environ.get("BACKFILL_BATCH_SIZE", 5000))
+
+_local = threading.local()
+# Every open managed connection, for close_db_connections. Only the thread
+# that opened a connection keeps it alive.
+_open_connections = weakref.WeakSet()
+_open_connections_lock = threading.Lock()
+
+
+def _close_connections(connections) -> None:
+    # Only a writer can checkpoint the WAL and remove it when the last
+    # connection closes, so the read-only connections go first
+    for conn in sorted(connections, key=lambda conn: not conn.read_only):
+        conn.close_for_real()
+
+
+class ManagedConnection(sqlite3.Connection):
+    """SQLite connection that is reused by its thread instead of being closed.
+
+    ``close`` only rolls back an unfinished transaction, so callers keep the
+    open-use-close pattern while the connection and its page cache stay warm
+    for the next call on the same thread.
+    """
+
+    closed = False
+    read_only = False
+
+    def close(self) -> None:
+        if self.in_transaction:
+            self.rollback()
+
+    def close_for_real(self) -> None:
+        self.closed = True
+        super().close()
+
+
+class _ThreadConnections(dict):
+    """One thread's managed connections, keyed by (path, read_only).
+
+    A thread's local values are released when it exits, which closes the
+    connections of short-lived threads such as the ones serving requests.
+    """
+
+    def __del__(self) -> None:
+        _close_connections(list(self.values()))
+
+
+def _open_connection(db_file_name: str, read_only: bool) -> ManagedConnection:
+    if read_only:
+        uri = f"file:{os.path.abspath(db_file_name)}?mode=ro"
+        conn = sqlite3.connect(
+            uri, uri=True, factory=ManagedConnection, check_same_thread=False
+        )
+    else:
+        conn = sqlite3.connect(
+            db_file_name, factory=ManagedConnection, check_same_thread=False
+        )
+        # Lets pruned history pages be returned to the OS a few at a time. It
+        # has to be chosen before WAL mode creates the file, and only takes
+        # effect on a new database or after its next full VACUUM
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # WAL lets dashboard reads continue while an ingest job is writing
+        conn.execute("PRAGMA journal_mode=WAL")
+    for pragma, value in CONNECTION_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma}={value}")
     conn.row_factory = sqlite3.Row
+    conn.read_only = read_only
     return conn
 
 
-def init_db(db_file_name="app_data.db") -> None:
-    """Initialize the database with required tables."""
-    conn = get_db_connection(db_file_name)
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS test_results (
+def get_db_connection(
+    db_file_name="app_data.db", read_only=False
+) -> sqlite3.Connection:
+    """Get this thread's connection to the SQLite database, opening it if needed.
+
+    Read-only connections are meant for the service layer and cannot write
+    to the database by accident.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = _ThreadConnections()
+
+    key = (os.path.abspath(db_file_name), read_only)
+    conn = connections.get(key)
+    if conn is None or conn.closed:
+        conn = connections[key] = _open_connection(db_file_name, read_only)
+        with _open_connections_lock:
+            _open_connections.add(conn)
+    return conn
+
+
+def close_db_connections() -> None:
+    """Close the managed connections of every thread.
+
+    Needed before a database file is deleted or replaced, since threads
+    would otherwise keep using connections to the old file.
+    """
+    with _open_connections_lock:
+        connections = list(_open_connections)
+        _open_connections.clear()
+    # Threads that held these reopen them on their next call
+    _close_connections(connections)
+
+
+def create_table(conn, table_name: str, physical_name: str = None) -> None:
+    """Create a table from its schema, optionally under a different name."""
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {physical_name or table_name} ("
+        f"{TABLE_SCHEMAS[table_name]}) {TABLE_OPTIONS.get(table_name, '')}"
+    )
+
+
+def ensure_columns(conn, table_name: str, schema: str = None) -> None:
+    """Add any schema column missing from a table created by an older version.
+
+    The columns are those of ``TABLE_SCHEMAS`` unless a ``schema`` is given.
+    """
+    existing = {
+        row[1] for row in conn.execute(f"PRAGMA table_info({table_name})").fetchall()
+    }
+    schema = schema if schema is not None else TABLE_SCHEMAS[table_name]
+    for definition in schema.strip().split(",\n"):
+        definition = definition.strip()
+        name = definition.split()[0]
+        if name not in existing and name not in ("PRIMARY", "UNIQUE"):
+            conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {definition}")
+
+
+def create_indexes(conn, table_name: str, physical_name: str = None) -> None:
+    """Build the secondary indexes of a table, optionally on a staging copy.
+
+    SQLite cannot rename an index, so indexes built on a staging table keep
+    their names after the table is swapped into place. A random tag keeps
+    those names from colliding with the indexes of the table being replaced.
+    """
+    tag = uuid.uuid4().hex[:8]
+    for suffix, columns in TABLE_INDEXES.get(table_name, []):
+        conn.execute(
+            f"CREATE INDEX ix_{table_name}_{suffix}_{tag} "
+            f"ON {physical_name or table_name} {columns}"
+        )
+
+
+def ensure_indexes(conn, table_name: str, indexes: list = None) -> None:
+    """Build any secondary index of a table that does not exist yet.
+
+    The indexes are those of ``TABLE_INDEXES`` unless ``indexes`` are given.
+    """
+    existing = {
+        row[1] for row in conn.execute(f"PRAGMA index_list({table_name})").fetchall()
+    }
+    tag = uuid.uuid4().hex[:8]
+    if indexes is None:
+        indexes = TABLE_INDEXES.get(table_name, [])
+    for suffix, columns in indexes:
+        prefix = f"ix_{table_name}_{suffix}_"
+        if not any(name.startswith(prefix) for name in existing):
+            conn.execute(f"CREATE INDEX {prefix}{tag} ON {table_name} {columns}")
+
+
+def get_data_version(conn) -> tuple[str, int]:
+    """Get the token identifying the current contents of the database.
+
+    The token pairs a random id chosen when the database was created with a
+    counter bumped by every load, so it changes whenever the data does, even
+    if the database file is deleted and rebuilt.
+    """
+    row = conn.execute(
+        "SELECT DATABASE_ID, VERSION FROM data_version WHERE ID = 1"
+    ).fetchone()
+    return (row[0], row[1]) if row else (None, 0)
+
+
+def bump_data_version(conn) -> None:
+    """Mark the data as changed so cached query results are discarded.
+
+    Runs inside the caller's transaction, so the version changes together
+    with the data.
+    """
+    conn.execute("UPDATE data_version SET VERSION = VERSION + 1 WHERE ID = 1")
+
+
+def rebuild_summaries(conn, table_names=None) -> None:
+    """Recompute the summary tables derived from any of the given tables.
+
+    Rebuilds every summary when ``table_names`` is None. Runs inside the
+    caller's transaction, so the summaries change together with the data.
+    """
+    for summary, (sources, query) in SUMMARY_TABLES.items():
+        if table_names is None or set(sources) & set(table_names):
+            conn.execute(f"DELETE FROM {summary}")
+            conn.execute(f"INSERT INTO {summary} {query}")
+
+
+def _count_statements(summary: str, columns, groups: str, delta: int) -> str:
+    """Build the trigger statements adding ``delta`` to a counter's groups.
+
+    The counter rows are found by joining the groups onto the summary, which
+    looks them up through an index on the grouping columns when it has one.
+    """
+    match = " AND ".join(f"delta.{col} IS {summary}.{col}" for col in columns)
+    counted = (
+        f"SELECT {summary}.rowid FROM ({groups}) AS delta JOIN {summary} ON {match}"
+    )
+    statements = f"""
+        UPDATE {summary} SET TESTS = TESTS + {delta} WHERE rowid IN ({counted});
+    """
+    if delta > 0:
+        column_list = ", ".join(columns)
+        statements += f"""
+            INSERT INTO {summary} ({column_list}, TESTS)
+            SELECT {column_list}, {delta} FROM ({groups}) AS delta
+            WHERE NOT EXISTS (SELECT 1 FROM {summary} WHERE {match});
+        """
+    else:
+        statements += f"DELETE FROM {summary} WHERE rowid IN ({counted}) AND TESTS = 0;"
+    return statements
+
+
+def create_summary_triggers(conn, table_names=None) -> None:
+    """(Re)create the triggers that keep the test counters in step with a table.
+
+    Covers every table in ``SUMMARY_COUNTERS`` when ``table_names`` is None.
+    Triggers of the same name on a table that was swapped out are replaced.
+    """
+    for table_name, counters in SUMMARY_COUNTERS.items():
+        if table_names is not None and table_name not in table_names:
+            continue
+        for event, row_deltas in TRIGGER_ROW_DELTAS.items():
+            body = ""
+            for row, delta in row_deltas:
+                for summary, columns, groups in counters:
+                    body += _count_statements(
+                        summary, columns, groups.format(row=row), delta
+                    )
+            when = ""
+            if table_name == "test_results":
+                body += f"UPDATE run_meta SET {RUN_META_CHANGES[event]} WHERE ID = 1;"
+                if event == "UPDATE":
+                    when = "WHEN " + " OR ".join(
+                        f"OLD.{col} IS NOT NEW.{col}" for col in COUNTED_COLUMNS
+                    )
+
+            name = f"tr_{table_name}_{event.lower()}_summaries"
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute(
+                f"CREATE TRIGGER {name} AFTER {event} ON {table_name} "
+                f"FOR EACH ROW {when} BEGIN {body} END"
+            )
+
+
+def epoch_seconds(values: pd.Series, format: str = "ISO8601") -> pd.Series:
+    """Parse timestamps into seconds since the epoch.
+
+    Timestamps are read as ISO 8601 unless another ``format`` is given, and
+    those without a time zone are taken as UTC. Values that are not
+    timestamps become NaN.
+    """
+    dates = pd.to_datetime(
+        values.astype(object), errors="coerce", format=format, utc=True
+    )
+    return (dates - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+
+
+def axis_dates(values: pd.Series) -> pd.Series:
+    """Parse the values of an axis described as a date into seconds since the epoch.
+
+    Whole numbers from ``MIN_AXIS_YEAR`` to ``MAX_AXIS_YEAR`` are years and
+    stand for their first day, and text is parsed as a date in any format.
+    """
+    numbers = pd.to_numeric(values, errors="coerce")
+    years = numbers.where(
+        (numbers % 1 == 0) & numbers.between(MIN_AXIS_YEAR, MAX_AXIS_YEAR)
+    )
+    year_dates = epoch_seconds(years.astype("Int64").astype(str), format="%Y")
+    text_dates = epoch_seconds(values.where(numbers.isna()), format="mixed")
+    return year_dates.fillna(text_dates)
+
+
+def typed_axis_columns(df: DataFrame) -> DataFrame:
+    """Parse the chart axes of a DataFrame into their typed companion columns.
+
+    Values that are numbers fill {axis}_NUMBER; the remaining ones that are
+    ISO 8601 dates fill {axis}_DATE with seconds since the epoch. On rows
+    whose {axis}_DESCRIPTION mentions a date, years and dates in other
+    formats fill {axis}_DATE instead, per ``axis_dates``.
+    """
+    typed = {}
+    for axis in CHART_AXES:
+        values = df[axis] if axis in df else pd.Series(None, index=df.index)
+        numbers = pd.to_numeric(values, errors="coerce").astype(float)
+        dates = epoch_seconds(values.where(numbers.isna()))
+        if f"{axis}_DESCRIPTION" in df:
+            described = df[f"{axis}_DESCRIPTION"].astype(str).str.lower()
+            is_date = described.str.contains("date") & values.notna()
+            if is_date.any():
+                dates = axis_dates(values[is_date]).combine_first(dates)
+                numbers = numbers.mask(dates.notna())
+        typed[f"{axis}_NUMBER"] = numbers
+        typed[f"{axis}_DATE"] = dates
+    return DataFrame(typed, index=df.index)
+
+
+def count_chart_rows(
+    conn, catalog_name: str = "chart_catalog", chart_data_name: str = "chart_data"
+) -> None:
+    """Store each graph's row count, filter values and axis kinds in the catalog.
+
+    One grouped pass over the chart rows serves every graph. The table names
+    can point at staging copies that are about to be swapped in.
+    """
+    axis_counts = "".join(
+        f", COUNT({axis}) AS {axis}_VALUES, COUNT({axis}_NUMBER) AS {axis}_NUMBERS, "
+        f"COUNT({axis}_DATE) AS {axis}_DATES"
+        for axis in CHART_AXES
+    )
+    axis_kinds = "".join(
+        f"""
+        , {axis}_KIND = CASE
+            WHEN counts.{axis}_VALUES = 0 THEN 'text'
+            WHEN counts.{axis}_NUMBERS = counts.{axis}_VALUES THEN 'number'
+            WHEN counts.{axis}_DATES = counts.{axis}_VALUES THEN 'date'
+            ELSE 'text'
+        END"""
+        for axis in CHART_AXES
+    )
+    axis_sums = "".join(
+        f", SUM({axis}_{count}) AS {axis}_{count}"
+        for axis in CHART_AXES
+        for count in ("VALUES", "NUMBERS", "DATES")
+    )
+    conn.execute(
+        f"""
+        UPDATE {catalog_name}
+        SET ROW_COUNT = counts.ROW_COUNT, FILTER_VALUES = counts.FILTER_VALUES
+            {axis_kinds}
+        FROM (
+            SELECT GRAPH_ID, SUM(ROWS) AS ROW_COUNT,
+                json_group_array(CHART_FILTER)
+                    FILTER (WHERE CHART_FILTER IS NOT NULL AND CHART_FILTER != '')
+                    AS FILTER_VALUES
+                {axis_sums}
+            FROM (
+                SELECT GRAPH_ID, CHART_FILTER, COUNT(*) AS ROWS {axis_counts}
+                FROM {chart_data_name}
+                GROUP BY GRAPH_ID, CHART_FILTER
+                ORDER BY GRAPH_ID, CHART_FILTER
+            )
+            GROUP BY GRAPH_ID
+        ) AS counts
+        WHERE counts.GRAPH_ID = {catalog_name}.GRAPH_ID
+        """
+    )
+
+
+def display_name(name: str) -> str:
+    """Format a name such as CMS_HCCS or ed_visits for display.
+
+    Words are title cased, except the acronyms used in mart and chart names.
+    """
+    return (
+        name.replace("_", " ")
+        .title()
+        .replace("Ccsr", "CCSR")
+        .replace("Cms", "CMS")
+        .replace("Ed", "ED")
+        .replace("Pmpm", "PMPM")
+        .replace("Hcc", "HCC")
+    )
+
+
+def mart_display_name(mart: str) -> str:
+    """Format a mart name such as CMS_HCCS for display."""
+    return display_name(mart)
+
+
+def register_marts(conn, marts) -> None:
+    """Add any new marts to the registry, after the ones already there."""
+    for mart in marts:
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO marts (MART, DISPLAY_NAME, SORT_ORDER)
+            VALUES (?, ?, (SELECT COALESCE(MAX(SORT_ORDER), 0) + 1 FROM marts))
+            """,
+            (mart, mart_display_name(mart)),
+        )
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+# Schema migrations as (version, description, function), applied in order to
+# bring a database from its PRAGMA user_version up to the latest version. A
+# change to an existing table needs a new migration; edits to TABLE_SCHEMAS
+# alone only reach new databases and staging tables.
+MIGRATIONS = []
+
+# Backfills scheduled by migrations, as name -> (table name, function). Each
+# function updates the rows of its table with rowids in a given range and must
+# be safe to run again, since an ingest may replace rows it already covered.
+BACKFILLS = {}
+
+
+def migration(version: int, description: str):
+    """Register a function as the migration to the given schema version."""
+
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        return func
+
+    return register
+
+
+def backfill(name: str, table_name: str):
+    """Register a function as a batched backfill of a table."""
+
+    def register(func):
+        BACKFILLS[name] = (table_name, func)
+        return func
+
+    return register
+
+
+def get_schema_version(conn) -> int:
+    """Get the schema version a database has been migrated to."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn) -> list[int]:
+    """Apply pending migrations in order and return the versions applied.
+
+    Each migration runs in its own write transaction together with the
+    version bump, so a failed migration leaves the database at the previous
+    version. Workers starting at the same time wait for each other's lock
+    and skip the migrations another worker has already applied.
+    """
+    latest = MIGRATIONS[-1][0] if MIGRATIONS else 0
+    if get_schema_version(conn) > latest:
+        raise RuntimeError(
+            f"Database schema version {get_schema_version(conn)} is newer than "
+            f"the latest version this app knows about ({latest})"
+        )
+
+    applied = []
+    for version, _, func in MIGRATIONS:
+        if get_schema_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) < version:
+                func(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                applied.append(version)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return applied
+
+
+def schedule_backfill(conn, name: str) -> None:
+    """Queue a registered backfill to run from the start of its table."""
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO schema_backfills
+            (NAME, TABLE_NAME, LAST_ROWID, SCHEDULED_AT, COMPLETED_AT)
+        VALUES (?, ?, 0, ?, NULL)
+        """,
+        (name, BACKFILLS[name][0], _now()),
+    )
+
+
+def run_backfill_batch(conn, batch_size: int = BACKFILL_BATCH_SIZE) -> bool:
+    """Run one batch of the oldest pending backfill and report if work remains.
+
+    A batch is one short write transaction that also records how far the
+    backfill got, so dashboard reads and ingest jobs are never locked out for
+    long and an interrupted backfill resumes where it stopped.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        pending = conn.execute(
+            """
+            SELECT NAME, TABLE_NAME, LAST_ROWID FROM schema_backfills
+            WHERE COMPLETED_AT IS NULL
+            ORDER BY SCHEDULED_AT, NAME
+            LIMIT 1
+            """
+        ).fetchone()
+        if pending is None:
+            conn.commit()
+            return False
+
+        name, table_name, last_rowid = pending
+        end_rowid = conn.execute(
+            f"""
+            SELECT MAX(rowid) FROM (
+                SELECT rowid FROM {table_name} WHERE rowid > ? ORDER BY rowid LIMIT ?
+            )
+            """,
+            (last_rowid, batch_size),
+        ).fetchone()[0]
+        if end_rowid is None:
+            conn.execute(
+                "UPDATE schema_backfills SET COMPLETED_AT = ? WHERE NAME = ?",
+                (_now(), name),
+            )
+            # Summaries catch up once, not after every batch
+            rebuild_summaries(conn, [table_name])
+            bump_data_version(conn)
+        else:
+            BACKFILLS[name][1](conn, last_rowid + 1, end_rowid)
+            conn.execute(
+                "UPDATE schema_backfills SET LAST_ROWID = ? WHERE NAME = ?",
+                (end_rowid, name),
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return True
+
+
+def run_backfills(conn, batch_size: int = BACKFILL_BATCH_SIZE) -> None:
+    """Run every pending backfill to completion."""
+    while run_backfill_batch(conn, batch_size):
+        pass
+
+
+# The tables, table options and indexes of schema version 1, as they were
+# when schema versioning began. Migration 1 builds these rather than the
+# current TABLE_SCHEMAS, so what it does never changes; every later change to
+# a table is a numbered migration.
+V1_TABLE_SCHEMAS = {
+    "test_results": """
         UNIQUE_ID TEXT PRIMARY KEY,
         DATABASE_NAME TEXT,
         SCHEMA_NAME TEXT,
@@ -51,11 +1057,10 @@ def init_db(db_file_name="app_data.db") -> None:
         FLAG_ED_CLASSIFICATION INTEGER,
         FLAG_FINANCIAL_PMPM INTEGER,
         FLAG_QUALITY_MEASURES INTEGER,
-        FLAG_READMISSION INTEGER
-    )
-    """)
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS chart_data (
+        FLAG_READMISSION INTEGER,
+        ROW_HASH TEXT
+""",
+    "chart_data": """
         DATA_QUALITY_CATEGORY TEXT,
         GRAPH_NAME TEXT,
         LEVEL_OF_DETAIL TEXT,
@@ -67,7 +1072,326 @@ def init_db(db_file_name="app_data.db") -> None:
         X_AXIS TEXT,
         CHART_FILTER TEXT,
         VALUE REAL
+""",
+    "ingest_jobs": """
+        JOB_ID TEXT PRIMARY KEY,
+        FILENAME TEXT,
+        STATE TEXT,
+        ROWS_PROCESSED INTEGER,
+        PROGRESS REAL,
+        ERROR TEXT,
+        RESULT TEXT,
+        CREATED_AT TEXT,
+        UPDATED_AT TEXT
+""",
+    "ingest_runs": """
+        RUN_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        GENERATED_AT TEXT,
+        LOADED_AT TEXT,
+        MODE TEXT,
+        TEST_COUNT INTEGER
+""",
+    "test_result_history": """
+        RUN_ID INTEGER NOT NULL,
+        UNIQUE_ID TEXT NOT NULL,
+        TABLE_NAME TEXT,
+        TEST_NAME TEXT,
+        QUALITY_DIMENSION TEXT,
+        TEST_CATEGORY TEXT,
+        STATUS TEXT,
+        SEVERITY_LEVEL INTEGER,
+        FAILURES INTEGER,
+        PRIMARY KEY (RUN_ID, UNIQUE_ID)
+""",
+    "run_summaries": """
+        RUN_ID INTEGER PRIMARY KEY,
+        GRADE TEXT,
+        TEST_COUNT INTEGER,
+        FAILING_COUNT INTEGER,
+        SEV1_FAILURES INTEGER,
+        SEV2_FAILURES INTEGER,
+        SEV3_FAILURES INTEGER,
+        SEV4_FAILURES INTEGER,
+        SEV5_FAILURES INTEGER
+""",
+    "run_mart_statuses": """
+        RUN_ID INTEGER NOT NULL,
+        MART TEXT NOT NULL,
+        STATUS TEXT,
+        PRIMARY KEY (RUN_ID, MART)
+""",
+    "data_version": """
+        ID INTEGER PRIMARY KEY CHECK (ID = 1),
+        DATABASE_ID TEXT,
+        VERSION INTEGER
+""",
+    "upload_digests": """
+        TABLE_NAME TEXT PRIMARY KEY,
+        DIGEST TEXT,
+        ROWS INTEGER,
+        LOADED_AT TEXT
+""",
+    "schema_backfills": """
+        NAME TEXT PRIMARY KEY,
+        TABLE_NAME TEXT,
+        LAST_ROWID INTEGER,
+        SCHEDULED_AT TEXT,
+        COMPLETED_AT TEXT
+""",
+}
+V1_TABLE_OPTIONS = {
+    "test_result_history": "WITHOUT ROWID",
+    "run_mart_statuses": "WITHOUT ROWID",
+}
+V1_TABLE_INDEXES = {
+    "test_results": [
+        ("status_severity", "(STATUS, SEVERITY_LEVEL)"),
+        ("failing_severity", "(SEVERITY_LEVEL) WHERE STATUS != 'pass'"),
+        (
+            "severity_status_flags",
+            "(SEVERITY_LEVEL, STATUS, FLAG_SERVICE_CATEGORIES, FLAG_CCSR, "
+            "FLAG_CMS_CHRONIC_CONDITIONS, FLAG_TUVA_CHRONIC_CONDITIONS, "
+            "FLAG_CMS_HCCS, FLAG_ED_CLASSIFICATION, FLAG_FINANCIAL_PMPM, "
+            "FLAG_QUALITY_MEASURES, FLAG_READMISSION)",
+        ),
+        ("generated_at", "(GENERATED_AT)"),
+        ("category_status", "(TEST_CATEGORY, STATUS)"),
+    ],
+    "chart_data": [
+        ("graph_filter", "(GRAPH_NAME, CHART_FILTER)"),
+        ("category", "(DATA_QUALITY_CATEGORY)"),
+    ],
+    "test_result_history": [
+        ("unique_id", "(UNIQUE_ID, RUN_ID)"),
+    ],
+}
+
+
+@migration(1, "Bring tables created before schema versioning up to date")
+def _sync_unversioned_tables(conn) -> None:
+    for table_name, schema in V1_TABLE_SCHEMAS.items():
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table_name} ({schema}) "
+            f"{V1_TABLE_OPTIONS.get(table_name, '')}"
+        )
+        ensure_columns(conn, table_name, schema)
+        ensure_indexes(conn, table_name, V1_TABLE_INDEXES.get(table_name, []))
+    conn.execute(
+        "INSERT OR IGNORE INTO data_version (ID, DATABASE_ID, VERSION) VALUES (1, ?, 0)",
+        (uuid.uuid4().hex,),
+    )
+
+
+@migration(2, "Move mart membership into the marts and test_mart tables")
+def _add_mart_registry(conn) -> None:
+    for table_name in ("marts", "test_mart"):
+        create_table(conn, table_name)
+        ensure_indexes(conn, table_name)
+    register_marts(conn, MART_NAMES)
+
+    # The mart aggregates no longer read the flag columns of test_results
+    for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' "
+        "AND name LIKE 'ix_test_results_severity_status_flags_%'"
+    ).fetchall():
+        conn.execute(f"DROP INDEX {name}")
+    ensure_indexes(conn, "test_results")
+
+    schedule_backfill(conn, "test_mart_from_flags")
+
+
+@backfill("test_mart_from_flags", "test_results")
+def _fill_test_mart_from_flags(conn, first_rowid: int, last_rowid: int) -> None:
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(test_results)")}
+    for (mart,) in conn.execute("SELECT MART FROM marts").fetchall():
+        if f"FLAG_{mart}" in columns:
+            conn.execute(
+                f"""
+                INSERT OR IGNORE INTO test_mart (UNIQUE_ID, MART)
+                SELECT UNIQUE_ID, ? FROM test_results
+                WHERE rowid BETWEEN ? AND ? AND FLAG_{mart} = 1
+                """,
+                (mart, first_rowid, last_rowid),
+            )
+
+
+@migration(3, "Add summary tables for the dashboard aggregates")
+def _add_summary_tables(conn) -> None:
+    for table_name in SUMMARY_TABLES:
+        create_table(conn, table_name)
+    rebuild_summaries(conn)
+
+
+@migration(4, "Maintain the test counters with triggers")
+def _add_summary_triggers(conn) -> None:
+    create_summary_triggers(conn)
+
+
+@migration(5, "Move chart metadata into chart_catalog, keyed by GRAPH_ID")
+def _split_chart_catalog(conn) -> None:
+    # Databases created at this version already have the slim chart_data
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(chart_data)")}
+    if "GRAPH_NAME" not in columns:
+        return
+
+    catalog_columns = ", ".join(col for col in CHART_CATALOG_COLUMNS if col in columns)
+    conn.execute("DROP TABLE IF EXISTS chart_catalog")
+    create_table(conn, "chart_catalog")
+    conn.execute(
+        f"""
+        INSERT INTO chart_catalog ({catalog_columns})
+        SELECT {catalog_columns} FROM chart_data
+        WHERE rowid IN (
+            SELECT MIN(rowid) FROM chart_data
+            WHERE GRAPH_NAME IS NOT NULL
+            GROUP BY GRAPH_NAME
+        )
+        ORDER BY rowid
+        """
     )
-    """)
-    conn.commit()
+
+    create_table(conn, "chart_data", "chart_data__slim")
+    conn.execute(
+        """
+        INSERT INTO chart_data__slim (GRAPH_ID, Y_AXIS, X_AXIS, CHART_FILTER, VALUE)
+        SELECT chart_catalog.GRAPH_ID, chart_data.Y_AXIS, chart_data.X_AXIS,
+            chart_data.CHART_FILTER, chart_data.VALUE
+        FROM chart_data
+        JOIN chart_catalog ON chart_catalog.GRAPH_NAME = chart_data.GRAPH_NAME
+        ORDER BY chart_data.rowid
+        """
+    )
+    conn.execute("DROP TABLE chart_data")
+    conn.execute("ALTER TABLE chart_data__slim RENAME TO chart_data")
+    ensure_indexes(conn, "chart_data")
+    count_chart_rows(conn)
+
+
+@migration(6, "Add typed chart axis columns, parsed from the stored axes")
+def _add_typed_chart_axes(conn) -> None:
+    for table_name in ("chart_data", "chart_catalog"):
+        ensure_columns(conn, table_name)
+    # The graph index now also covers the axis order
+    for row in conn.execute("PRAGMA index_list(chart_data)").fetchall():
+        if row[1].startswith("ix_chart_data_graph_filter_"):
+            conn.execute(f"DROP INDEX {row[1]}")
+
+    _parse_chart_axes(
+        conn,
+        """
+        SELECT rowid AS ROW_ID, Y_AXIS, X_AXIS FROM chart_data
+        WHERE rowid > ? ORDER BY rowid LIMIT ?
+        """,
+    )
+    ensure_indexes(conn, "chart_data")
+    count_chart_rows(conn)
+
+
+def _parse_chart_axes(conn, query: str) -> None:
+    """Refill the typed axis columns of the chart rows a query reads.
+
+    Chart rows are replaced by every chart upload, so they are parsed in
+    place rather than in a backfill, a batch at a time to bound memory. The
+    query gets the last rowid parsed and the batch size as parameters.
+    """
+    last_rowid = 0
+    while True:
+        rows = pd.read_sql_query(query, conn, params=(last_rowid, BACKFILL_BATCH_SIZE))
+        if rows.empty:
+            break
+        typed = typed_axis_columns(rows).astype(object)
+        assignments = ", ".join(f"{col} = ?" for col in typed.columns)
+        typed = typed.where(typed.notna(), None)
+        typed["ROW_ID"] = rows["ROW_ID"]
+        conn.executemany(
+            f"""
+            UPDATE chart_data SET {assignments}
+            WHERE rowid = ?
+            """,
+            list(typed.itertuples(index=False, name=None)),
+        )
+        last_rowid = int(rows["ROW_ID"].iloc[-1])
+
+
+# SQL converting a stored text value to its TYPED_COLUMNS kind, or to NULL
+TYPED_VALUE_SQL = {
+    "timestamp": """
+        CASE WHEN typeof({column}) IN ('integer', 'real') THEN CAST({column} AS INTEGER)
+        ELSE CAST(strftime('%s', {column}) AS INTEGER) END
+    """,
+    "integer": """
+        CASE WHEN typeof({column}) = 'integer' THEN {column}
+        WHEN typeof({column}) = 'real' AND {column} = CAST({column} AS INTEGER)
+            THEN CAST({column} AS INTEGER)
+        WHEN trim({column}) GLOB '[0-9]*' AND trim({column}) NOT GLOB '*[^0-9]*'
+            THEN CAST(trim({column}) AS INTEGER)
+        END
+    """,
+}
+
+
+@migration(7, "Store test result timestamps and row counts as integers")
+def _add_typed_test_columns(conn) -> None:
+    # Column types can only change by copying the rows into a new table
+    for table_name, column_types in TYPED_COLUMNS.items():
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+        if not columns:
+            continue
+        values = [
+            TYPED_VALUE_SQL[column_types[col]].format(column=col)
+            if col in column_types
+            else col
+            for col in columns
+        ]
+        create_table(conn, table_name, f"{table_name}__typed")
+        conn.execute(
+            f"""
+            INSERT INTO {table_name}__typed (rowid, {", ".join(columns)})
+            SELECT rowid, {", ".join(values)} FROM {table_name}
+            """
+        )
+
+        # Keep other tables' triggers pointing at the live table name
+        conn.execute("PRAGMA legacy_alter_table = ON")
+        try:
+            conn.execute(f"DROP TABLE {table_name}")
+            conn.execute(f"ALTER TABLE {table_name}__typed RENAME TO {table_name}")
+        finally:
+            conn.execute("PRAGMA legacy_alter_table = OFF")
+        ensure_indexes(conn, table_name)
+        create_summary_triggers(conn, [table_name])
+        rebuild_summaries(conn, [table_name])
+
+
+@migration(8, "Count tests by every search facet")
+def _add_facet_summaries(conn) -> None:
+    for table_name in ("facet_summary", "mart_facet_summary"):
+        create_table(conn, table_name)
+        ensure_indexes(conn, table_name)
+    if not conn.execute("PRAGMA table_info(test_results)").fetchall():
+        return
+    rebuild_summaries(conn, ["test_results"])
+    # The counters of the existing summaries are found by index lookups too
+    create_summary_triggers(conn)
+
+
+@migration(9, "Parse years and other dates on chart axes described as dates")
+def _add_chart_axis_years(conn) -> None:
+    _parse_chart_axes(
+        conn,
+        """
+        SELECT chart_data.rowid AS ROW_ID, Y_AXIS, X_AXIS,
+            Y_AXIS_DESCRIPTION, X_AXIS_DESCRIPTION
+        FROM chart_data
+        JOIN chart_catalog ON chart_catalog.GRAPH_ID = chart_data.GRAPH_ID
+        WHERE chart_data.rowid > ? ORDER BY chart_data.rowid LIMIT ?
+        """,
+    )
+    count_chart_rows(conn)
+
+
+def init_db(db_file_name="app_data.db") -> None:
+    """Initialize the database, migrating it to the latest schema version."""
+    conn = get_db_connection(db_file_name)
+    migrate(conn)
     conn.close()
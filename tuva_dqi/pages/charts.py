@@ -3,6 +3,8 @@ import plotly.express as px
 import plotly.graph_objects as go
 from dash import dcc, html
 
+from db import display_name, mart_display_name
+from pages.components import SEVERITY_COLORS
 from services.dqi_service import get_chart_data
 
 
@@ -19,7 +21,7 @@ def create_chart(graph_name, chart_filter=None):
     metadata = df.iloc[0]
 
     # Format the title
-    title = f"{metadata['DATA_QUALITY_CATEGORY'].title()}: {graph_name.replace('_', ' ').title()}"
+    title = f"{metadata['DATA_QUALITY_CATEGORY'].title()}: {display_name(graph_name)}"
     if chart_filter and metadata["FILTER_DESCRIPTION"] != "N/A":
         title += f" ({metadata['FILTER_DESCRIPTION']}: {chart_filter})"
 
@@ -47,15 +49,14 @@ def create_chart(graph_name, chart_filter=None):
     if (
         "date" in metadata["X_AXIS_DESCRIPTION"].lower()
         or "date" in metadata["Y_AXIS_DESCRIPTION"].lower()
+        or "date" in (metadata["X_AXIS_KIND"], metadata["Y_AXIS_KIND"])
     ):
         is_time_series = True
-        # Convert date strings to datetime objects for proper sorting
-        if not all(pd.isna(df["X_AXIS"])):
-            df["X_AXIS"] = pd.to_datetime(df["X_AXIS"], errors="coerce")
-            df = df.sort_values("X_AXIS")
-        if not all(pd.isna(df["Y_AXIS"])):
-            df["Y_AXIS"] = pd.to_datetime(df["Y_AXIS"], errors="coerce")
-            df = df.sort_values("Y_AXIS")
+        # Dates, years included, were parsed at ingest and the rows arrive in
+        # date order; axes with no values or other values keep their own
+        for axis in ("X_AXIS", "Y_AXIS"):
+            if metadata[f"{axis}_KIND"] == "date":
+                df[axis] = df[f"{axis}_DATE"]
 
     # Case 1: Both X and Y axes have values - create a matrix/table view
     if (
@@ -221,3 +222,81 @@ def create_chart(graph_name, chart_filter=None):
         fig.update_xaxes(tickformat="%b %Y", tickangle=45)
 
     return dcc.Graph(figure=fig)
+
+
+# Heatmap values and colors for each mart status in the run trend
+MART_STATUS_LEVELS = {"pass": 0, "warn": 1, "fail": 2}
+MART_STATUS_COLORS = ["#28a745", "#ffc107", "#dc3545"]
+
+
+def create_run_trend_chart(trend, mart_trend):
+    """Create the grade and mart status timeline from per-run summaries."""
+    if trend.empty:
+        return html.Div("No runs have been recorded yet.")
+
+    run_labels = [f"Run {run_id}" for run_id in trend["RUN_ID"]]
+    hover_dates = trend["GENERATED_AT"].fillna(trend["LOADED_AT"])
+
+    failures = go.Figure()
+    for severity, color in SEVERITY_COLORS.items():
+        failures.add_trace(
+            go.Bar(
+                x=run_labels,
+                y=trend[f"SEV{severity}_FAILURES"],
+                name=f"Severity {severity}",
+                marker_color=color,
+                customdata=hover_dates,
+                hovertemplate="%{x} (%{customdata}): %{y} failing<extra></extra>",
+            )
+        )
+    # Show each run's grade above its bar
+    failures.add_trace(
+        go.Scatter(
+            x=run_labels,
+            y=trend["FAILING_COUNT"],
+            text=trend["GRADE"],
+            mode="text",
+            textposition="top center",
+            showlegend=False,
+            hoverinfo="skip",
+        )
+    )
+    failures.update_layout(
+        title="Failing Tests and Grade by Run",
+        barmode="stack",
+        template="plotly_white",
+        margin=dict(l=40, r=40, t=60, b=40),
+        yaxis_title="Failing tests",
+    )
+
+    graphs = [dcc.Graph(figure=failures)]
+    if not mart_trend.empty:
+        statuses = mart_trend.pivot(index="MART", columns="RUN_ID", values="STATUS")
+        statuses = statuses.reindex(columns=trend["RUN_ID"])
+        marts = go.Figure(
+            go.Heatmap(
+                z=statuses.apply(lambda column: column.map(MART_STATUS_LEVELS)).values,
+                x=run_labels,
+                y=[mart_display_name(mart) for mart in statuses.index],
+                text=statuses.values,
+                hovertemplate="%{y}, %{x}: %{text}<extra></extra>",
+                colorscale=[
+                    [0.0, MART_STATUS_COLORS[0]],
+                    [0.5, MART_STATUS_COLORS[1]],
+                    [1.0, MART_STATUS_COLORS[2]],
+                ],
+                zmin=0,
+                zmax=2,
+                showscale=False,
+                xgap=1,
+                ygap=1,
+            )
+        )
+        marts.update_layout(
+            title="Data Mart Status by Run",
+            template="plotly_white",
+            margin=dict(l=40, r=40, t=60, b=40),
+        )
+        graphs.append(dcc.Graph(figure=marts))
+
+    return html.Div(graphs)
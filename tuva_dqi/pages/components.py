@@ -2,6 +2,16 @@ import dash
 import dash_bootstrap_components as dbc
 from dash import html
 
+# Colour of a failing test at each severity level, used for the rows of the
+# test explorers and the bars of the run trend
+SEVERITY_COLORS = {
+    1: "#ffcccc",
+    2: "#ffe6cc",
+    3: "#ffffcc",
+    4: "#e6ffcc",
+    5: "#ccffcc",
+}
+
 
 def get_navbar_component() -> dbc.Navbar:
     navbar = dbc.Navbar(
@@ -1,6 +1,4 @@
-import base64
-import io
-import json
+import re
 import traceback
 from datetime import datetime, timezone
 
@@ -10,160 +8,333 @@ import pandas as pd
 import pytz
 from dash import ALL, Input, Output, State, callback, ctx, dash_table, dcc, html
 
-from db import get_db_connection
-from pages.charts import create_chart
+from db import mart_display_name
+from pages.charts import create_chart, create_run_trend_chart
+from pages.components import SEVERITY_COLORS
 from services.dqi_service import (
-    get_available_charts,
-    get_chart_filter_values,
-    get_data_availability,
-    get_data_from_test_results,
-    get_data_quality_grade,
-    get_last_test_run_time,
-    get_mart_statuses,
-    get_mart_tests,
-    get_outstanding_errors,
-    get_tests_completed_count,
+    TEST_PAGE_SIZE,
+    get_chart_info,
+    get_dashboard_snapshot,
+    get_test_detail,
+    get_test_explorer_page,
 )
+from services.history_service import (
+    diff_runs,
+    get_mart_status_trend,
+    get_run_trend,
+    get_runs,
+)
+from services.ingest_service import INGEST_INCREMENTAL, INGEST_REPLACE
+from services.job_service import (
+    JOB_FAILED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    get_ingest_job,
+    submit_ingest_job,
+)
+from services.search_service import SEARCH_FACETS, SINGLE_VALUE_FACETS, search_tests
 
 # Register the page
 dash.register_page(__name__, path="/analytics", name="DQI Dashboard")
 
 
-def create_test_table(df, table_type):
-    if df.empty:
-        return html.P(f"No {table_type} tests found for this data mart.")
+# Test explorers, each a table of tests paged, sorted and filtered in SQL
+EXPLORER_IDS = [
+    "error-explorer",
+    "failing-explorer",
+    "passing-explorer",
+    "search-explorer",
+]
+
+# Headings of the test explorer columns
+EXPLORER_HEADINGS = {
+    "SEVERITY_LEVEL": "Severity",
+    "TABLE_NAME": "Table",
+    "TEST_COLUMN_NAME": "Column",
+    "TEST_ORIGINAL_NAME": "Test Name",
+    "TEST_TYPE": "Test Type",
+    "TEST_SUB_TYPE": "Test Sub Type",
+    "TEST_CATEGORY": "Category",
+    "STATUS": "Status",
+}
+
+# Headings of the test search facets
+SEARCH_FACET_HEADINGS = {
+    "TABLE_NAME": "Table",
+    "TEST_COLUMN_NAME": "Column",
+    "QUALITY_DIMENSION": "Quality Dimension",
+    "TEST_CATEGORY": "Category",
+    "MART": "Data Mart",
+    "SEVERITY_LEVEL": "Severity",
+}
+
+# Colour marking a passing test's severity level
+PASSING_SEVERITY_COLORS = {
+    1: "#dc3545",
+    2: "#fd7e14",
+    3: "#ffc107",
+    4: "#20c997",
+    5: "#20c997",
+}
+
+# Filter operators of the DataTable query syntax and the comparison each makes;
+# their case sensitive ("s") and insensitive ("i") forms compare the same way
+FILTER_QUERY_OPERATORS = {
+    "contains": "contains",
+    "eq": "=",
+    "=": "=",
+    "ne": "!=",
+    "!=": "!=",
+    "lt": "<",
+    "<": "<",
+    "le": "<=",
+    "<=": "<=",
+    "gt": ">",
+    ">": ">",
+    "ge": ">=",
+    ">=": ">=",
+}
+
+# Headings and columns shown for each category of the run comparison
+DIFF_SECTIONS = {
+    "new_failures": (
+        "New Failures",
+        [
+            "TARGET_SEVERITY_LEVEL",
+            "TABLE_NAME",
+            "TEST_NAME",
+            "BASE_STATUS",
+            "TARGET_STATUS",
+        ],
+    ),
+    "resolved": (
+        "Resolved",
+        [
+            "BASE_SEVERITY_LEVEL",
+            "TABLE_NAME",
+            "TEST_NAME",
+            "BASE_STATUS",
+            "TARGET_STATUS",
+        ],
+    ),
+    "severity_changed": (
+        "Severity Changed",
+        ["TABLE_NAME", "TEST_NAME", "BASE_SEVERITY_LEVEL", "TARGET_SEVERITY_LEVEL"],
+    ),
+    "failures_changed": (
+        "Failures Changed",
+        ["TABLE_NAME", "TEST_NAME", "BASE_FAILURES", "TARGET_FAILURES"],
+    ),
+    "removed": (
+        "Removed",
+        ["BASE_SEVERITY_LEVEL", "TABLE_NAME", "TEST_NAME", "BASE_STATUS"],
+    ),
+}
+
+
+def create_test_explorer(explorer_id, passing=False):
+    """Create a test explorer table whose pages are fetched by a callback.
+
+    Clicking a cell opens the details of its test.
+    """
+    if passing:
+        # For passing tests, mark the severity with a coloured left border
+        row_styles = [
+            {
+                "if": {
+                    "filter_query": f"{{SEVERITY_LEVEL}} = {severity}",
+                    "column_id": "SEVERITY_LEVEL",
+                },
+                "borderLeft": f"5px solid {color}",
+            }
+            for severity, color in PASSING_SEVERITY_COLORS.items()
+        ]
+    else:
+        # For failing tests, use the background color approach
+        row_styles = [
+            {
+                "if": {"filter_query": f"{{SEVERITY_LEVEL}} = {severity}"},
+                "backgroundColor": color,
+            }
+            for severity, color in SEVERITY_COLORS.items()
+        ]
+
+    return dash_table.DataTable(
+        id=explorer_id,
+        columns=[
+            {
+                "name": heading,
+                "id": column,
+                "type": "numeric" if column == "SEVERITY_LEVEL" else "text",
+            }
+            for column, heading in EXPLORER_HEADINGS.items()
+        ],
+        page_current=0,
+        page_size=TEST_PAGE_SIZE,
+        page_action="custom",
+        sort_action="custom",
+        sort_mode="multi",
+        sort_by=[],
+        filter_action="custom",
+        filter_query="",
+        style_table={"overflowX": "auto"},
+        style_cell={
+            "overflow": "hidden",
+            "textOverflow": "ellipsis",
+            "maxWidth": 0,
+            "cursor": "pointer",
+        },
+        style_data_conditional=row_styles,
+    )
+
 
-    # Store the full dataframe in a hidden div for later use
-    hidden_data = html.Div(
-        id=f"hidden-{table_type}-data",
-        style={"display": "none"},
-        children=json.dumps(df.to_dict("records")),
+def parse_filter_query(filter_query):
+    """Split a DataTable filter query into (column, operator, value) filters."""
+    filters = []
+    for part in (filter_query or "").split(" && "):
+        match = re.fullmatch(r"\s*\{(\w+)\}\s*(\S+)\s*(.*?)\s*", part)
+        if not match:
+            continue
+        column, operator, value = match.groups()
+        if operator[:1] in ("i", "s") and operator[1:] in FILTER_QUERY_OPERATORS:
+            operator = operator[1:]
+        if operator not in FILTER_QUERY_OPERATORS:
+            raise ValueError(f"Unsupported filter: {part}")
+
+        if value[:1] == value[-1:] and value[:1] in ("'", '"', "`"):
+            value = value[1:-1]
+        elif column == "SEVERITY_LEVEL":
+            number = pd.to_numeric(value, errors="coerce")
+            if pd.isna(number):
+                raise ValueError(f"Severity must be a number: {part}")
+            value = float(number)
+        filters.append((column, FILTER_QUERY_OPERATORS[operator], value))
+    return tuple(filters)
+
+
+def explorer_sort_by(sort_by):
+    """Convert a DataTable sort_by into (column, direction) pairs."""
+    return tuple((sort["column_id"], sort["direction"]) for sort in sort_by or [])
+
+
+def explorer_data(page, page_size):
+    """Convert a page of tests into explorer data and a page count."""
+    rows = page["rows"].rename(columns={"UNIQUE_ID": "id"})
+    return rows.astype(object).fillna("").to_dict("records"), max(
+        1, -(-page["total"] // page_size)
     )
 
-    # Create a list of rows with buttons
-    rows = []
-    for i, row in df.iterrows():
-        if i >= 10:  # Only create the first 10 rows initially
-            break
 
-        severity_level = (
-            int(row["SEVERITY_LEVEL"]) if pd.notna(row["SEVERITY_LEVEL"]) else 0
-        )
+def explorer_page_current(explorer_id, page_current, *query_prop_ids) -> int:
+    """Get the explorer page to load, going back to the first for a new query.
 
-        # Different styling for passing vs failing tests
-        if table_type == "passing":
-            # For passing tests, use a left border with severity color
-            row_style = {
-                "className": f"mb-2 border-bottom pb-2 passing-test-row passing-severity-{severity_level}"
-            }
-        else:
-            # For failing tests, use the background color approach
-            row_style = {
-                "className": "mb-2 border-bottom pb-2",
-                "style": {
-                    "backgroundColor": "#ffcccc"
-                    if severity_level == 1
-                    else "#ffe6cc"
-                    if severity_level == 2
-                    else "#ffffcc"
-                    if severity_level == 3
-                    else "#e6ffcc"
-                    if severity_level == 4
-                    else "#ccffcc"
-                    if severity_level == 5
-                    else "white"
-                },
-            }
+    The explorer's sort order and filter start a new query, as do the
+    properties of ``query_prop_ids``, given as "component_id.property".
+    """
+    new_query = {f"{explorer_id}.sort_by", f"{explorer_id}.filter_query"}
+    if new_query.union(query_prop_ids) & set(ctx.triggered_prop_ids):
+        return 0
+    return page_current or 0
+
+
+def load_explorer_page(status, mart, page_current, page_size, sort_by, filter_query):
+    """Fetch a page of tests for an explorer as its data and page count."""
+    page = get_test_explorer_page(
+        status=status,
+        mart=mart,
+        filters=parse_filter_query(filter_query),
+        sort_by=explorer_sort_by(sort_by),
+        page=(page_current or 0) + 1,
+        page_size=page_size,
+    )
+    return explorer_data(page, page_size)
+
+
+def create_search_facets():
+    """Create a checklist of values for each test search facet.
 
-        rows.append(
-            dbc.Row(
+    Facets in ``SINGLE_VALUE_FACETS`` get radio items instead.
+    """
+    return dbc.Row(
+        [
+            dbc.Col(
                 [
-                    dbc.Col(
-                        str(severity_level),
-                        width=1,
-                        className="align-self-center table-cell",
-                    ),
-                    dbc.Col(
-                        row["TABLE_NAME"],
-                        width=2,
-                        className="align-self-center table-cell",
-                    ),
-                    dbc.Col(
-                        row["TEST_COLUMN_NAME"],
-                        width=2,
-                        className="align-self-center table-cell",
-                    ),
-                    dbc.Col(
-                        row["TEST_ORIGINAL_NAME"],
-                        width=2,
-                        className="align-self-center table-cell",
-                    ),
-                    dbc.Col(
-                        row["TEST_TYPE"],
-                        width=2,
-                        className="align-self-center table-cell",
-                    ),
-                    dbc.Col(
-                        row["TEST_SUB_TYPE"] if pd.notna(row["TEST_SUB_TYPE"]) else "",
-                        width=2,
-                        className="align-self-center table-cell",
-                    ),
-                    dbc.Col(
-                        dbc.Button(
-                            "More Info",
-                            id={"type": f"{table_type}-info-button", "index": i},
-                            color="info",
-                            size="sm",
-                            className="my-1",
+                    html.H6(SEARCH_FACET_HEADINGS[facet]),
+                    html.Div(
+                        (
+                            dcc.RadioItems
+                            if facet in SINGLE_VALUE_FACETS
+                            else dcc.Checklist
+                        )(
+                            id={"type": "search-facet", "index": facet},
+                            options=[],
+                            value="" if facet in SINGLE_VALUE_FACETS else [],
+                            labelStyle={"display": "block"},
+                            inputClassName="mr-2",
                         ),
-                        width=1,
-                        className="d-flex align-items-center",
+                        style={"maxHeight": "200px", "overflowY": "auto"},
                     ),
                 ],
-                **row_style,
+                md=4,
+                lg=2,
+                className="mb-3",
             )
-        )
+            for facet in SEARCH_FACETS
+        ]
+    )
 
-    # Create a header row
-    header = dbc.Row(
-        [
-            dbc.Col(html.Strong("Severity"), width=1, className="table-cell"),
-            dbc.Col(html.Strong("Table"), width=2, className="table-cell"),
-            dbc.Col(html.Strong("Column"), width=2, className="table-cell"),
-            dbc.Col(html.Strong("Test Name"), width=2, className="table-cell"),
-            dbc.Col(html.Strong("Test Type"), width=2, className="table-cell"),
-            dbc.Col(html.Strong("Test Sub Type"), width=2, className="table-cell"),
-            dbc.Col(html.Strong("Actions"), width=1, className="table-cell"),
-        ],
-        className="mb-2 border-bottom pb-2 font-weight-bold",
+
+def selected_facet_values(value):
+    """Get the values chosen in a facet's checklist or radio items as a list."""
+    if isinstance(value, list):
+        return value
+    return [value] if value not in (None, "") else []
+
+
+def create_facet_options(facet, counts, selected):
+    """Create the checklist options of a facet, labelled with their counts.
+
+    Selected values outside the most common ones stay listed, so they can
+    still be cleared.
+    """
+    options = [
+        {
+            "label": f"{search_facet_label(facet, value)} ({tests:,})",
+            "value": value,
+        }
+        for value, tests in counts
+    ]
+    counted = {value for value, _ in counts}
+    options.extend(
+        {"label": search_facet_label(facet, value), "value": value}
+        for value in selected
+        if value not in counted
     )
+    if facet in SINGLE_VALUE_FACETS:
+        options.insert(0, {"label": "All", "value": ""})
+    return options
 
-    # Combine header and rows
-    table_content = [header] + rows
 
-    # Create a container for the table with pagination
-    table_container = html.Div(
+def search_facet_label(facet, value):
+    if facet == "MART":
+        return mart_display_name(value)
+    return str(value)
+
+
+def create_affected_marts(marts):
+    """List a test's data marts, as (mart, display name) pairs, for its details."""
+    if not marts:
+        return html.P("None")
+    return dbc.Row(
         [
-            hidden_data,
-            html.Div(
-                table_content, id=f"{table_type}-tests-table-content"
-            ),  # Add an ID for updating
-            dbc.Pagination(
-                id=f"{table_type}-pagination",
-                max_value=max(
-                    1, (len(df) + 9) // 10
-                ),  # Ceiling division to get number of pages
-                first_last=True,
-                previous_next=True,
-                active_page=1,
+            dbc.Col(
+                html.Div([html.I(className="fas fa-database text-danger mr-2"), name]),
+                width=4,
             )
-            if len(df) > 10
-            else html.Div(),
+            for _, name in marts
         ]
     )
 
-    return table_container
-
 
 def create_test_modal_content(row):
     """Helper function to create modal content for a test."""
@@ -258,162 +429,167 @@ def create_test_modal_content(row):
     return modal_content
 
 
-def chat_data_table(contents, filename):
-    content_type, content_string = contents.split(",")
-    decoded = base64.b64decode(content_string)
+def load_stats_message(stats):
+    """Format load statistics for display after an upload."""
+    return (
+        f"Loaded in {stats['seconds']} seconds "
+        f"({stats['rows_per_second']:,} rows/sec)."
+    )
 
-    try:
-        if "csv" in filename:
-            # Read the CSV file into a pandas DataFrame
-            df = pd.read_csv(io.StringIO(decoded.decode("utf-8")))
 
-            # Convert all column names to uppercase
-            df.columns = [col.upper() for col in df.columns]
+def create_upload_summary(summary, filename):
+    """Render the outcome of a streamed upload."""
+    if summary["file_type"] is None:
+        return html.Div(
+            [
+                html.H5(f"Uploaded: {filename}"),
+                html.Hr(),
+                html.P(
+                    "Unrecognized CSV format. Please upload either a test results file or chart data file."
+                ),
+            ]
+        )
 
-            # Check if this is a chart data file or test results file
-            if "DATA_QUALITY_CATEGORY" in df.columns and "GRAPH_NAME" in df.columns:
-                # This is a chart data file
-                conn = get_db_connection()
+    if summary.get("skipped"):
+        return html.Div(
+            [
+                html.H5(f"Uploaded: {filename}"),
+                html.Hr(),
+                html.P(
+                    "This file is identical to the last one loaded, so the database was left unchanged."
+                ),
+            ]
+        )
 
-                # Get the schema columns for chart_data
-                cursor = conn.cursor()
-                cursor.execute("PRAGMA table_info(chart_data)")
-                schema_columns = [row[1] for row in cursor.fetchall()]
+    if summary["file_type"] == "chart_data":
+        title = f"Uploaded Chart Data: {filename}"
+        details = [
+            html.P(f"{summary['rows']} data points imported successfully to database."),
+            html.P(load_stats_message(summary)),
+            html.P(f"Detected {summary['graph_count']} unique charts."),
+        ]
+    else:
+        title = f"Uploaded Test Results: {filename}"
+        if summary["has_severity"]:
+            severity_message = f"Filtered out {summary['removed_rows']} records with severity level outside range 1-5."
+        else:
+            severity_message = (
+                "Warning: SEVERITY_LEVEL column not found. All records imported."
+            )
+        details = [
+            html.P(
+                f"{summary['rows']} test results imported successfully to database."
+            ),
+            html.P(load_stats_message(summary)),
+            html.P(severity_message),
+        ]
+        if summary.get("mode") == INGEST_INCREMENTAL:
+            details.append(
+                html.P(
+                    f"Incremental update: {summary['inserted']:,} inserted, "
+                    f"{summary['updated']:,} updated, "
+                    f"{summary['unchanged']:,} unchanged, "
+                    f"{summary['deleted']:,} deleted."
+                )
+            )
 
-                # Filter DataFrame to only include columns in the schema
-                valid_columns = [col for col in df.columns if col in schema_columns]
-                filtered_df = df[valid_columns]
+    for column, entry in summary.get("invalid_values", {}).items():
+        details.append(
+            html.P(
+                f"Warning: {entry['count']:,} {column} values could not be parsed "
+                f"and were left empty (e.g. {', '.join(entry['examples'])})."
+            )
+        )
 
-                # Drop all existing data
-                cursor.execute("DELETE FROM chart_data")
+    valid_columns = summary["valid_columns"]
+    return html.Div(
+        [
+            html.H5(title),
+            html.Hr(),
+            *details,
+            html.P(
+                f"Used {len(valid_columns)} of {summary['total_columns']} columns that match the schema."
+            ),
+            dash_table.DataTable(
+                data=summary["preview"],
+                columns=[{"name": i, "id": i} for i in valid_columns],
+                page_size=10,
+                style_table={"overflowX": "auto"},
+                style_cell={
+                    "overflow": "hidden",
+                    "textOverflow": "ellipsis",
+                    "maxWidth": 0,
+                },
+            ),
+        ]
+    )
 
-                # Insert data using parameterized queries
-                for _, row in filtered_df.iterrows():
-                    columns = ", ".join(valid_columns)
-                    placeholders = ", ".join(["?"] * len(valid_columns))
-                    sql = f"INSERT INTO chart_data ({columns}) VALUES ({placeholders})"
-                    cursor.execute(sql, tuple(row[valid_columns]))
 
-                conn.commit()
-                conn.close()
+def create_ingest_job_status(job):
+    """Render the progress panel for a running ingest job."""
+    percent = int(round(job["progress"] * 100))
+    return html.Div(
+        [
+            html.P(
+                f"Importing {job['filename']}: {job['rows_processed']:,} rows processed"
+                if job["state"] == JOB_RUNNING
+                else f"Queued {job['filename']} for import..."
+            ),
+            dbc.Progress(
+                value=percent,
+                label=f"{percent}%",
+                striped=True,
+                animated=True,
+                className="mb-2",
+            ),
+        ]
+    )
 
-                return html.Div(
-                    [
-                        html.H5(f"Uploaded Chart Data: {filename}"),
-                        html.Hr(),
-                        html.P(
-                            f"{len(filtered_df)} data points imported successfully to database."
-                        ),
-                        html.P(
-                            f'Detected {filtered_df["GRAPH_NAME"].nunique()} unique charts.'
-                        ),
-                        html.P(
-                            f"Used {len(valid_columns)} of {len(df.columns)} columns that match the schema."
-                        ),
-                        dash_table.DataTable(
-                            data=filtered_df.head(10).to_dict("records"),
-                            columns=[{"name": i, "id": i} for i in valid_columns],
-                            page_size=10,
-                            style_table={"overflowX": "auto"},
-                            style_cell={
-                                "overflow": "hidden",
-                                "textOverflow": "ellipsis",
-                                "maxWidth": 0,
-                            },
-                        ),
-                    ]
-                )
-            elif "UNIQUE_ID" in df.columns and "TEST_NAME" in df.columns:
-                # This is a test results file
-                conn = get_db_connection()
-
-                # Get the schema columns for test_results
-                cursor = conn.cursor()
-                cursor.execute("PRAGMA table_info(test_results)")
-                schema_columns = [row[1] for row in cursor.fetchall()]
-
-                # Filter DataFrame to only include columns in the schema
-                valid_columns = [col for col in df.columns if col in schema_columns]
-                filtered_df = df[valid_columns]
-
-                # Filter records where test severity level is between 1 and 5
-                if "SEVERITY_LEVEL" in filtered_df.columns:
-                    original_count = len(filtered_df)
-                    filtered_df = filtered_df[
-                        (filtered_df["SEVERITY_LEVEL"] >= 1)
-                        & (filtered_df["SEVERITY_LEVEL"] <= 5)
-                    ]
-                    filtered_count = len(filtered_df)
-                    severity_message = f"Filtered out {original_count - filtered_count} records with severity level outside range 1-5."
-                else:
-                    severity_message = "Warning: SEVERITY_LEVEL column not found. All records imported."
 
-                # Drop all existing data
-                cursor.execute("DELETE FROM test_results")
+def create_ingest_job_error(job):
+    """Render the details of a failed ingest job."""
+    message, _, details = (job["error"] or "").partition("\n\n")
+    return html.Div(
+        [
+            html.H5(f"Error processing {job['filename']}"),
+            html.Hr(),
+            html.P(f"Error: {message}"),
+            html.Pre(details),
+        ]
+    )
 
-                # Insert data using parameterized queries
-                for _, row in filtered_df.iterrows():
-                    columns = ", ".join(valid_columns)
-                    placeholders = ", ".join(["?"] * len(valid_columns))
-                    sql = (
-                        f"INSERT INTO test_results ({columns}) VALUES ({placeholders})"
-                    )
-                    cursor.execute(sql, tuple(row[valid_columns]))
 
-                conn.commit()
-                conn.close()
+def run_option_label(run):
+    """Label a run in the comparison dropdowns."""
+    generated_at = run["GENERATED_AT"] or "unknown generation time"
+    return (
+        f"Run {run['RUN_ID']}: {generated_at} "
+        f"(uploaded {run['LOADED_AT']}, {run['TEST_COUNT']:,} tests)"
+    )
 
-                return html.Div(
-                    [
-                        html.H5(f"Uploaded Test Results: {filename}"),
-                        html.Hr(),
-                        html.P(
-                            f"{len(filtered_df)} test results imported successfully to database."
-                        ),
-                        html.P(severity_message),
-                        html.P(
-                            f"Used {len(valid_columns)} of {len(df.columns)} columns that match the schema."
-                        ),
-                        dash_table.DataTable(
-                            data=filtered_df.head(10).to_dict("records"),
-                            columns=[{"name": i, "id": i} for i in valid_columns],
-                            page_size=10,
-                            style_table={"overflowX": "auto"},
-                            style_cell={
-                                "overflow": "hidden",
-                                "textOverflow": "ellipsis",
-                                "maxWidth": 0,
-                            },
-                        ),
-                    ]
-                )
-            else:
-                return html.Div(
-                    [
-                        html.H5(f"Uploaded: {filename}"),
-                        html.Hr(),
-                        html.P(
-                            "Unrecognized CSV format. Please upload either a test results file or chart data file."
-                        ),
-                    ]
-                )
+
+def create_run_diff_content(diff):
+    """Render the outcome of a run comparison as one tab per category."""
+    tabs = []
+    for category, (heading, columns) in DIFF_SECTIONS.items():
+        df = diff[category]
+        if df.empty:
+            content = html.P("No tests in this category.", className="mt-3")
         else:
-            return html.Div(
-                [
-                    html.H5(f"Uploaded: {filename}"),
-                    html.Hr(),
-                    html.P("Only CSV files are supported."),
-                ]
+            content = dash_table.DataTable(
+                data=df[columns].astype(object).fillna("").to_dict("records"),
+                columns=[{"name": col, "id": col} for col in columns],
+                page_size=10,
+                sort_action="native",
+                style_table={"overflowX": "auto"},
+                style_cell={
+                    "overflow": "hidden",
+                    "textOverflow": "ellipsis",
+                    "maxWidth": 0,
+                },
             )
-    except Exception as e:
-        return html.Div(
-            [
-                html.H5(f"Error processing {filename}"),
-                html.Hr(),
-                html.P(f"Error: {str(e)}"),
-                html.Pre(traceback.format_exc()),
-            ]
-        )
+        tabs.append(dbc.Tab(content, label=f"{heading} ({len(df):,})", tab_id=category))
+    return dbc.Tabs(tabs, active_tab="new_failures")
 
 
 #
@@ -464,7 +640,41 @@ layout = html.Div(
                                         className="upload-area",
                                         multiple=False,
                                     ),
+                                    dbc.RadioItems(
+                                        id="ingest-mode",
+                                        options=[
+                                            {
+                                                "label": "Replace all test results",
+                                                "value": INGEST_REPLACE,
+                                            },
+                                            {
+                                                "label": "Incremental update (only changed tests)",
+                                                "value": INGEST_INCREMENTAL,
+                                            },
+                                        ],
+                                        value=INGEST_REPLACE,
+                                        inline=True,
+                                    ),
+                                    dbc.Checklist(
+                                        id="ingest-delete-missing",
+                                        options=[
+                                            {
+                                                "label": "Remove tests missing from the file",
+                                                "value": "delete",
+                                            }
+                                        ],
+                                        value=[],
+                                        switch=True,
+                                        className="mb-2",
+                                    ),
+                                    html.Div(id="ingest-job-status"),
                                     html.Div(id="output-data-upload"),
+                                    dcc.Store(id="ingest-job-id"),
+                                    dcc.Interval(
+                                        id="ingest-job-interval",
+                                        interval=1000,
+                                        disabled=True,
+                                    ),
                                 ]
                             ),
                         ],
@@ -585,7 +795,74 @@ layout = html.Div(
                             id="refresh-button",
                             className="btn btn-primary mb-3",
                         ),
-                        html.Div(id="outstanding-errors-table"),
+                        dcc.Store(id="dashboard-data-version"),
+                        dcc.Dropdown(
+                            id="error-explorer-mart",
+                            placeholder="All data marts",
+                            className="mb-3",
+                        ),
+                        html.Div(id="error-explorer-message"),
+                        create_test_explorer("error-explorer"),
+                    ]
+                ),
+            ],
+            className="mb-4",
+        ),
+        # Faceted search over every test
+        dbc.Card(
+            [
+                dbc.CardHeader("Test Search", className="bg-info text-white"),
+                dbc.CardBody(
+                    [
+                        create_search_facets(),
+                        html.Div(id="search-summary", className="mb-2"),
+                        create_test_explorer("search-explorer"),
+                    ]
+                ),
+            ],
+            className="mb-4",
+        ),
+        # Grade and mart status timeline
+        dbc.Card(
+            [
+                dbc.CardHeader("Quality Trend", className="bg-primary text-white"),
+                dbc.CardBody([html.Div(id="run-trend-display")]),
+            ],
+            className="mb-4",
+        ),
+        # Run-over-run comparison
+        dbc.Card(
+            [
+                dbc.CardHeader("Run Comparison", className="bg-primary text-white"),
+                dbc.CardBody(
+                    [
+                        html.P("Compare the test results of two uploads:"),
+                        dbc.Row(
+                            [
+                                dbc.Col(
+                                    [
+                                        html.Label("Base run"),
+                                        dcc.Dropdown(
+                                            id="diff-base-run",
+                                            placeholder="Select a run",
+                                        ),
+                                    ],
+                                    width=6,
+                                ),
+                                dbc.Col(
+                                    [
+                                        html.Label("Compared run"),
+                                        dcc.Dropdown(
+                                            id="diff-target-run",
+                                            placeholder="Select a run",
+                                        ),
+                                    ],
+                                    width=6,
+                                ),
+                            ],
+                            className="mb-3",
+                        ),
+                        html.Div(id="run-diff-display"),
                     ]
                 ),
             ],
@@ -625,17 +902,21 @@ layout = html.Div(
         dbc.Modal(
             [
                 dbc.ModalHeader(id="mart-modal-header"),
+                # The mart whose tests are shown, for paging through them
+                dcc.Store(id="mart-modal-mart"),
                 dbc.ModalBody(
                     [
                         dbc.Tabs(
                             [
                                 dbc.Tab(
-                                    html.Div(id="mart-failing-tests"),
+                                    create_test_explorer("failing-explorer"),
                                     label="Failing Tests",
                                     tab_id="failing-tab",
                                 ),
                                 dbc.Tab(
-                                    html.Div(id="mart-passing-tests"),
+                                    create_test_explorer(
+                                        "passing-explorer", passing=True
+                                    ),
                                     label="Passing Tests",
                                     tab_id="passing-tab",
                                 ),
@@ -672,79 +953,135 @@ layout = html.Div(
 #
 
 
-# Callback for the file upload
+# Callback for the file upload: queue a background ingest job and return immediately
 @callback(
-    Output("output-data-upload", "children"),
+    [
+        Output("ingest-job-id", "data"),
+        Output("ingest-job-status", "children"),
+        Output("ingest-job-interval", "disabled"),
+    ],
     Input("upload-data", "contents"),
-    State("upload-data", "filename"),
+    [
+        State("upload-data", "filename"),
+        State("ingest-mode", "value"),
+        State("ingest-delete-missing", "value"),
+    ],
+    prevent_initial_call=True,
 )
-def generate_data_table(contents, filename):
-    if contents is not None:
-        return chat_data_table(contents, filename)
-    return html.Div()
+def generate_data_table(contents, filename, mode, delete_missing):
+    if contents is None:
+        return dash.no_update, dash.no_update, dash.no_update
+
+    if "csv" not in filename:
+        return (
+            None,
+            html.Div(
+                [
+                    html.H5(f"Uploaded: {filename}"),
+                    html.Hr(),
+                    html.P("Only CSV files are supported."),
+                ]
+            ),
+            True,
+        )
+
+    try:
+        job_id = submit_ingest_job(
+            contents,
+            filename,
+            mode=mode or INGEST_REPLACE,
+            delete_missing="delete" in (delete_missing or []),
+        )
+        return job_id, create_ingest_job_status(get_ingest_job(job_id)), False
+    except Exception as e:
+        return None, html.P(f"Error queuing upload: {str(e)}"), True
 
 
-# Callback for the database preview
+# Callback polling the ingest job; the upload output only changes once the job
+# finishes, so the dashboard refreshes once with the new data
 @callback(
-    Output("database-preview", "children"),
-    Input("refresh-button", "n_clicks"),
-    Input("output-data-upload", "children"),  # Refresh when new data is uploaded
+    [
+        Output("ingest-job-status", "children", allow_duplicate=True),
+        Output("output-data-upload", "children"),
+        Output("ingest-job-interval", "disabled", allow_duplicate=True),
+    ],
+    Input("ingest-job-interval", "n_intervals"),
+    State("ingest-job-id", "data"),
+    prevent_initial_call=True,
 )
-def update_database_preview(n_clicks, upload_output):
-    try:
-        df = get_data_from_test_results(limit=10)
-        if df.empty:
-            return html.P("No data in the database yet. Please upload a CSV file.")
+def poll_ingest_job(n_intervals, job_id):
+    if not job_id:
+        return dash.no_update, dash.no_update, True
 
-        # Select a subset of columns for better display
-        display_columns = [
-            "UNIQUE_ID",
-            "TABLE_NAME",
-            "TEST_NAME",
-            "TEST_COLUMN_NAME",
-            "SEVERITY",
-            "QUALITY_DIMENSION",
-            "STATUS",
-        ]
+    job = get_ingest_job(job_id)
+    if job is None:
+        return html.P("Upload job not found."), dash.no_update, True
 
-        display_df = (
-            df[display_columns]
-            if all(col in df.columns for col in display_columns)
-            else df
-        )
+    if job["state"] == JOB_SUCCEEDED:
+        return html.Div(), create_upload_summary(job["result"], job["filename"]), True
 
-        return dash_table.DataTable(
-            data=display_df.to_dict("records"),
-            columns=[{"name": i, "id": i} for i in display_df.columns],
-            page_size=10,
-            style_table={"overflowX": "auto"},
-            style_cell={
-                "overflow": "hidden",
-                "textOverflow": "ellipsis",
-                "maxWidth": 0,
-            },
-            tooltip_data=[
-                {
-                    column: {"value": str(value), "type": "markdown"}
-                    for column, value in row.items()
-                }
-                for row in display_df.to_dict("records")
-            ],
-            tooltip_duration=None,
-        )
-    except Exception as e:
-        return html.P(f"Error retrieving data: {str(e)}")
+    if job["state"] == JOB_FAILED:
+        return html.Div(), create_ingest_job_error(job), True
 
+    return create_ingest_job_status(job), dash.no_update, False
 
-# Callback for the data quality grade
+
+# One callback redraws every panel from a snapshot of the data and the run
+# history. It stores the snapshot's data version, which the explorers and the
+# run comparison reload from only when the data has changed; they keep their
+# own callbacks for paging and choosing runs.
 @callback(
-    Output("data-quality-grade", "children"),
-    [Input("refresh-button", "n_clicks"), Input("output-data-upload", "children")],
+    [
+        Output("data-quality-grade", "children"),
+        Output("tests-completed-count", "children"),
+        Output("last-test-run-time", "children"),
+        Output("mart-status-display", "children"),
+        Output("error-explorer-mart", "options"),
+        Output("chart-selector", "options"),
+        Output("data-availability-display", "children"),
+        Output("dashboard-data-version", "data"),
+        Output("diff-base-run", "options"),
+        Output("diff-base-run", "value"),
+        Output("diff-target-run", "options"),
+        Output("diff-target-run", "value"),
+        Output("run-trend-display", "children"),
+    ],
+    Input("refresh-button", "n_clicks"),
+    Input("output-data-upload", "children"),  # Refresh when new data is uploaded
+    State("dashboard-data-version", "data"),
 )
-def update_data_quality_grade(n_clicks, upload_output):
+def refresh_dashboard(n_clicks, upload_output, data_version):
     try:
-        grade = get_data_quality_grade()
+        snapshot = get_dashboard_snapshot()
+    except Exception as e:
+        error = html.P(f"Error retrieving data: {str(e)}")
+        return [error] * 4 + [[], [], error] + [dash.no_update] * 6
+
+    panels = [
+        create_data_quality_grade(snapshot.grade),
+        f"{snapshot.tests_completed:,}",
+        create_last_test_run(snapshot.last_run),
+        create_mart_status(snapshot.mart_statuses),
+        create_mart_options(snapshot.mart_statuses),
+        create_chart_options(snapshot.available_charts),
+        create_data_availability(snapshot.data_availability),
+    ]
+    if data_version == list(snapshot.data_version):
+        return panels + [dash.no_update] * 6
+    return [
+        *panels,
+        list(snapshot.data_version),
+        *create_run_options(get_runs()),
+        create_run_trend_chart(get_run_trend(), get_mart_status_trend()),
+    ]
+
+
+def create_mart_options(mart_statuses):
+    return [{"label": mart_display_name(mart), "value": mart} for mart in mart_statuses]
+
 
+def create_data_quality_grade(grade):
+    try:
         # Define classes for different grades
         grade_classes = {
             "A": "grade-a",
@@ -761,28 +1098,9 @@ def update_data_quality_grade(n_clicks, upload_output):
         return html.P(f"Error: {str(e)}")
 
 
-# Callback for the tests completed count
-@callback(
-    Output("tests-completed-count", "children"),
-    [Input("refresh-button", "n_clicks"), Input("output-data-upload", "children")],
-)
-def update_tests_completed(n_clicks, upload_output):
-    try:
-        count = get_tests_completed_count()
-        return f"{count:,}"
-    except Exception as e:
-        return html.P(f"Error: {str(e)}")
-
-
-# Callback for the last test run time
-@callback(
-    Output("last-test-run-time", "children"),
-    [Input("refresh-button", "n_clicks"), Input("output-data-upload", "children")],
-)
-def update_last_test_run(n_clicks, upload_output):
+def create_last_test_run(last_run):
     try:
-        last_run = get_last_test_run_time()
-        if last_run and last_run != "No data available":
+        if last_run:
             try:
                 # Parse the timestamp (assuming it's in UTC)
                 dt = datetime.strptime(last_run, "%Y-%m-%d %H:%M:%S")
@@ -835,32 +1153,17 @@ def update_last_test_run(n_clicks, upload_output):
                 )
             except Exception as e:
                 return f"Error formatting time: {str(e)}"
-        return last_run
+        return "No data available"
     except Exception as e:
         return html.P(f"Error: {str(e)}")
 
 
-@callback(
-    Output("mart-status-display", "children"),
-    [Input("refresh-button", "n_clicks"), Input("output-data-upload", "children")],
-)
-def update_mart_status(n_clicks, upload_output):
+def create_mart_status(mart_statuses):
     try:
-        mart_statuses = get_mart_statuses()
-
         # Create a grid of cards for mart statuses
         cards = []
         for mart, status in mart_statuses.items():
-            # Format the mart name for display
-            display_name = (
-                mart.replace("_", " ")
-                .title()
-                .replace("Ccsr", "CCSR")
-                .replace("Cms", "CMS")
-                .replace("Ed", "ED")
-                .replace("Pmpm", "PMPM")
-                .replace("Hcc", "HCC")
-            )
+            display_name = mart_display_name(mart)
 
             # Choose icon and color based on status
             if status == "fail":
@@ -924,442 +1227,85 @@ def update_mart_status(n_clicks, upload_output):
         return html.P(f"Error determining mart status: {str(e)}")
 
 
+# Callback paging through the outstanding errors
 @callback(
-    Output("outstanding-errors-table", "children"),
-    [Input("refresh-button", "n_clicks"), Input("output-data-upload", "children")],
-)
-def update_outstanding_errors(n_clicks, upload_output):
-    try:
-        df = get_outstanding_errors()
-        if df.empty:
-            return html.P("No outstanding errors found.")
-
-        # Store the full dataframe in a hidden div for later use
-        hidden_data = html.Div(
-            id="hidden-error-data",
-            style={"display": "none"},
-            children=json.dumps(df.to_dict("records")),
-        )
-
-        # Create a list of rows with buttons
-        rows = []
-        for i, row in df.iterrows():
-            rows.append(
-                dbc.Row(
-                    [
-                        dbc.Col(
-                            str(int(row["SEVERITY_LEVEL"])),
-                            width=1,
-                            className="align-self-center table-cell",
-                        ),  # Convert to int
-                        dbc.Col(
-                            row["TABLE_NAME"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_COLUMN_NAME"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_ORIGINAL_NAME"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_TYPE"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_SUB_TYPE"]
-                            if pd.notna(row["TEST_SUB_TYPE"])
-                            else "",
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            dbc.Button(
-                                "More Info",
-                                id={"type": "error-info-button", "index": i},
-                                color="info",
-                                size="sm",
-                                className="my-1",  # Add vertical margin to center the button
-                            ),
-                            width=1,
-                            className="d-flex align-items-center",  # Better vertical centering
-                        ),
-                    ],
-                    className="mb-2 border-bottom pb-2",
-                    style={
-                        "backgroundColor": "#ffcccc"
-                        if row["SEVERITY_LEVEL"] == 1
-                        else "#ffe6cc"
-                        if row["SEVERITY_LEVEL"] == 2
-                        else "#ffffcc"
-                        if row["SEVERITY_LEVEL"] == 3
-                        else "#e6ffcc"
-                        if row["SEVERITY_LEVEL"] == 4
-                        else "#ccffcc"
-                        if row["SEVERITY_LEVEL"] == 5
-                        else "white"
-                    },
-                )
-            )
-
-        # Create a header row
-        header = dbc.Row(
-            [
-                dbc.Col(html.Strong("Severity"), width=1, className="table-cell"),
-                dbc.Col(html.Strong("Table"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Column"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Test Name"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Test Type"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Test Sub Type"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Actions"), width=1, className="table-cell"),
-            ],
-            className="mb-2 border-bottom pb-2 font-weight-bold",
-        )
-
-        # Combine header and rows
-        table_content = [header] + rows
-
-        # Create a container for the table with pagination
-        table_container = html.Div(
-            [
-                hidden_data,
-                html.Div(table_content[:10]),  # Show first 10 rows initially
-                dbc.Pagination(
-                    id="error-pagination",
-                    max_value=max(
-                        1, (len(rows) + 9) // 10
-                    ),  # Ceiling division to get number of pages
-                    first_last=True,
-                    previous_next=True,
-                    active_page=1,
-                )
-                if len(rows) > 10
-                else html.Div(),
-            ]
-        )
-
-        return table_container
-
-    except Exception as e:
-        return html.P(f"Error retrieving data: {str(e)}")
-
-
-# Add a callback for pagination
-@callback(
-    Output("outstanding-errors-table", "children", allow_duplicate=True),
-    [Input("error-pagination", "active_page")],
-    [State("hidden-error-data", "children")],
+    [
+        Output("error-explorer", "data"),
+        Output("error-explorer", "page_count"),
+        Output("error-explorer", "page_current"),
+        Output("error-explorer-message", "children"),
+    ],
+    [
+        Input("error-explorer", "page_current"),
+        Input("error-explorer", "page_size"),
+        Input("error-explorer", "sort_by"),
+        Input("error-explorer", "filter_query"),
+        Input("error-explorer-mart", "value"),
+        Input("dashboard-data-version", "data"),
+    ],
     prevent_initial_call=True,
 )
-def change_page(page, json_data):
-    if not page or not json_data:
-        return dash.no_update
-
+def update_error_explorer(
+    page_current, page_size, sort_by, filter_query, mart, data_version
+):
+    page_current = explorer_page_current(
+        "error-explorer", page_current, "error-explorer-mart.value"
+    )
     try:
-        # Parse the data directly as a list of dictionaries
-        data = json.loads(json_data)
-
-        # Create rows for the current page
-        rows = []
-        start_idx = (page - 1) * 10
-        end_idx = min(start_idx + 10, len(data))
-
-        for i in range(start_idx, end_idx):
-            row = data[i]
-            rows.append(
-                dbc.Row(
-                    [
-                        dbc.Col(
-                            str(row["SEVERITY_LEVEL"]),
-                            width=1,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TABLE_NAME"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_COLUMN_NAME"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_ORIGINAL_NAME"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_TYPE"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_SUB_TYPE"]
-                            if row.get("TEST_SUB_TYPE") is not None
-                            else "",
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            dbc.Button(
-                                "More Info",
-                                id={"type": "error-info-button", "index": i},
-                                color="info",
-                                size="sm",
-                                className="my-1",
-                            ),
-                            width=1,
-                            className="d-flex align-items-center",
-                        ),
-                    ],
-                    className="mb-2 border-bottom pb-2",
-                    style={
-                        "backgroundColor": "#ffcccc"
-                        if row["SEVERITY_LEVEL"] == 1
-                        else "#ffe6cc"
-                        if row["SEVERITY_LEVEL"] == 2
-                        else "#ffffcc"
-                        if row["SEVERITY_LEVEL"] == 3
-                        else "#e6ffcc"
-                        if row["SEVERITY_LEVEL"] == 4
-                        else "#ccffcc"
-                        if row["SEVERITY_LEVEL"] == 5
-                        else "white"
-                    },
-                )
-            )
-
-        # Create a header row
-        header = dbc.Row(
-            [
-                dbc.Col(html.Strong("Severity"), width=1, className="table-cell"),
-                dbc.Col(html.Strong("Table"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Column"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Test Name"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Test Type"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Test Sub Type"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Actions"), width=1, className="table-cell"),
-            ],
-            className="mb-2 border-bottom pb-2 font-weight-bold",
-        )
-
-        # Combine header and rows
-        table_content = [header] + rows
-
-        # Create a container for the table with pagination
-        table_container = html.Div(
-            [
-                html.Div(
-                    id="hidden-error-data",
-                    style={"display": "none"},
-                    children=json_data,
-                ),
-                html.Div(table_content),
-                dbc.Pagination(
-                    id="error-pagination",
-                    max_value=max(
-                        1, (len(data) + 9) // 10
-                    ),  # Ceiling division to get number of pages
-                    first_last=True,
-                    previous_next=True,
-                    active_page=page,
-                )
-                if len(data) > 10
-                else html.Div(),
-            ]
+        data, page_count = load_explorer_page(
+            "failing", mart, page_current, page_size, sort_by, filter_query
         )
-
-        return table_container
-
     except Exception as e:
-        return html.P(f"Error changing page: {str(e)}")
+        return [], 1, page_current, html.P(f"Error retrieving data: {str(e)}")
 
+    if not data and not filter_query and not mart:
+        return data, page_count, page_current, html.P("No outstanding errors found.")
+    return data, page_count, page_current, None
 
-# Callback for the "More Info" buttons
+
+# One callback opens the details of the test clicked in any explorer
 @callback(
     [
         Output("error-modal", "is_open", allow_duplicate=True),
         Output("error-modal-body", "children", allow_duplicate=True),
+        *[Output(explorer_id, "active_cell") for explorer_id in EXPLORER_IDS],
     ],
-    [Input({"type": "error-info-button", "index": dash.ALL}, "n_clicks")],
-    [State("hidden-error-data", "children"), State("error-modal", "is_open")],
+    [Input(explorer_id, "active_cell") for explorer_id in EXPLORER_IDS],
+    [State("error-modal", "is_open")],
     prevent_initial_call=True,
 )
-def toggle_error_modal(btn_clicks, json_data, is_open):
-    # Check if any button was clicked
-    if not any(btn_clicks) or not ctx.triggered:
-        return is_open, dash.no_update
+def toggle_error_modal(error_cell, failing_cell, passing_cell, search_cell, is_open):
+    # Clearing the clicked cell lets the same test be opened again
+    cleared = [None] * len(EXPLORER_IDS)
 
-    # Find which button was clicked
-    triggered_id = ctx.triggered_id
-    if triggered_id and "index" in triggered_id:
-        clicked_index = triggered_id["index"]
+    # Check if a cell was clicked rather than cleared
+    cell = ctx.triggered[0]["value"] if ctx.triggered else None
+    if cell and cell.get("row_id"):
+        clicked_id = cell["row_id"]
 
         try:
-            # Get the data for the clicked row
-            data = json.loads(json_data)
-            row = data[clicked_index]
+            # Get the data for the clicked test
+            row = get_test_detail(clicked_id)
+            if row is None:
+                return (
+                    True,
+                    html.P("This test is no longer in the database."),
+                    *cleared,
+                )
 
             # Create the modal content using our helper function
             modal_content = create_test_modal_content(row)
 
-            # Check if we have the data mart flags before adding that section
-            mart_flags_exist = all(
-                flag in row
-                for flag in [
-                    "FLAG_SERVICE_CATEGORIES",
-                    "FLAG_CCSR",
-                    "FLAG_CMS_CHRONIC_CONDITIONS",
-                    "FLAG_TUVA_CHRONIC_CONDITIONS",
-                    "FLAG_CMS_HCCS",
-                    "FLAG_ED_CLASSIFICATION",
-                    "FLAG_FINANCIAL_PMPM",
-                    "FLAG_QUALITY_MEASURES",
-                    "FLAG_READMISSION",
+            # Add the data marts the test belongs to
+            modal_content.extend(
+                [
+                    html.Hr(),
+                    html.H6("Affected Data Marts:"),
+                    create_affected_marts(row["MARTS"]),
                 ]
             )
 
-            # Add the affected data marts section if flags exist
-            if mart_flags_exist:
-                modal_content.extend(
-                    [
-                        html.Hr(),
-                        html.H6("Affected Data Marts:"),
-                        dbc.Row(
-                            [
-                                # Create icons for each affected data mart
-                                dbc.Col(
-                                    html.Div(
-                                        [
-                                            html.I(
-                                                className="fas fa-database text-danger mr-2"
-                                                if row["FLAG_SERVICE_CATEGORIES"] == 1
-                                                else "fas fa-database text-muted mr-2"
-                                            ),
-                                            "Service Categories",
-                                        ]
-                                    ),
-                                    width=4,
-                                ),
-                                dbc.Col(
-                                    html.Div(
-                                        [
-                                            html.I(
-                                                className="fas fa-database text-danger mr-2"
-                                                if row["FLAG_CCSR"] == 1
-                                                else "fas fa-database text-muted mr-2"
-                                            ),
-                                            "CCSR",
-                                        ]
-                                    ),
-                                    width=4,
-                                ),
-                                dbc.Col(
-                                    html.Div(
-                                        [
-                                            html.I(
-                                                className="fas fa-database text-danger mr-2"
-                                                if row["FLAG_CMS_CHRONIC_CONDITIONS"]
-                                                == 1
-                                                else "fas fa-database text-muted mr-2"
-                                            ),
-                                            "CMS Chronic Conditions",
-                                        ]
-                                    ),
-                                    width=4,
-                                ),
-                                dbc.Col(
-                                    html.Div(
-                                        [
-                                            html.I(
-                                                className="fas fa-database text-danger mr-2"
-                                                if row["FLAG_TUVA_CHRONIC_CONDITIONS"]
-                                                == 1
-                                                else "fas fa-database text-muted mr-2"
-                                            ),
-                                            "TUVA Chronic Conditions",
-                                        ]
-                                    ),
-                                    width=4,
-                                ),
-                                dbc.Col(
-                                    html.Div(
-                                        [
-                                            html.I(
-                                                className="fas fa-database text-danger mr-2"
-                                                if row["FLAG_CMS_HCCS"] == 1
-                                                else "fas fa-database text-muted mr-2"
-                                            ),
-                                            "CMS HCCs",
-                                        ]
-                                    ),
-                                    width=4,
-                                ),
-                                dbc.Col(
-                                    html.Div(
-                                        [
-                                            html.I(
-                                                className="fas fa-database text-danger mr-2"
-                                                if row["FLAG_ED_CLASSIFICATION"] == 1
-                                                else "fas fa-database text-muted mr-2"
-                                            ),
-                                            "ED Classification",
-                                        ]
-                                    ),
-                                    width=4,
-                                ),
-                                dbc.Col(
-                                    html.Div(
-                                        [
-                                            html.I(
-                                                className="fas fa-database text-danger mr-2"
-                                                if row["FLAG_FINANCIAL_PMPM"] == 1
-                                                else "fas fa-database text-muted mr-2"
-                                            ),
-                                            "Financial PMPM",
-                                        ]
-                                    ),
-                                    width=4,
-                                ),
-                                dbc.Col(
-                                    html.Div(
-                                        [
-                                            html.I(
-                                                className="fas fa-database text-danger mr-2"
-                                                if row["FLAG_QUALITY_MEASURES"] == 1
-                                                else "fas fa-database text-muted mr-2"
-                                            ),
-                                            "Quality Measures",
-                                        ]
-                                    ),
-                                    width=4,
-                                ),
-                                dbc.Col(
-                                    html.Div(
-                                        [
-                                            html.I(
-                                                className="fas fa-database text-danger mr-2"
-                                                if row["FLAG_READMISSION"] == 1
-                                                else "fas fa-database text-muted mr-2"
-                                            ),
-                                            "Readmission",
-                                        ]
-                                    ),
-                                    width=4,
-                                ),
-                            ]
-                        ),
-                    ]
-                )
-
-            return True, modal_content
+            return True, modal_content, *cleared
 
         except Exception as e:
             # Return an error message in the modal if something goes wrong
@@ -1369,76 +1315,9 @@ def toggle_error_modal(btn_clicks, json_data, is_open):
                 html.P(f"An error occurred: {str(e)}"),
                 html.Pre(traceback.format_exc()),
             ]
-            return True, error_content
+            return True, error_content, *cleared
 
-    return is_open, dash.no_update
-
-
-@callback(
-    [Output("error-modal", "is_open"), Output("error-modal-body", "children")],
-    [Input({"type": "failing-info-button", "index": dash.ALL}, "n_clicks")],
-    [State("hidden-failing-data", "children"), State("error-modal", "is_open")],
-    prevent_initial_call=True,
-)
-def toggle_failing_test_modal(btn_clicks, json_data, is_open):
-    # Check if any button was clicked
-    if not any(btn_clicks) or not ctx.triggered:
-        return is_open, dash.no_update
-
-    # If json_data is None, it means the component doesn't exist
-    if json_data is None:
-        return True, html.P("No failing test data available.")
-
-    # Find which button was clicked
-    triggered_id = ctx.triggered_id
-    if triggered_id and "index" in triggered_id:
-        clicked_index = triggered_id["index"]
-
-        try:
-            # Get the data for the clicked row
-            data = json.loads(json_data)
-            row = data[clicked_index]
-
-            # Create the modal content
-            modal_content = create_test_modal_content(row)
-
-            return True, modal_content
-        except Exception as e:
-            return True, html.P(f"Error loading test details: {str(e)}")
-
-    return is_open, dash.no_update
-
-
-# Callback for the "More Info" buttons in passing tests
-@callback(
-    [
-        Output("error-modal", "is_open", allow_duplicate=True),
-        Output("error-modal-body", "children", allow_duplicate=True),
-    ],
-    [Input({"type": "passing-info-button", "index": dash.ALL}, "n_clicks")],
-    [State("hidden-passing-data", "children"), State("error-modal", "is_open")],
-    prevent_initial_call=True,
-)
-def toggle_passing_test_modal(btn_clicks, json_data, is_open):
-    # Check if any button was clicked
-    if not any(btn_clicks) or not ctx.triggered:
-        return is_open, dash.no_update
-
-    # Find which button was clicked
-    triggered_id = ctx.triggered_id
-    if triggered_id and "index" in triggered_id:
-        clicked_index = triggered_id["index"]
-
-        # Get the data for the clicked row
-        data = json.loads(json_data)
-        row = data[clicked_index]
-
-        # Create the modal content
-        modal_content = create_test_modal_content(row)
-
-        return True, modal_content
-
-    return is_open, dash.no_update
+    return is_open, dash.no_update, *[dash.no_update] * len(EXPLORER_IDS)
 
 
 @callback(
@@ -1515,8 +1394,9 @@ dash.clientside_callback(
     [
         Output("mart-modal", "is_open"),
         Output("mart-modal-header", "children"),
-        Output("mart-failing-tests", "children"),
-        Output("mart-passing-tests", "children"),
+        Output("mart-modal-mart", "data"),
+        Output("failing-explorer", "page_current"),
+        Output("passing-explorer", "page_current"),
     ],
     [Input({"type": "mart-button", "index": dash.ALL}, "n_clicks")],
     prevent_initial_call=True,
@@ -1524,37 +1404,19 @@ dash.clientside_callback(
 def toggle_mart_modal(n_clicks):
     # Check if callback was triggered by an actual click
     if not ctx.triggered_id or not any(n for n in n_clicks if n):
-        return False, dash.no_update, dash.no_update, dash.no_update
+        return False, dash.no_update, dash.no_update, dash.no_update, dash.no_update
 
     # Find which button was clicked
     triggered_id = ctx.triggered_id
     if triggered_id and "index" in triggered_id:
         clicked_mart = triggered_id["index"]
 
-        # Format the mart name for display
-        display_name = (
-            clicked_mart.replace("_", " ")
-            .title()
-            .replace("Ccsr", "CCSR")
-            .replace("Cms", "CMS")
-            .replace("Ed", "ED")
-            .replace("Pmpm", "PMPM")
-            .replace("Hcc", "HCC")
-        )
-
-        # Get failing tests for this mart
-        failing_df = get_mart_tests(clicked_mart)
-
-        # Get passing tests for this mart
-        passing_df = get_mart_tests(clicked_mart, status="pass")
-
-        # Create tables for failing and passing tests
-        failing_content = create_test_table(failing_df, "failing")
-        passing_content = create_test_table(passing_df, "passing")
+        display_name = mart_display_name(clicked_mart)
 
-        return True, f"{display_name} Data Mart Tests", failing_content, passing_content
+        # The explorers load the mart's tests, starting from the first page
+        return True, f"{display_name} Data Mart Tests", clicked_mart, 0, 0
 
-    return False, dash.no_update, dash.no_update, dash.no_update
+    return False, dash.no_update, dash.no_update, dash.no_update, dash.no_update
 
 
 # Close mart modal callback
@@ -1570,224 +1432,139 @@ def close_mart_modal(close_clicks, is_open):
     return is_open
 
 
+# Callback searching the tests and counting them by every facet
 @callback(
-    Output("failing-tests-table-content", "children"),
-    [Input("failing-pagination", "active_page")],
-    [State("hidden-failing-data", "children")],
+    [
+        Output("search-explorer", "data"),
+        Output("search-explorer", "page_count"),
+        Output("search-explorer", "page_current"),
+        Output({"type": "search-facet", "index": ALL}, "options"),
+        Output("search-summary", "children"),
+    ],
+    [
+        Input({"type": "search-facet", "index": ALL}, "value"),
+        Input("search-explorer", "page_current"),
+        Input("search-explorer", "page_size"),
+        Input("search-explorer", "sort_by"),
+        Input("search-explorer", "filter_query"),
+        Input("dashboard-data-version", "data"),
+    ],
+    [State({"type": "search-facet", "index": ALL}, "id")],
     prevent_initial_call=True,
 )
-def update_failing_pagination(page, json_data):
-    if not page or not json_data:
-        return dash.no_update
+def update_test_search(
+    facet_values,
+    page_current,
+    page_size,
+    sort_by,
+    filter_query,
+    data_version,
+    facet_ids,
+):
+    facets = [facet_id["index"] for facet_id in facet_ids]
+    facet_values = [selected_facet_values(value) for value in facet_values]
+    # A new search, sort order or filter starts from the first page
+    page_current = explorer_page_current("search-explorer", page_current)
+    if isinstance(ctx.triggered_id, dict):
+        page_current = 0
 
     try:
-        # Parse the data
-        data = json.loads(json_data)
-        df = pd.DataFrame(data)
+        result = search_tests(
+            selections=tuple(
+                (facet, tuple(values))
+                for facet, values in zip(facets, facet_values)
+                if values
+            ),
+            filters=parse_filter_query(filter_query),
+            sort_by=explorer_sort_by(sort_by),
+            page=(page_current or 0) + 1,
+            page_size=page_size,
+        )
+    except Exception as e:
+        return (
+            [],
+            1,
+            page_current,
+            [dash.no_update] * len(facets),
+            html.P(f"Error searching tests: {str(e)}"),
+        )
 
-        # Create rows for the current page
-        rows = []
-        start_idx = (page - 1) * 10
-        end_idx = min(start_idx + 10, len(df))
+    data, page_count = explorer_data(result, page_size)
+    options = [
+        create_facet_options(facet, result["facets"][facet], values)
+        for facet, values in zip(facets, facet_values)
+    ]
+    return (
+        data,
+        page_count,
+        page_current,
+        options,
+        html.P(f"{result['total']:,} matching tests"),
+    )
 
-        for i in range(start_idx, end_idx):
-            row = df.iloc[i]
-            severity_level = (
-                int(row["SEVERITY_LEVEL"]) if pd.notna(row["SEVERITY_LEVEL"]) else 0
-            )
 
-            rows.append(
-                dbc.Row(
-                    [
-                        dbc.Col(
-                            str(severity_level),
-                            width=1,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TABLE_NAME"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_COLUMN_NAME"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_ORIGINAL_NAME"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_TYPE"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_SUB_TYPE"]
-                            if pd.notna(row["TEST_SUB_TYPE"])
-                            else "",
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            dbc.Button(
-                                "More Info",
-                                id={"type": "failing-info-button", "index": i},
-                                color="info",
-                                size="sm",
-                                className="my-1",
-                            ),
-                            width=1,
-                            className="d-flex align-items-center",
-                        ),
-                    ],
-                    className="mb-2 border-bottom pb-2",
-                    style={
-                        "backgroundColor": "#ffcccc"
-                        if severity_level == 1
-                        else "#ffe6cc"
-                        if severity_level == 2
-                        else "#ffffcc"
-                        if severity_level == 3
-                        else "#e6ffcc"
-                        if severity_level == 4
-                        else "#ccffcc"
-                        if severity_level == 5
-                        else "white"
-                    },
-                )
-            )
+# Callbacks paging through the failing and passing tests of the open mart
+@callback(
+    [
+        Output("failing-explorer", "data"),
+        Output("failing-explorer", "page_count"),
+        Output("failing-explorer", "page_current", allow_duplicate=True),
+    ],
+    [
+        Input("failing-explorer", "page_current"),
+        Input("failing-explorer", "page_size"),
+        Input("failing-explorer", "sort_by"),
+        Input("failing-explorer", "filter_query"),
+        Input("mart-modal-mart", "data"),
+    ],
+    prevent_initial_call=True,
+)
+def update_failing_explorer(page_current, page_size, sort_by, filter_query, mart):
+    if not mart:
+        return dash.no_update, dash.no_update, dash.no_update
 
-        # Create a header row
-        header = dbc.Row(
-            [
-                dbc.Col(html.Strong("Severity"), width=1, className="table-cell"),
-                dbc.Col(html.Strong("Table"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Column"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Test Name"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Test Type"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Test Sub Type"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Actions"), width=1, className="table-cell"),
-            ],
-            className="mb-2 border-bottom pb-2 font-weight-bold",
+    page_current = explorer_page_current("failing-explorer", page_current)
+    try:
+        data, page_count = load_explorer_page(
+            "failing", mart, page_current, page_size, sort_by, filter_query
         )
-
-        # Combine header and rows
-        table_content = [header] + rows
-        return table_content
-
     except Exception as e:
-        return html.P(f"Error changing page: {str(e)}")
+        print(f"Error loading failing tests: {str(e)}")
+        return [], 1, page_current
+    return data, page_count, page_current
 
 
 @callback(
-    Output("passing-tests-table-content", "children"),
-    [Input("passing-pagination", "active_page")],
-    [State("hidden-passing-data", "children")],
+    [
+        Output("passing-explorer", "data"),
+        Output("passing-explorer", "page_count"),
+        Output("passing-explorer", "page_current", allow_duplicate=True),
+    ],
+    [
+        Input("passing-explorer", "page_current"),
+        Input("passing-explorer", "page_size"),
+        Input("passing-explorer", "sort_by"),
+        Input("passing-explorer", "filter_query"),
+        Input("mart-modal-mart", "data"),
+    ],
     prevent_initial_call=True,
 )
-def update_passing_pagination(page, json_data):
-    if not page or not json_data:
-        return dash.no_update
+def update_passing_explorer(page_current, page_size, sort_by, filter_query, mart):
+    if not mart:
+        return dash.no_update, dash.no_update, dash.no_update
 
+    page_current = explorer_page_current("passing-explorer", page_current)
     try:
-        # Parse the data
-        data = json.loads(json_data)
-        df = pd.DataFrame(data)
-
-        # Create rows for the current page
-        rows = []
-        start_idx = (page - 1) * 10
-        end_idx = min(start_idx + 10, len(df))
-
-        for i in range(start_idx, end_idx):
-            row = df.iloc[i]
-            severity_level = (
-                int(row["SEVERITY_LEVEL"]) if pd.notna(row["SEVERITY_LEVEL"]) else 0
-            )
-
-            rows.append(
-                dbc.Row(
-                    [
-                        dbc.Col(
-                            str(severity_level),
-                            width=1,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TABLE_NAME"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_COLUMN_NAME"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_ORIGINAL_NAME"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_TYPE"],
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            row["TEST_SUB_TYPE"]
-                            if pd.notna(row["TEST_SUB_TYPE"])
-                            else "",
-                            width=2,
-                            className="align-self-center table-cell",
-                        ),
-                        dbc.Col(
-                            dbc.Button(
-                                "More Info",
-                                id={"type": "passing-info-button", "index": i},
-                                color="info",
-                                size="sm",
-                                className="my-1",
-                            ),
-                            width=1,
-                            className="d-flex align-items-center",
-                        ),
-                    ],
-                    className=f"mb-2 border-bottom pb-2 passing-test-row passing-severity-{severity_level}",
-                )
-            )
-
-        # Create a header row
-        header = dbc.Row(
-            [
-                dbc.Col(html.Strong("Severity"), width=1, className="table-cell"),
-                dbc.Col(html.Strong("Table"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Column"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Test Name"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Test Type"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Test Sub Type"), width=2, className="table-cell"),
-                dbc.Col(html.Strong("Actions"), width=1, className="table-cell"),
-            ],
-            className="mb-2 border-bottom pb-2 font-weight-bold",
+        data, page_count = load_explorer_page(
+            "passing", mart, page_current, page_size, sort_by, filter_query
         )
-
-        # Combine header and rows
-        table_content = [header] + rows
-        return table_content
-
     except Exception as e:
-        return html.P(f"Error changing page: {str(e)}")
+        print(f"Error loading passing tests: {str(e)}")
+        return [], 1, page_current
+    return data, page_count, page_current
 
 
-@callback(
-    Output("chart-selector", "options"),
-    [Input("refresh-button", "n_clicks"), Input("output-data-upload", "children")],
-)
-def update_chart_selector(n_clicks, upload_output):
-    charts_df = get_available_charts()
-
+def create_chart_options(charts_df):
     if charts_df.empty:
         return []
 
@@ -1822,21 +1599,14 @@ def update_chart_filter(selected_chart):
     if not selected_chart:
         return html.Div()
 
-    # Get filter values for this chart
-    filter_values = get_chart_filter_values(selected_chart)
+    # Get the filter values and description from the chart's catalog entry
+    chart_info = get_chart_info(selected_chart)
 
-    if not filter_values:
+    if chart_info is None or not chart_info["FILTER_VALUES"]:
         # Return an empty div if there are no filter values
         return html.Div()
 
-    # Get chart metadata to display filter description
-    charts_df = get_available_charts()
-    chart_info = charts_df[charts_df["GRAPH_NAME"] == selected_chart]
-
-    if chart_info.empty:
-        return html.Div()
-
-    chart_info = chart_info.iloc[0]
+    filter_values = chart_info["FILTER_VALUES"]
     filter_description = chart_info["FILTER_DESCRIPTION"]
 
     # Create filter dropdown with a pattern-matching ID
@@ -1873,13 +1643,7 @@ def update_chart_display(selected_chart, filter_values, filter_container):
     return create_chart(selected_chart, filter_values[0])
 
 
-@callback(
-    Output("data-availability-display", "children"),
-    [Input("refresh-button", "n_clicks"), Input("output-data-upload", "children")],
-)
-def update_data_availability(n_clicks, upload_output):
-    availability = get_data_availability()
-
+def create_data_availability(availability):
     # Create badges for different data types
     test_results_badge = dbc.Badge(
         f"{availability['test_results']} records",
@@ -1954,3 +1718,31 @@ def update_data_availability(n_clicks, upload_output):
         )
 
     return html.Div(cards)
+
+
+def create_run_options(runs):
+    """Create the options and default values of the run comparison dropdowns."""
+    if runs.empty:
+        return [], None, [], None
+
+    options = [
+        {"label": run_option_label(run), "value": int(run["RUN_ID"])}
+        for _, run in runs.iterrows()
+    ]
+    # Default to comparing the latest run with the one before it
+    latest = options[0]["value"]
+    previous = options[1]["value"] if len(options) > 1 else latest
+    return options, previous, options, latest
+
+
+# Callback to compare the two selected runs
+@callback(
+    Output("run-diff-display", "children"),
+    [Input("diff-base-run", "value"), Input("diff-target-run", "value")],
+)
+def update_run_diff(base_run_id, target_run_id):
+    if base_run_id is None or target_run_id is None:
+        return html.P("Upload test results at least twice to compare runs.")
+
+    diff = diff_runs(base_run_id, target_run_id)
+    return create_run_diff_content(diff)
@@ -7,7 +7,7 @@ import pandas as pd
 import plotly.express as px
 from dash import Input, Output, callback, dcc, html
 
-from db import get_db_connection
+from db import display_name
 from pages.charts import create_chart
 from services.dqi_service import (
     get_all_tests,
@@ -16,7 +16,9 @@ from services.dqi_service import (
     get_last_test_run_time,
     get_mart_test_summary,
     get_outstanding_errors,
+    get_run_meta,
     get_test_category_summary,
+    get_test_result_summary,
     get_tests_completed_count,
 )
 
@@ -320,28 +322,11 @@ def generate_report(container_id):
     total_tests = get_tests_completed_count()
 
     # Get passing and failing test counts
-    conn = get_db_connection()
-    passing_tests = pd.read_sql_query(
-        """
-        SELECT COUNT(*) as count FROM test_results WHERE STATUS = 'pass'
-    """,
-        conn,
-    ).iloc[0]["count"]
+    passing_tests = get_test_result_summary()["passing_count"]
     failing_tests = total_tests - passing_tests
 
     # Get database name
-    database_name = (
-        pd.read_sql_query(
-            """
-        SELECT DISTINCT DATABASE_NAME FROM test_results LIMIT 1
-    """,
-            conn,
-        ).iloc[0]["DATABASE_NAME"]
-        if total_tests > 0
-        else "N/A"
-    )
-
-    conn.close()
+    database_name = get_run_meta()["database_name"] if total_tests > 0 else "N/A"
 
     # Get last test run time
     last_run = get_last_test_run_time()
@@ -732,7 +717,7 @@ def generate_report(container_id):
                         html.Div(
                             [
                                 html.H5(
-                                    chart_name.replace("_", " ").title(),
+                                    display_name(chart_name),
                                     className="mt-3 mb-2",
                                 ),
                                 chart,
@@ -746,7 +731,7 @@ def generate_report(container_id):
                         html.Div(
                             [
                                 html.H5(
-                                    chart_name.replace("_", " ").title(),
+                                    display_name(chart_name),
                                     className="mt-3 mb-2",
                                 ),
                                 html.P(f"Error creating chart: {str(e)}"),
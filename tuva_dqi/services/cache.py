@@ -0,0 +1,114 @@
+import copy
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from pandas import DataFrame
+
+from db import get_data_version, get_db_connection
+
+# Maximum number of query results kept in each worker's cache
+CACHE_MAX_ENTRIES = int(os.environ.get("QUERY_CACHE_MAX_ENTRIES", 256))
+
+
+class VersionedCache:
+    """Least-recently-used cache of query results for one data version.
+
+    Entries are only valid for the data version they were computed against,
+    so the whole cache is discarded as soon as a different version is seen.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version, key) -> tuple[bool, object]:
+        """Look up a key, returning whether it was found and its value."""
+        with self._lock:
+            if version == self._version and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, version, key, value) -> None:
+        """Store a value computed against ``version``."""
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Discard every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Get the hit and miss counters and the current size of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "version": self._version,
+            }
+
+
+_cache = VersionedCache()
+
+
+def current_data_version() -> tuple[str, int]:
+    """Read the data version with a single primary key lookup."""
+    conn = get_db_connection(read_only=True)
+    try:
+        return get_data_version(conn)
+    finally:
+        conn.close()
+
+
+def cached(func):
+    """Cache a read function's results until the data version changes.
+
+    The version lives in the database, so every gunicorn worker sees a load
+    made by any other worker on its next call. Callers get a copy of the
+    cached value and are free to modify it. Empty DataFrames and None, which
+    are also what the read functions return on error, are not cached, so a
+    transient error such as a lock during a swap is retried on the next call.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        version = current_data_version()
+        key = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+        found, value = _cache.get(version, key)
+        if not found:
+            value = func(*args, **kwargs)
+            if value is not None and not (isinstance(value, DataFrame) and value.empty):
+                _cache.put(version, key, value)
+        return value.copy() if isinstance(value, DataFrame) else copy.deepcopy(value)
+
+    return wrapper
+
+
+def cache_stats() -> dict:
+    """Get the hit and miss counters of the query result cache."""
+    return _cache.stats()
+
+
+def clear_cache() -> None:
+    """Discard every cached query result."""
+    _cache.clear()
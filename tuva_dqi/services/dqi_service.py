@@ -1,28 +1,63 @@
+import json
+from dataclasses import dataclass
+
 import pandas as pd
 from pandas import DataFrame
 
-from db import get_db_connection
+from db import (
+    CHART_AXES,
+    CHART_AXIS_ORDER,
+    TYPED_COLUMNS,
+    get_data_version,
+    get_db_connection,
+)
+from services.cache import cached
+
+
+def grade_from_failures(failures_by_severity: dict[int, int]) -> str:
+    """Grade data quality from the number of failing tests at each severity."""
+    for severity, grade in [(1, "F"), (2, "D"), (3, "C"), (4, "B")]:
+        if failures_by_severity.get(severity, 0) > 0:
+            return grade
+    return "A"
+
+
+def mart_status_from_failures(
+    sev1_failures: int, mart_sev2_failures: int, mart_sev3_failures: int
+) -> str:
+    """Work out a mart's usability from all severity 1 and its own 2-3 failures."""
+    if sev1_failures > 0 or mart_sev2_failures > 0:
+        return "fail"
+    if mart_sev3_failures > 0:
+        return "warn"
+    return "pass"
+
+
+def read_available_charts(conn) -> DataFrame:
+    """Read the catalog entry of every chart, in display order."""
+    return pd.read_sql_query(
+        """
+        SELECT
+            DATA_QUALITY_CATEGORY,
+            GRAPH_NAME,
+            Y_AXIS_DESCRIPTION,
+            X_AXIS_DESCRIPTION,
+            FILTER_DESCRIPTION,
+            SUM_DESCRIPTION,
+            LEVEL_OF_DETAIL
+        FROM chart_catalog
+        ORDER BY DATA_QUALITY_CATEGORY, GRAPH_NAME
+    """,
+        conn,
+    )
 
 
+@cached
 def get_available_charts() -> DataFrame:
     """Get a list of available charts from the database."""
     try:
-        conn = get_db_connection()
-        df = pd.read_sql_query(
-            """
-            SELECT DISTINCT 
-                DATA_QUALITY_CATEGORY, 
-                GRAPH_NAME,
-                Y_AXIS_DESCRIPTION,
-                X_AXIS_DESCRIPTION,
-                FILTER_DESCRIPTION,
-                SUM_DESCRIPTION,
-                LEVEL_OF_DETAIL
-            FROM chart_data
-            ORDER BY DATA_QUALITY_CATEGORY, GRAPH_NAME
-        """,
-            conn,
-        )
+        conn = get_db_connection(read_only=True)
+        df = read_available_charts(conn)
         conn.close()
         return df
     except Exception as e:
@@ -30,261 +65,314 @@ def get_available_charts() -> DataFrame:
         return pd.DataFrame()
 
 
+@cached
 def get_chart_data(graph_name, chart_filter=None) -> DataFrame:
-    """Get data for a specific chart."""
+    """Get data for a specific chart, in axis order.
+
+    The dates parsed at ingest come back in the Y_AXIS_DATE and X_AXIS_DATE
+    columns as datetimes, so charts never parse the text axes.
+    """
     try:
-        conn = get_db_connection()
-        query = f"""
-            SELECT * FROM chart_data
-            WHERE GRAPH_NAME = '{graph_name}'
+        conn = get_db_connection(read_only=True)
+        query = """
+            SELECT
+                DATA_QUALITY_CATEGORY, GRAPH_NAME, LEVEL_OF_DETAIL,
+                Y_AXIS_DESCRIPTION, X_AXIS_DESCRIPTION, FILTER_DESCRIPTION,
+                SUM_DESCRIPTION, Y_AXIS_KIND, X_AXIS_KIND, Y_AXIS, X_AXIS,
+                CHART_FILTER, VALUE, Y_AXIS_DATE, X_AXIS_DATE
+            FROM chart_catalog
+            JOIN chart_data ON chart_data.GRAPH_ID = chart_catalog.GRAPH_ID
+            WHERE GRAPH_NAME = ?
         """
+        params = [graph_name]
 
         if chart_filter:
-            query += f" AND CHART_FILTER = '{chart_filter}'"
+            query += " AND CHART_FILTER = ?"
+            params.append(chart_filter)
+        query += f" ORDER BY {CHART_AXIS_ORDER}"
 
-        df = pd.read_sql_query(query, conn)
+        df = pd.read_sql_query(query, conn, params=params)
         conn.close()
+        for axis in CHART_AXES:
+            df[f"{axis}_DATE"] = pd.to_datetime(df[f"{axis}_DATE"], unit="s")
         return df
     except Exception as e:
         print(f"Error getting chart data: {str(e)}")
         return pd.DataFrame()
 
 
-def get_chart_filter_values(graph_name) -> list:
-    """Get unique filter values for a chart."""
+@cached
+def get_chart_info(graph_name) -> dict | None:
+    """Get a chart's catalog entry, with its filter values as a list."""
     try:
-        conn = get_db_connection()
-        query = f"""
-            SELECT DISTINCT CHART_FILTER 
-            FROM chart_data
-            WHERE GRAPH_NAME = '{graph_name}'
-            AND CHART_FILTER IS NOT NULL
-            AND CHART_FILTER != ''
-            ORDER BY CHART_FILTER
-        """
-        df = pd.read_sql_query(query, conn)
+        conn = get_db_connection(read_only=True)
+        row = conn.execute(
+            "SELECT * FROM chart_catalog WHERE GRAPH_NAME = ?", (graph_name,)
+        ).fetchone()
         conn.close()
-        return df["CHART_FILTER"].tolist()
+        if row is None:
+            return None
+        info = dict(row)
+        info["FILTER_VALUES"] = json.loads(info["FILTER_VALUES"] or "[]")
+        return info
     except Exception as e:
-        print(f"Error getting chart filter values: {str(e)}")
-        return []
+        print(f"Error getting chart info: {str(e)}")
+        return None
 
 
-def get_data_from_test_results(limit=100) -> DataFrame:
-    conn = get_db_connection()
+def get_chart_filter_values(graph_name) -> list:
+    """Get unique filter values for a chart."""
+    info = get_chart_info(graph_name)
+    return info["FILTER_VALUES"] if info else []
+
+
+def read_test_results(conn, limit=100) -> DataFrame:
+    """Read the first test results, with their timestamps as datetimes."""
     df = pd.read_sql_query(
         f"SELECT * FROM test_results LIMIT {limit}",
         conn,
     )
-    conn.close()
+    # Timestamps are stored as seconds since the epoch
+    for column, kind in TYPED_COLUMNS["test_results"].items():
+        if kind == "timestamp":
+            df[column] = pd.to_datetime(df[column], unit="s")
     return df
 
 
-def get_data_quality_grade() -> str:
-    conn = get_db_connection()
+def get_data_from_test_results(limit=100) -> DataFrame:
+    conn = get_db_connection(read_only=True)
+    df = read_test_results(conn, limit)
+    conn.close()
+    return df
 
-    # Check for Sev 1 issues (status is not 'pass' and SEVERITY_LEVEL = 1)
-    sev1_count = pd.read_sql_query(
-        """
-        SELECT COUNT(*) as count FROM test_results 
-        WHERE STATUS != 'pass' AND SEVERITY_LEVEL = 1
-    """,
-        conn,
-    ).iloc[0]["count"]
 
-    # Check for Sev 2 issues
-    sev2_count = pd.read_sql_query(
-        """
-        SELECT COUNT(*) as count FROM test_results 
-        WHERE STATUS != 'pass' AND SEVERITY_LEVEL = 2
-    """,
-        conn,
-    ).iloc[0]["count"]
+def aggregate_test_results(conn) -> dict:
+    """Count test results by severity, status and mart from the summary tables.
 
-    # Check for Sev 3 issues
-    sev3_count = pd.read_sql_query(
+    Returns the total, passing and failing test counts, failing tests per
+    severity level, and failing tests per severity level for each registered
+    mart, in registry order.
+    """
+    rows = conn.execute(
         """
-        SELECT COUNT(*) as count FROM test_results 
-        WHERE STATUS != 'pass' AND SEVERITY_LEVEL = 3
-    """,
-        conn,
-    ).iloc[0]["count"]
-
-    # Check for Sev 4 issues
-    sev4_count = pd.read_sql_query(
+        SELECT NULL AS MART, NULL AS SORT_ORDER, SEVERITY_LEVEL, STATUS, TESTS
+        FROM severity_summary
+        UNION ALL
+        SELECT MART, SORT_ORDER, NULL, NULL, 0 FROM marts
+        UNION ALL
+        SELECT marts.MART, marts.SORT_ORDER, mart_summary.SEVERITY_LEVEL, NULL,
+            mart_summary.TESTS
+        FROM mart_summary
+        JOIN marts ON marts.MART = mart_summary.MART
+        WHERE mart_summary.STATUS != 'pass'
+        ORDER BY SORT_ORDER
         """
-        SELECT COUNT(*) as count FROM test_results 
-        WHERE STATUS != 'pass' AND SEVERITY_LEVEL = 4
-    """,
-        conn,
-    ).iloc[0]["count"]
+    ).fetchall()
+
+    aggregates = {
+        "total": 0,
+        "passing": 0,
+        "failing": 0,
+        "failures_by_severity": {},
+        "mart_failures": {},
+    }
+    for row in rows:
+        severity = row["SEVERITY_LEVEL"]
+        if row["MART"] is not None:
+            mart_failures = aggregates["mart_failures"].setdefault(row["MART"], {})
+            if row["TESTS"]:
+                mart_failures[severity] = mart_failures.get(severity, 0) + row["TESTS"]
+            continue
+
+        aggregates["total"] += row["TESTS"]
+        if row["STATUS"] == "pass":
+            aggregates["passing"] += row["TESTS"]
+        # Tests without a status are neither passing nor failing
+        if row["STATUS"] is None or row["STATUS"] == "pass":
+            continue
+
+        failures = aggregates["failures_by_severity"]
+        failures[severity] = failures.get(severity, 0) + row["TESTS"]
+        aggregates["failing"] += row["TESTS"]
+    return aggregates
+
+
+def summarize_aggregates(aggregates: dict) -> dict:
+    """Derive the grade and mart statuses from ``aggregate_test_results``."""
+    failures = aggregates["failures_by_severity"]
+    return {
+        "grade": grade_from_failures(failures),
+        "mart_statuses": {
+            mart: mart_status_from_failures(
+                failures.get(1, 0),
+                mart_failures.get(2, 0),
+                mart_failures.get(3, 0),
+            )
+            for mart, mart_failures in aggregates["mart_failures"].items()
+        },
+        "tests_completed": aggregates["total"],
+        "passing_count": aggregates["passing"],
+        "failing_count": aggregates["failing"],
+        "failures_by_severity": failures,
+    }
+
 
+@cached
+def get_test_result_summary() -> dict:
+    """Get the grade, mart statuses and test counts from one aggregate query."""
+    conn = get_db_connection(read_only=True)
+    aggregates = aggregate_test_results(conn)
     conn.close()
+    return summarize_aggregates(aggregates)
 
-    # Determine grade based on severity counts
-    if sev1_count > 0:
-        return "F"
-    elif sev2_count > 0:
-        return "D"
-    elif sev3_count > 0:
-        return "C"
-    elif sev4_count > 0:
-        return "B"
-    else:
-        return "A"
+
+def get_data_quality_grade() -> str:
+    return get_test_result_summary()["grade"]
 
 
-# dqi_service.py
 def get_tests_completed_count() -> int:
-    conn = get_db_connection()
-    count = pd.read_sql_query(
-        """
-        SELECT COUNT(*) as count FROM test_results
-    """,
-        conn,
-    ).iloc[0]["count"]
+    return get_test_result_summary()["tests_completed"]
+
+
+def read_run_meta(conn) -> dict:
+    """Read the last run time, test count and database name of the loaded tests."""
+    row = conn.execute(
+        "SELECT LAST_RUN, TEST_COUNT, DATABASE_NAME FROM run_meta WHERE ID = 1"
+    ).fetchone()
+    return {
+        "last_run": row["LAST_RUN"] if row else None,
+        "test_count": row["TEST_COUNT"] if row else 0,
+        "database_name": row["DATABASE_NAME"] if row else None,
+    }
+
+
+@cached
+def get_run_meta() -> dict:
+    """Get the last run time, test count and database name of the loaded tests."""
+    conn = get_db_connection(read_only=True)
+    meta = read_run_meta(conn)
     conn.close()
-    return int(count)
+    return meta
 
 
 # dqi_service.py
 def get_last_test_run_time():
-    conn = get_db_connection()
-    last_time = pd.read_sql_query(
-        """
-        SELECT MAX(GENERATED_AT) as last_run FROM test_results
-    """,
-        conn,
-    ).iloc[0]["last_run"]
-    conn.close()
+    last_time = get_run_meta()["last_run"]
     return last_time if last_time else "No data available"
 
 
 def get_mart_statuses() -> dict[str, str]:
-    conn = get_db_connection()
-
-    # Get all failed tests with severity level 1
-    sev1_failures = pd.read_sql_query(
-        """
-        SELECT COUNT(*) as count FROM test_results 
-        WHERE STATUS != 'pass' AND SEVERITY_LEVEL = 1
-    """,
-        conn,
-    ).iloc[0]["count"]
-
-    # Initialize results dictionary
-    mart_statuses = {
-        "SERVICE_CATEGORIES": "pass",
-        "CCSR": "pass",
-        "CMS_CHRONIC_CONDITIONS": "pass",
-        "TUVA_CHRONIC_CONDITIONS": "pass",
-        "CMS_HCCS": "pass",
-        "ED_CLASSIFICATION": "pass",
-        "FINANCIAL_PMPM": "pass",
-        "QUALITY_MEASURES": "pass",
-        "READMISSION": "pass",
-    }
-
-    # If any severity level 1 issues exist, all marts are not usable
-    if sev1_failures > 0:
-        for mart in mart_statuses:
-            mart_statuses[mart] = "fail"
-        conn.close()
-        return mart_statuses
-
-    # Check severity level 2 issues for each mart
-    for mart in mart_statuses:
-        flag_column = f"FLAG_{mart}"
-
-        # Check severity level 2 issues for this mart
-        sev2_failures = pd.read_sql_query(
-            f"""
-            SELECT COUNT(*) as count FROM test_results 
-            WHERE STATUS != 'pass' AND SEVERITY_LEVEL = 2 AND {flag_column} = 1
-        """,
-            conn,
-        ).iloc[0]["count"]
-
-        if sev2_failures > 0:
-            mart_statuses[mart] = "fail"
-            continue  # No need to check level 3 if already failed
-
-        # Check severity level 3 issues for this mart
-        sev3_failures = pd.read_sql_query(
-            f"""
-            SELECT COUNT(*) as count FROM test_results 
-            WHERE STATUS != 'pass' AND SEVERITY_LEVEL = 3 AND {flag_column} = 1
-        """,
-            conn,
-        ).iloc[0]["count"]
-
-        if sev3_failures > 0:
-            mart_statuses[mart] = "warn"
-
-    conn.close()
-    return mart_statuses
-
-
-def get_outstanding_errors() -> DataFrame:
-    conn = get_db_connection()
-    df = pd.read_sql_query(
-        """
-        SELECT 
-            UNIQUE_ID, SEVERITY_LEVEL, DATABASE_NAME, TABLE_NAME, TEST_COLUMN_NAME, 
-            TEST_ORIGINAL_NAME, TEST_TYPE, TEST_SUB_TYPE, TEST_DESCRIPTION,
-            TEST_RESULTS_QUERY, STATUS,
-            FLAG_SERVICE_CATEGORIES, FLAG_CCSR, FLAG_CMS_CHRONIC_CONDITIONS,
-            FLAG_TUVA_CHRONIC_CONDITIONS, FLAG_CMS_HCCS, FLAG_ED_CLASSIFICATION,
-            FLAG_FINANCIAL_PMPM, FLAG_QUALITY_MEASURES, FLAG_READMISSION
-        FROM test_results 
+    return get_test_result_summary()["mart_statuses"]
+
+
+# Rows shown on each page of the test explorers
+TEST_PAGE_SIZE = 10
+
+# Columns of test_results shown in the test explorers and mart test lists
+TEST_LIST_COLUMNS = """
+    test_results.UNIQUE_ID, SEVERITY_LEVEL, TABLE_NAME, TEST_COLUMN_NAME,
+    TEST_ORIGINAL_NAME, TEST_TYPE, TEST_SUB_TYPE, TEST_CATEGORY, STATUS
+"""
+
+# Columns of the test explorers, each of which can be filtered and sorted on
+EXPLORER_COLUMNS = [
+    "SEVERITY_LEVEL",
+    "TABLE_NAME",
+    "TEST_COLUMN_NAME",
+    "TEST_ORIGINAL_NAME",
+    "TEST_TYPE",
+    "TEST_SUB_TYPE",
+    "TEST_CATEGORY",
+    "STATUS",
+]
+
+# Statuses a test explorer can be limited to, and the condition behind each
+STATUS_CONDITIONS = {
+    "failing": "STATUS != 'pass'",
+    "passing": "STATUS = 'pass'",
+}
+
+# Comparisons an explorer filter can make, besides "contains"
+FILTER_OPERATORS = ["=", "!=", "<", "<=", ">", ">="]
+
+# Columns of test_results shown in a test's "More Info" details
+TEST_DETAIL_COLUMNS = """
+    UNIQUE_ID, SEVERITY_LEVEL, DATABASE_NAME, TABLE_NAME, TEST_COLUMN_NAME,
+    TEST_ORIGINAL_NAME, TEST_TYPE, TEST_SUB_TYPE, TEST_DESCRIPTION,
+    TEST_RESULTS_QUERY, STATUS
+"""
+
+
+def read_outstanding_errors(conn) -> DataFrame:
+    """Read the failing tests that have a severity level, most severe first."""
+    return pd.read_sql_query(
+        f"""
+        SELECT {TEST_DETAIL_COLUMNS}
+        FROM test_results
         WHERE STATUS != 'pass' AND SEVERITY_LEVEL IS NOT NULL
         ORDER BY SEVERITY_LEVEL ASC
     """,
         conn,
     )
+
+
+@cached
+def get_outstanding_errors() -> DataFrame:
+    conn = get_db_connection(read_only=True)
+    df = read_outstanding_errors(conn)
     conn.close()
     return df
 
 
-def get_data_availability() -> dict:
-    """Check what data is available in the database."""
-    conn = get_db_connection()
-
-    # Check for test results
-    test_results_count = pd.read_sql_query(
-        """
-        SELECT COUNT(*) as count FROM test_results
-    """,
-        conn,
-    ).iloc[0]["count"]
+@cached
+def get_test_detail(unique_id) -> dict | None:
+    """Get everything the "More Info" details show for one test.
 
-    # Check for chart data
-    chart_data_count = (
-        pd.read_sql_query(
+    The test's data marts are listed under "MARTS" as (mart, display name)
+    pairs, in the registry's order.
+    """
+    try:
+        conn = get_db_connection(read_only=True)
+        row = conn.execute(
+            f"SELECT {TEST_DETAIL_COLUMNS} FROM test_results WHERE UNIQUE_ID = ?",
+            (unique_id,),
+        ).fetchone()
+        if row is None:
+            conn.close()
+            return None
+        marts = conn.execute(
             """
-        SELECT COUNT(*) as count FROM chart_data
-    """,
-            conn,
-        ).iloc[0]["count"]
-        if table_exists(conn, "chart_data")
-        else 0
-    )
+            SELECT marts.MART, marts.DISPLAY_NAME
+            FROM test_mart
+            JOIN marts ON marts.MART = test_mart.MART
+            WHERE test_mart.UNIQUE_ID = ?
+            ORDER BY marts.SORT_ORDER
+            """,
+            (unique_id,),
+        ).fetchall()
+        conn.close()
+        return {**dict(row), "MARTS": [tuple(mart) for mart in marts]}
+    except Exception as e:
+        print(f"Error getting test detail: {str(e)}")
+        return None
 
-    # Get chart categories if available
-    chart_categories = (
-        pd.read_sql_query(
-            """
-        SELECT DISTINCT DATA_QUALITY_CATEGORY, COUNT(*) as count
-        FROM chart_data
+
+def read_data_availability(conn) -> dict:
+    """Read how many test results and chart data points are loaded."""
+    # Check for test results
+    row = conn.execute("SELECT TEST_COUNT FROM run_meta WHERE ID = 1").fetchone()
+    test_results_count = row["TEST_COUNT"] if row else 0
+
+    # Check for chart data, counted per category when the catalog was built
+    chart_categories = pd.read_sql_query(
+        """
+        SELECT DATA_QUALITY_CATEGORY, SUM(ROW_COUNT) as count
+        FROM chart_catalog
         GROUP BY DATA_QUALITY_CATEGORY
     """,
-            conn,
-        )
-        if table_exists(conn, "chart_data")
-        else pd.DataFrame()
+        conn,
     )
-
-    conn.close()
+    chart_data_count = int(chart_categories["count"].sum())
 
     return {
         "test_results": test_results_count,
@@ -295,6 +383,50 @@ def get_data_availability() -> dict:
     }
 
 
+def get_data_availability() -> dict:
+    """Check what data is available in the database."""
+    conn = get_db_connection(read_only=True)
+    availability = read_data_availability(conn)
+    conn.close()
+    return availability
+
+
+@dataclass
+class DashboardSnapshot:
+    """Everything the analytics dashboard shows, read at one data version."""
+
+    data_version: tuple[str, int]
+    grade: str
+    tests_completed: int
+    last_run: str | None
+    mart_statuses: dict[str, str]
+    available_charts: DataFrame
+    data_availability: dict
+
+
+@cached
+def get_dashboard_snapshot() -> DashboardSnapshot:
+    """Read everything the analytics dashboard shows over one connection.
+
+    The snapshot is cached until the data version changes, so a dashboard
+    refresh runs its queries at most once per load.
+    """
+    conn = get_db_connection(read_only=True)
+    try:
+        summary = summarize_aggregates(aggregate_test_results(conn))
+        return DashboardSnapshot(
+            data_version=get_data_version(conn),
+            grade=summary["grade"],
+            tests_completed=summary["tests_completed"],
+            last_run=read_run_meta(conn)["last_run"],
+            mart_statuses=summary["mart_statuses"],
+            available_charts=read_available_charts(conn),
+            data_availability=read_data_availability(conn),
+        )
+    finally:
+        conn.close()
+
+
 def table_exists(conn, table_name: str) -> bool:
     """Check if a table exists in the database."""
     query = f"""
@@ -305,20 +437,18 @@ def table_exists(conn, table_name: str) -> bool:
     return result is not None
 
 
+@cached
 def get_all_tests() -> DataFrame:
     """Get all tests from the database with their status."""
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     df = pd.read_sql_query(
         """
         SELECT 
             UNIQUE_ID, 
-            CAST(SEVERITY_LEVEL AS INTEGER) AS SEVERITY_LEVEL, 
+            SEVERITY_LEVEL, 
             DATABASE_NAME, SCHEMA_NAME, TABLE_NAME, 
             TEST_COLUMN_NAME, TEST_ORIGINAL_NAME, TEST_TYPE, TEST_SUB_TYPE, 
-            TEST_DESCRIPTION, STATUS, QUALITY_DIMENSION, TEST_CATEGORY,
-            FLAG_SERVICE_CATEGORIES, FLAG_CCSR, FLAG_CMS_CHRONIC_CONDITIONS,
-            FLAG_TUVA_CHRONIC_CONDITIONS, FLAG_CMS_HCCS, FLAG_ED_CLASSIFICATION,
-            FLAG_FINANCIAL_PMPM, FLAG_QUALITY_MEASURES, FLAG_READMISSION
+            TEST_DESCRIPTION, STATUS, QUALITY_DIMENSION, TEST_CATEGORY
         FROM test_results 
        
         ORDER BY SEVERITY_LEVEL ASC, STATUS DESC, TABLE_NAME ASC
@@ -329,67 +459,37 @@ def get_all_tests() -> DataFrame:
     return df
 
 
+@cached
 def get_mart_test_summary() -> list:
     """Get a summary of tests by data mart."""
-    conn = get_db_connection()
-
-    # Create a list to store results for each mart
-    mart_summaries = []
-
-    # List of all data marts
-    marts = [
-        "SERVICE_CATEGORIES",
-        "CCSR",
-        "CMS_CHRONIC_CONDITIONS",
-        "TUVA_CHRONIC_CONDITIONS",
-        "CMS_HCCS",
-        "ED_CLASSIFICATION",
-        "FINANCIAL_PMPM",
-        "QUALITY_MEASURES",
-        "READMISSION",
-    ]
-
-    # For each mart, get counts of tests by severity and status
-    for mart in marts:
-        flag_column = f"FLAG_{mart}"
-
-        # Get total tests, passing tests, and failing tests by severity
-        query = f"""
-            SELECT 
-                COUNT(*) as total_tests,
-                SUM(CASE WHEN STATUS = 'pass' THEN 1 ELSE 0 END) as passing_tests,
-                SUM(CASE WHEN STATUS != 'pass' AND CAST(SEVERITY_LEVEL AS INTEGER) = 1 THEN 1 ELSE 0 END) as sev1_fails,
-                SUM(CASE WHEN STATUS != 'pass' AND CAST(SEVERITY_LEVEL AS INTEGER) = 2 THEN 1 ELSE 0 END) as sev2_fails,
-                SUM(CASE WHEN STATUS != 'pass' AND CAST(SEVERITY_LEVEL AS INTEGER) = 3 THEN 1 ELSE 0 END) as sev3_fails,
-                SUM(CASE WHEN STATUS != 'pass' AND CAST(SEVERITY_LEVEL AS INTEGER) = 4 THEN 1 ELSE 0 END) as sev4_fails,
-                SUM(CASE WHEN STATUS != 'pass' AND CAST(SEVERITY_LEVEL AS INTEGER) = 5 THEN 1 ELSE 0 END) as sev5_fails
-            FROM test_results 
-            WHERE {flag_column} = 1
-        """
+    conn = get_db_connection(read_only=True)
 
-        result = pd.read_sql_query(query, conn).iloc[0]
-
-        # Convert None values to 0 for numeric fields
-        sev1_fails = 0 if result["sev1_fails"] is None else int(result["sev1_fails"])
-        sev2_fails = 0 if result["sev2_fails"] is None else int(result["sev2_fails"])
-        sev3_fails = 0 if result["sev3_fails"] is None else int(result["sev3_fails"])
-        sev4_fails = 0 if result["sev4_fails"] is None else int(result["sev4_fails"])
-        sev5_fails = 0 if result["sev5_fails"] is None else int(result["sev5_fails"])
-        total_tests = 0 if result["total_tests"] is None else int(result["total_tests"])
-        passing_tests = (
-            0 if result["passing_tests"] is None else int(result["passing_tests"])
-        )
+    # Count tests by severity and status for every registered mart at once
+    query = """
+        SELECT
+            marts.MART AS mart,
+            marts.DISPLAY_NAME AS display_name,
+            SUM(mart_summary.TESTS) as total_tests,
+            SUM(CASE WHEN mart_summary.STATUS = 'pass' THEN mart_summary.TESTS ELSE 0 END) as passing_tests,
+            SUM(CASE WHEN mart_summary.STATUS != 'pass' AND mart_summary.SEVERITY_LEVEL = 1 THEN mart_summary.TESTS ELSE 0 END) as sev1_fails,
+            SUM(CASE WHEN mart_summary.STATUS != 'pass' AND mart_summary.SEVERITY_LEVEL = 2 THEN mart_summary.TESTS ELSE 0 END) as sev2_fails,
+            SUM(CASE WHEN mart_summary.STATUS != 'pass' AND mart_summary.SEVERITY_LEVEL = 3 THEN mart_summary.TESTS ELSE 0 END) as sev3_fails,
+            SUM(CASE WHEN mart_summary.STATUS != 'pass' AND mart_summary.SEVERITY_LEVEL = 4 THEN mart_summary.TESTS ELSE 0 END) as sev4_fails,
+            SUM(CASE WHEN mart_summary.STATUS != 'pass' AND mart_summary.SEVERITY_LEVEL = 5 THEN mart_summary.TESTS ELSE 0 END) as sev5_fails
+        FROM marts
+        LEFT JOIN mart_summary ON mart_summary.MART = marts.MART
+        GROUP BY marts.MART
+        ORDER BY marts.SORT_ORDER
+    """
+    rows = conn.execute(query).fetchall()
+    conn.close()
 
-        # Format the display name
-        display_name = (
-            mart.replace("_", " ")
-            .title()
-            .replace("Ccsr", "CCSR")
-            .replace("Cms", "CMS")
-            .replace("Ed", "ED")
-            .replace("Pmpm", "PMPM")
-            .replace("Hcc", "HCC")
-        )
+    mart_summaries = []
+    for result in rows:
+        # SUM over a mart without tests is NULL
+        total_tests = result["total_tests"] or 0
+        passing_tests = result["passing_tests"] or 0
+        sev_fails = [result[f"sev{severity}_fails"] or 0 for severity in range(1, 6)]
 
         # Calculate passing percentage
         passing_pct = 0
@@ -397,53 +497,49 @@ def get_mart_test_summary() -> list:
             passing_pct = round(passing_tests / total_tests * 100, 1)
 
         # Determine status based on severity counts
-        if sev1_fails > 0:
+        if sev_fails[0] > 0 or sev_fails[1] > 0:
             status = "Not Usable"
             status_color = "danger"
-        elif sev2_fails > 0:
-            status = "Not Usable"
-            status_color = "danger"
-        elif sev3_fails > 0:
+        elif sev_fails[2] > 0:
             status = "Use with Caution"
             status_color = "warning"
         else:
             status = "Usable"
             status_color = "success"
 
-        # Add to summary list
         mart_summaries.append(
             {
-                "mart": mart,
-                "display_name": display_name,
+                "mart": result["mart"],
+                "display_name": result["display_name"],
                 "total_tests": total_tests,
                 "passing_tests": passing_tests,
                 "passing_percentage": passing_pct,
-                "sev1_fails": sev1_fails,
-                "sev2_fails": sev2_fails,
-                "sev3_fails": sev3_fails,
-                "sev4_fails": sev4_fails,
-                "sev5_fails": sev5_fails,
+                "sev1_fails": sev_fails[0],
+                "sev2_fails": sev_fails[1],
+                "sev3_fails": sev_fails[2],
+                "sev4_fails": sev_fails[3],
+                "sev5_fails": sev_fails[4],
                 "status": status,
                 "status_color": status_color,
             }
         )
 
-    conn.close()
     return mart_summaries
 
 
+@cached
 def get_test_category_summary() -> DataFrame:
     """Get a summary of tests by Test Category."""
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
 
     # Get counts by Test Category and status
     query = """
         SELECT 
             TEST_CATEGORY,
-            COUNT(*) as total_tests,
-            SUM(CASE WHEN STATUS = 'pass' THEN 1 ELSE 0 END) as passing_tests,
-            SUM(CASE WHEN STATUS != 'pass' THEN 1 ELSE 0 END) as failing_tests
-        FROM test_results 
+            SUM(TESTS) as total_tests,
+            SUM(CASE WHEN STATUS = 'pass' THEN TESTS ELSE 0 END) as passing_tests,
+            SUM(CASE WHEN STATUS != 'pass' THEN TESTS ELSE 0 END) as failing_tests
+        FROM category_summary
         WHERE TEST_CATEGORY IS NOT NULL AND TEST_CATEGORY != ''
         GROUP BY TEST_CATEGORY
         ORDER BY TEST_CATEGORY
@@ -463,54 +559,131 @@ def get_test_category_summary() -> DataFrame:
 
 def get_mart_tests(mart_name, status: str = None) -> DataFrame:
     """Get tests for a specific mart."""
-    conn = get_db_connection()
-    flag_column = f"FLAG_{mart_name}"
-
-    # Check if the column exists
-    column_exists = False
-    try:
-        # Try to get column info
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(test_results)")
-        columns = cursor.fetchall()
-        column_exists = any(col[1] == flag_column for col in columns)
-    except Exception:
-        pass
-
-    # If column doesn't exist, return empty DataFrame
-    if not column_exists:
-        return pd.DataFrame(
-            columns=[
-                "UNIQUE_ID",
-                "SEVERITY_LEVEL",
-                "DATABASE_NAME",
-                "TABLE_NAME",
-                "TEST_COLUMN_NAME",
-                "TEST_ORIGINAL_NAME",
-                "TEST_TYPE",
-                "TEST_SUB_TYPE",
-                "TEST_DESCRIPTION",
-                "TEST_RESULTS_QUERY",
-                "STATUS",
-            ]
-        )
+    conn = get_db_connection(read_only=True)
 
     query = f"""
-        SELECT 
-            UNIQUE_ID, SEVERITY_LEVEL, DATABASE_NAME, TABLE_NAME, TEST_COLUMN_NAME, 
-            TEST_ORIGINAL_NAME, TEST_TYPE, TEST_SUB_TYPE, TEST_DESCRIPTION,
-            TEST_RESULTS_QUERY, STATUS
-        FROM test_results 
-        WHERE {flag_column} = 1
+        SELECT {TEST_LIST_COLUMNS}
+        FROM test_mart
+        JOIN test_results ON test_results.UNIQUE_ID = test_mart.UNIQUE_ID
+        WHERE test_mart.MART = ?
     """
+    params = [mart_name]
 
     if status:
-        query += f" AND STATUS = '{status}'"
+        query += " AND STATUS = ?"
+        params.append(status)
     else:
         query += " AND STATUS != 'pass'"
 
     query += " ORDER BY SEVERITY_LEVEL ASC"
 
-    df = pd.read_sql_query(query, conn)
+    df = pd.read_sql_query(query, conn, params=params)
     conn.close()
     return df
+
+
+def explorer_filter_sql(
+    status: str = None, mart: str = None, filters=()
+) -> tuple[str, list]:
+    """Build the WHERE clause and parameters selecting tests for an explorer.
+
+    ``filters`` holds (column, operator, value) triples over
+    ``EXPLORER_COLUMNS``. Columns and operators are spliced into the SQL, so
+    anything else raises a ValueError.
+    """
+    conditions = []
+    params = []
+    if status is not None:
+        if status not in STATUS_CONDITIONS:
+            raise ValueError(f"Unknown test status: {status}")
+        conditions.append(STATUS_CONDITIONS[status])
+    if mart is not None:
+        conditions.append(
+            "UNIQUE_ID IN (SELECT UNIQUE_ID FROM test_mart WHERE MART = ?)"
+        )
+        params.append(mart)
+    for column, operator, value in filters:
+        if column not in EXPLORER_COLUMNS:
+            raise ValueError(f"Cannot filter on column: {column}")
+        if operator == "contains":
+            escaped = (
+                str(value).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            conditions.append(f"{column} LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        elif operator in FILTER_OPERATORS:
+            conditions.append(f"{column} {operator} ?")
+            params.append(value if column == "SEVERITY_LEVEL" else str(value))
+        else:
+            raise ValueError(f"Unknown filter operator: {operator}")
+    return " AND ".join(conditions) or "1", params
+
+
+def read_test_rows(
+    conn, where: str, params, sort_by=(), page: int = 1, page_size: int = TEST_PAGE_SIZE
+) -> DataFrame:
+    """Read one page of the tests matching a WHERE clause.
+
+    Tests are sorted by (column, direction) pairs over ``EXPLORER_COLUMNS``,
+    most severe first by default. The page is picked by rowid before any row
+    is read in full.
+    """
+    order = []
+    for column, direction in sort_by:
+        if column not in EXPLORER_COLUMNS:
+            raise ValueError(f"Cannot sort on column: {column}")
+        order.append(f"{column} {'DESC' if direction == 'desc' else 'ASC'}")
+    order_by = ", ".join(order or ["SEVERITY_LEVEL"]) + ", rowid"
+
+    return pd.read_sql_query(
+        f"""
+        SELECT {TEST_LIST_COLUMNS}
+        FROM test_results
+        WHERE rowid IN (
+            SELECT rowid FROM test_results
+            WHERE {where}
+            ORDER BY {order_by}
+            LIMIT ? OFFSET ?
+        )
+        ORDER BY {order_by}
+    """,
+        conn,
+        params=[*params, page_size, (page - 1) * page_size],
+    )
+
+
+def read_test_page(
+    conn, where: str, params, sort_by=(), page: int = 1, page_size: int = TEST_PAGE_SIZE
+) -> dict:
+    """Read one page of the tests matching a WHERE clause, and their count.
+
+    The page is read as in ``read_test_rows``.
+    """
+    total = conn.execute(
+        f"SELECT COUNT(*) FROM test_results WHERE {where}", params
+    ).fetchone()[0]
+    rows = read_test_rows(conn, where, params, sort_by, page, page_size)
+    return {"rows": rows, "total": total}
+
+
+@cached
+def get_test_explorer_page(
+    status: str = None,
+    mart: str = None,
+    filters=(),
+    sort_by=(),
+    page: int = 1,
+    page_size: int = TEST_PAGE_SIZE,
+) -> dict:
+    """Get one page of tests for a test explorer.
+
+    Tests can be limited to a status ("failing" or "passing") and a mart,
+    filtered with ``explorer_filter_sql`` and sorted as in ``read_test_page``.
+    Returns the page's rows and the total number of matching tests.
+    """
+    where, params = explorer_filter_sql(status, mart, filters)
+    conn = get_db_connection(read_only=True)
+    try:
+        return read_test_page(conn, where, params, sort_by, page, page_size)
+    finally:
+        conn.close()
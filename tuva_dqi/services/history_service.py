@@ -0,0 +1,383 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+from pandas import DataFrame
+
+from db import get_db_connection
+from services.dqi_service import aggregate_test_results, summarize_aggregates
+
+# Retention policy for test result history: the number of most recent runs to
+# keep, and the age in days after which a run is pruned (0 disables a limit)
+RETENTION_RUNS = int(os.environ.get("HISTORY_RETENTION_RUNS", 180))
+RETENTION_DAYS = int(os.environ.get("HISTORY_RETENTION_DAYS", 0))
+
+# Fraction of free pages above which the periodic vacuum job rebuilds a
+# database without incremental auto-vacuum with a full VACUUM
+VACUUM_FREE_FRACTION = 0.25
+
+# Columns of test_results copied into the history for every run
+HISTORY_COLUMNS = [
+    "UNIQUE_ID",
+    "TABLE_NAME",
+    "TEST_NAME",
+    "QUALITY_DIMENSION",
+    "TEST_CATEGORY",
+    "STATUS",
+    "SEVERITY_LEVEL",
+    "FAILURES",
+]
+
+# Severity levels whose failing tests are counted in each run summary
+SEVERITY_LEVELS = [1, 2, 3, 4, 5]
+
+# Categories of change reported by diff_runs, each backed by a flag column
+DIFF_CATEGORIES = {
+    "new_failures": "NEW_FAILURE",
+    "resolved": "RESOLVED",
+    "severity_changed": "SEVERITY_CHANGED",
+    "failures_changed": "FAILURES_CHANGED",
+    "removed": "REMOVED",
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def summarize_results(conn) -> tuple[dict, dict[str, str]]:
+    """Summarize test_results in a single aggregate pass.
+
+    Returns the run summary columns (grade, test and failing counts, and
+    failing tests per severity level) and the status of each mart.
+    """
+    summary = summarize_aggregates(aggregate_test_results(conn))
+    failures = summary["failures_by_severity"]
+    run_summary = {
+        "GRADE": summary["grade"],
+        "TEST_COUNT": summary["tests_completed"],
+        "FAILING_COUNT": summary["failing_count"],
+        **{
+            f"SEV{severity}_FAILURES": failures.get(severity, 0)
+            for severity in SEVERITY_LEVELS
+        },
+    }
+    return run_summary, summary["mart_statuses"]
+
+
+def add_run(conn, mode: str) -> int:
+    """Add the current contents of test_results as a new run.
+
+    Writes the run, its history rows and its summary inside the caller's
+    transaction, so an ingest can record a run together with the load that
+    produced it. Returns the id of the new run.
+    """
+    columns = ", ".join(HISTORY_COLUMNS)
+    cursor = conn.execute(
+        """
+        INSERT INTO ingest_runs (GENERATED_AT, LOADED_AT, MODE, TEST_COUNT)
+        SELECT datetime(MAX(GENERATED_AT), 'unixepoch'), ?, ?, COUNT(*)
+        FROM test_results
+        """,
+        (_now(), mode),
+    )
+    run_id = cursor.lastrowid
+    conn.execute(
+        f"""
+        INSERT INTO test_result_history (RUN_ID, {columns})
+        SELECT ?, {columns} FROM test_results
+        """,
+        (run_id,),
+    )
+
+    summary, mart_statuses = summarize_results(conn)
+    conn.execute(
+        f"""
+        INSERT INTO run_summaries (RUN_ID, {", ".join(summary)})
+        VALUES (?, {", ".join(["?"] * len(summary))})
+        """,
+        (run_id, *summary.values()),
+    )
+    conn.executemany(
+        "INSERT INTO run_mart_statuses (RUN_ID, MART, STATUS) VALUES (?, ?, ?)",
+        [(run_id, mart, status) for mart, status in mart_statuses.items()],
+    )
+    return run_id
+
+
+def record_run(conn, mode: str) -> int:
+    """Record the current contents of test_results as a new run.
+
+    The run, its history rows and its summary are written in one transaction
+    (see ``add_run``), so trends never need to be recomputed from the history.
+    Returns the id of the new run.
+    """
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        run_id = add_run(conn, mode)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return run_id
+
+
+def delete_expired_runs(
+    conn, keep_runs: int = RETENTION_RUNS, keep_days: int = RETENTION_DAYS
+) -> int:
+    """Delete runs that fall outside the retention policy.
+
+    Runs inside the caller's transaction. The most recent run is always kept.
+    Returns the number of runs deleted.
+    """
+    conditions = []
+    params = []
+    if keep_runs > 0:
+        conditions.append(
+            "RUN_ID NOT IN (SELECT RUN_ID FROM ingest_runs "
+            "ORDER BY RUN_ID DESC LIMIT ?)"
+        )
+        params.append(keep_runs)
+    if keep_days > 0:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=keep_days)
+        conditions.append("LOADED_AT < ?")
+        params.append(cutoff.strftime("%Y-%m-%d %H:%M:%S"))
+    if not conditions:
+        return 0
+
+    run_ids = [
+        row[0]
+        for row in conn.execute(
+            f"""
+            SELECT RUN_ID FROM ingest_runs
+            WHERE ({" OR ".join(conditions)})
+            AND RUN_ID < (SELECT MAX(RUN_ID) FROM ingest_runs)
+            """,
+            params,
+        )
+    ]
+    for run_id in run_ids:
+        # Each delete is a range scan of the history primary key
+        for table_name in [
+            "test_result_history",
+            "run_mart_statuses",
+            "run_summaries",
+            "ingest_runs",
+        ]:
+            conn.execute(f"DELETE FROM {table_name} WHERE RUN_ID = ?", (run_id,))
+    return len(run_ids)
+
+
+def prune_runs(
+    conn, keep_runs: int = RETENTION_RUNS, keep_days: int = RETENTION_DAYS
+) -> int:
+    """Delete runs that fall outside the retention policy in one transaction.
+
+    Returns the number of runs deleted (see ``delete_expired_runs``).
+    """
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        pruned = delete_expired_runs(conn, keep_runs, keep_days)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return pruned
+
+
+def compact_database(conn) -> None:
+    """Return free pages left behind by pruning and table swaps to the OS.
+
+    Only databases with incremental auto-vacuum are compacted, which is cheap
+    enough to do after every load. Older databases wait for the periodic full
+    VACUUM (see ``vacuum_database``).
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return
+
+    # Shrinking the file can free another page, so repeat until it stops
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    while free_pages:
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+        remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if remaining >= free_pages:
+            break
+        free_pages = remaining
+
+
+def vacuum_database(conn) -> bool:
+    """Rebuild a database without incremental auto-vacuum once enough is free.
+
+    The full VACUUM rewrites the whole file and switches it over to
+    incremental auto-vacuum, so it runs as a periodic job rather than after
+    a load. Returns whether the database was rebuilt.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if not page_count or free_pages / page_count <= VACUUM_FREE_FRACTION:
+        return False
+
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def get_runs(limit: int = None) -> DataFrame:
+    """Get recorded ingest runs, most recent first."""
+    try:
+        conn = get_db_connection(read_only=True)
+        query = """
+            SELECT RUN_ID, GENERATED_AT, LOADED_AT, MODE, TEST_COUNT
+            FROM ingest_runs
+            ORDER BY RUN_ID DESC
+        """
+        params = ()
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (limit,)
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+    except Exception as e:
+        print(f"Error getting ingest runs: {str(e)}")
+        return pd.DataFrame()
+
+
+def get_run_results(run_id: int) -> DataFrame:
+    """Get the test results recorded for a run."""
+    try:
+        conn = get_db_connection(read_only=True)
+        df = pd.read_sql_query(
+            f"""
+            SELECT {", ".join(HISTORY_COLUMNS)}
+            FROM test_result_history
+            WHERE RUN_ID = ?
+            ORDER BY UNIQUE_ID
+            """,
+            conn,
+            params=(run_id,),
+        )
+        conn.close()
+        return df
+    except Exception as e:
+        print(f"Error getting results for run {run_id}: {str(e)}")
+        return pd.DataFrame()
+
+
+def get_run_trend(limit: int = 365) -> DataFrame:
+    """Get the summaries of the most recent runs, oldest first."""
+    try:
+        conn = get_db_connection(read_only=True)
+        df = pd.read_sql_query(
+            """
+            SELECT r.RUN_ID, r.GENERATED_AT, r.LOADED_AT, s.GRADE, s.TEST_COUNT,
+                s.FAILING_COUNT, s.SEV1_FAILURES, s.SEV2_FAILURES,
+                s.SEV3_FAILURES, s.SEV4_FAILURES, s.SEV5_FAILURES
+            FROM run_summaries s
+            JOIN ingest_runs r ON r.RUN_ID = s.RUN_ID
+            ORDER BY s.RUN_ID DESC
+            LIMIT ?
+            """,
+            conn,
+            params=(limit,),
+        )
+        conn.close()
+        return df.iloc[::-1].reset_index(drop=True)
+    except Exception as e:
+        print(f"Error getting run trend: {str(e)}")
+        return pd.DataFrame()
+
+
+def get_mart_status_trend(limit: int = 365) -> DataFrame:
+    """Get the status of each mart in the most recent runs, oldest first."""
+    try:
+        conn = get_db_connection(read_only=True)
+        df = pd.read_sql_query(
+            """
+            SELECT RUN_ID, MART, STATUS
+            FROM run_mart_statuses
+            WHERE RUN_ID IN (
+                SELECT RUN_ID FROM run_summaries ORDER BY RUN_ID DESC LIMIT ?
+            )
+            ORDER BY RUN_ID, MART
+            """,
+            conn,
+            params=(limit,),
+        )
+        conn.close()
+        return df
+    except Exception as e:
+        print(f"Error getting mart status trend: {str(e)}")
+        return pd.DataFrame()
+
+
+def diff_runs(base_run_id: int, target_run_id: int) -> dict[str, DataFrame]:
+    """Compare two runs test by test.
+
+    Returns a DataFrame per category in ``DIFF_CATEGORIES``: tests failing in
+    the target run that passed or did not exist in the base run, tests that
+    failed in the base run and pass in the target run, tests whose
+    severity level or failure count changed, and tests of the base run that
+    are missing from the target run. A test can appear in more than one
+    category.
+
+    The comparison is a join of the target run onto the base run over the
+    history primary key, plus an anti-join for the base run's tests missing
+    from the target run, so it costs one index lookup per test of each run.
+    """
+    try:
+        conn = get_db_connection(read_only=True)
+        changes = pd.read_sql_query(
+            """
+            SELECT * FROM (
+                SELECT
+                    t.UNIQUE_ID, t.TABLE_NAME, t.TEST_NAME, t.QUALITY_DIMENSION,
+                    b.STATUS AS BASE_STATUS, t.STATUS AS TARGET_STATUS,
+                    b.SEVERITY_LEVEL AS BASE_SEVERITY_LEVEL,
+                    t.SEVERITY_LEVEL AS TARGET_SEVERITY_LEVEL,
+                    b.FAILURES AS BASE_FAILURES, t.FAILURES AS TARGET_FAILURES,
+                    t.STATUS != 'pass' AND (b.UNIQUE_ID IS NULL OR b.STATUS = 'pass')
+                        AS NEW_FAILURE,
+                    b.STATUS != 'pass' AND t.STATUS = 'pass' AS RESOLVED,
+                    b.UNIQUE_ID IS NOT NULL
+                        AND b.SEVERITY_LEVEL IS NOT t.SEVERITY_LEVEL
+                        AS SEVERITY_CHANGED,
+                    b.UNIQUE_ID IS NOT NULL AND b.FAILURES IS NOT t.FAILURES
+                        AS FAILURES_CHANGED,
+                    0 AS REMOVED
+                FROM test_result_history t
+                LEFT JOIN test_result_history b
+                    ON b.RUN_ID = :base AND b.UNIQUE_ID = t.UNIQUE_ID
+                WHERE t.RUN_ID = :target
+                AND (NEW_FAILURE OR RESOLVED OR SEVERITY_CHANGED OR FAILURES_CHANGED)
+                UNION ALL
+                SELECT
+                    b.UNIQUE_ID, b.TABLE_NAME, b.TEST_NAME, b.QUALITY_DIMENSION,
+                    b.STATUS, NULL, b.SEVERITY_LEVEL, NULL, b.FAILURES, NULL,
+                    0, 0, 0, 0, 1
+                FROM test_result_history b
+                WHERE b.RUN_ID = :base
+                AND NOT EXISTS (
+                    SELECT 1 FROM test_result_history t
+                    WHERE t.RUN_ID = :target AND t.UNIQUE_ID = b.UNIQUE_ID
+                )
+            )
+            ORDER BY COALESCE(TARGET_SEVERITY_LEVEL, BASE_SEVERITY_LEVEL), UNIQUE_ID
+            """,
+            conn,
+            params={"base": base_run_id, "target": target_run_id},
+        )
+        conn.close()
+    except Exception as e:
+        print(f"Error comparing runs {base_run_id} and {target_run_id}: {str(e)}")
+        changes = pd.DataFrame(columns=list(DIFF_CATEGORIES.values()))
+
+    flags = list(DIFF_CATEGORIES.values())
+    changes[flags] = changes[flags].fillna(0).astype(bool)
+    return {
+        category: changes[changes[flag]].drop(columns=flags).reset_index(drop=True)
+        for category, flag in DIFF_CATEGORIES.items()
+    }
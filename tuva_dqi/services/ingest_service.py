@@ -0,0 +1,791 @@
+import base64
+import hashlib
+import io
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+from pandas import DataFrame
+
+from db import (
+    CHART_CATALOG_COLUMNS,
+    TYPED_COLUMNS,
+    bump_data_version,
+    count_chart_rows,
+    create_indexes,
+    create_summary_triggers,
+    create_table,
+    epoch_seconds,
+    rebuild_summaries,
+    register_marts,
+    typed_axis_columns,
+)
+from services.history_service import add_run, compact_database, delete_expired_runs
+
+# Number of rows handed to a single executemany call
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Number of CSV rows parsed into memory at a time during streaming ingest
+DEFAULT_CSV_CHUNK_SIZE = 20_000
+
+# Number of base64 characters decoded at a time (must be a multiple of 4)
+BASE64_BLOCK_SIZE = 1 << 20
+
+# Number of rows kept from the first chunk for the upload preview table
+PREVIEW_ROWS = 10
+
+# Ingest modes: replace the whole table, or upsert rows on the table's key
+INGEST_REPLACE = "replace"
+INGEST_INCREMENTAL = "incremental"
+
+# Key column used to upsert rows in incremental mode, for tables that have one
+UPSERT_KEYS = {"test_results": "UNIQUE_ID"}
+
+# Column holding a hash of each row's loaded values, for tables with an upsert key
+ROW_HASH_COLUMN = "ROW_HASH"
+
+# Test results columns flagging each data mart a test affects, as FLAG_<mart>
+MART_FLAG_PREFIX = "FLAG_"
+
+# Bridge table holding the mart memberships read from those flags, for tables
+# that have them, keyed on the table's upsert key
+MART_BRIDGES = {"test_results": "test_mart"}
+
+# Catalog table holding the per-graph metadata of uploaded chart rows
+CHART_CATALOGS = {"chart_data": "chart_catalog"}
+
+# Distinct unparseable values kept per column in the validation report
+INVALID_VALUE_EXAMPLES = 5
+
+# Age in seconds after which a staging or retired table is taken to be left
+# behind by an interrupted load rather than in use by a running one
+STALE_STAGING_SECONDS = 24 * 60 * 60
+
+
+class Base64Stream(io.RawIOBase):
+    """Binary stream that lazily decodes a base64 string block by block.
+
+    Dash delivers uploads as ``data:<type>;base64,<payload>`` strings. Reading
+    through this stream means the decoded file never exists in memory as a
+    whole, only one block of it at a time.
+    """
+
+    def __init__(self, encoded: str, start: int = 0, block_size=BASE64_BLOCK_SIZE):
+        self._encoded = encoded
+        self._position = start
+        self._block_size = block_size - block_size % 4
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    @property
+    def fraction_read(self) -> float:
+        """Fraction of the encoded payload consumed so far."""
+        return self._position / len(self._encoded) if self._encoded else 1.0
+
+    def readinto(self, buffer) -> int:
+        while not self._pending and self._position < len(self._encoded):
+            block = self._encoded[self._position : self._position + self._block_size]
+            self._position += len(block)
+            self._pending = base64.b64decode(block)
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def open_upload(contents: str) -> io.BufferedReader:
+    """Open the payload of a Dash upload ``contents`` string as a binary stream."""
+    return io.BufferedReader(Base64Stream(contents, start=contents.index(",") + 1))
+
+
+def read_csv_chunks(stream, chunk_size: int = DEFAULT_CSV_CHUNK_SIZE):
+    """Parse a CSV stream into DataFrames of at most ``chunk_size`` rows.
+
+    Column names are upper-cased to match the database schema.
+    """
+    for chunk in pd.read_csv(stream, chunksize=chunk_size):
+        chunk.columns = [col.upper() for col in chunk.columns]
+        yield chunk
+
+
+def upload_digest(contents: str, block_size: int = BASE64_BLOCK_SIZE) -> str:
+    """Compute the SHA-256 digest of the payload of a Dash upload string.
+
+    The base64 payload is hashed directly in blocks, which identifies the
+    file without decoding it or copying it as a whole.
+    """
+    digest = hashlib.sha256()
+    for start in range(contents.index(",") + 1, len(contents), block_size):
+        digest.update(contents[start : start + block_size].encode("ascii"))
+    return digest.hexdigest()
+
+
+def get_upload_digest(conn, table_name: str) -> str | None:
+    """Get the digest of the file a table was last loaded from, if it is known."""
+    row = conn.execute(
+        "SELECT DIGEST FROM upload_digests WHERE TABLE_NAME = ?", (table_name,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def set_upload_digest(conn, table_name: str, digest: str | None, rows: int = 0):
+    """Record the file a table now matches, or forget it when ``digest`` is None.
+
+    Runs inside the caller's transaction.
+    """
+    conn.execute("DELETE FROM upload_digests WHERE TABLE_NAME = ?", (table_name,))
+    if digest is not None:
+        conn.execute(
+            "INSERT INTO upload_digests (TABLE_NAME, DIGEST, ROWS, LOADED_AT) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                table_name,
+                digest,
+                rows,
+                datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            ),
+        )
+
+
+def detect_upload_type(columns) -> str | None:
+    """Work out which table an uploaded CSV belongs to from its columns."""
+    if "DATA_QUALITY_CATEGORY" in columns and "GRAPH_NAME" in columns:
+        return "chart_data"
+    if "UNIQUE_ID" in columns and "TEST_NAME" in columns:
+        return "test_results"
+    return None
+
+
+def get_table_columns(conn, table_name: str) -> list:
+    """Get the column names of a table in schema order."""
+    cursor = conn.execute(f"PRAGMA table_info({table_name})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def filter_to_schema(df: DataFrame, schema_columns: list) -> DataFrame:
+    """Keep only the DataFrame columns that exist in the table schema."""
+    valid_columns = [col for col in df.columns if col in schema_columns]
+    return df[valid_columns]
+
+
+def filter_severity_levels(df: DataFrame) -> tuple[DataFrame, int]:
+    """Drop test results whose severity level is not a whole number from 1 to 5.
+
+    Returns the filtered DataFrame and the number of rows removed.
+    """
+    if "SEVERITY_LEVEL" not in df.columns:
+        return df, 0
+
+    # Non-numeric severities are treated as out of range rather than failing
+    severity = pd.to_numeric(df["SEVERITY_LEVEL"], errors="coerce")
+    filtered_df = df[(severity >= 1) & (severity <= 5) & (severity % 1 == 0)]
+    return filtered_df, len(df) - len(filtered_df)
+
+
+def coerce_column_types(
+    df: DataFrame, column_types: dict[str, str]
+) -> tuple[DataFrame, dict[str, pd.Series]]:
+    """Convert the columns in ``column_types`` to integers or epoch timestamps.
+
+    Values that cannot be parsed are stored as NULL. Returns the converted
+    DataFrame and the unparseable values of each column.
+    """
+    typed = {}
+    invalid = {}
+    for column, kind in column_types.items():
+        if column not in df:
+            continue
+        values = df[column]
+        if kind == "timestamp":
+            parsed = epoch_seconds(values)
+        else:
+            parsed = pd.to_numeric(values, errors="coerce")
+            parsed = parsed.where(parsed % 1 == 0)
+        present = values.notna() & (values.astype("string").str.strip() != "")
+        unparseable = present & parsed.isna()
+        if unparseable.any():
+            invalid[column] = values[unparseable]
+        typed[column] = parsed.astype("Int64")
+    return df.assign(**typed), invalid
+
+
+def add_invalid_values(report: dict, invalid: dict[str, pd.Series]) -> None:
+    """Add a chunk's unparseable values to a validation report.
+
+    The report maps each column to its count of unparseable values and up to
+    ``INVALID_VALUE_EXAMPLES`` distinct examples of them.
+    """
+    for column, values in invalid.items():
+        entry = report.setdefault(column, {"count": 0, "examples": []})
+        entry["count"] += len(values)
+        for value in values.astype(str).unique():
+            if len(entry["examples"]) >= INVALID_VALUE_EXAMPLES:
+                break
+            if value not in entry["examples"]:
+                entry["examples"].append(value)
+
+
+def row_hashes(df: DataFrame) -> pd.Series:
+    """Hash the values of each DataFrame row into a 16 character hex string.
+
+    Values are compared as text, with whole-number floats written as integers,
+    so a row hashes the same whether pandas parsed a column as int or float.
+    """
+    normalized = df.copy()
+    for col in normalized.columns:
+        values = normalized[col]
+        if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+            normalized[col] = values.astype("Int64")
+    hashes = pd.util.hash_pandas_object(normalized.astype("string"), index=False)
+    return hashes.map("{:016x}".format)
+
+
+def mart_flag_columns(columns) -> list:
+    """Get the mart flag columns of an upload, including marts not seen before."""
+    return [
+        col
+        for col in columns
+        if col.startswith(MART_FLAG_PREFIX) and len(col) > len(MART_FLAG_PREFIX)
+    ]
+
+
+def mart_memberships(df: DataFrame, flag_columns: list) -> DataFrame:
+    """Turn the mart flags of test results into UNIQUE_ID, MART bridge rows."""
+    if not flag_columns:
+        return DataFrame(columns=["UNIQUE_ID", "MART"])
+    flags = df[flag_columns].apply(pd.to_numeric, errors="coerce").eq(1)
+    flags.index = df["UNIQUE_ID"]
+    flags.columns = [col[len(MART_FLAG_PREFIX) :] for col in flag_columns]
+    flagged = flags.stack()
+    flagged = flagged[flagged]
+    return DataFrame(
+        {
+            "UNIQUE_ID": flagged.index.get_level_values(0),
+            "MART": flagged.index.get_level_values(1),
+        }
+    )
+
+
+def split_chart_rows(df: DataFrame, graph_ids: dict) -> tuple[DataFrame, DataFrame]:
+    """Split uploaded chart rows into new catalog entries and slim chart rows.
+
+    Graphs missing from ``graph_ids`` get the next id, which is added to it,
+    and a catalog entry taken from their first row. The chart rows keep their
+    remaining columns, gain the typed axis columns, parsed by the axis
+    descriptions of their graph, and refer to their graph by GRAPH_ID.
+    """
+    new_graphs = df.drop_duplicates("GRAPH_NAME")
+    new_graphs = new_graphs[~new_graphs["GRAPH_NAME"].isin(graph_ids)]
+    for graph_name in new_graphs["GRAPH_NAME"]:
+        graph_ids[graph_name] = len(graph_ids) + 1
+
+    catalog = new_graphs.reindex(columns=CHART_CATALOG_COLUMNS)
+    catalog.insert(0, "GRAPH_ID", catalog["GRAPH_NAME"].map(graph_ids))
+    rows = df.drop(columns=[col for col in CHART_CATALOG_COLUMNS if col in df])
+    rows.insert(0, "GRAPH_ID", df["GRAPH_NAME"].map(graph_ids))
+    return catalog, rows.join(typed_axis_columns(df))
+
+
+def iter_record_chunks(df: DataFrame, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield lists of row tuples ready for executemany, with NaN mapped to NULL."""
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start : start + chunk_size].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        yield list(chunk.itertuples(index=False, name=None))
+
+
+def bulk_insert(
+    conn, table_name: str, df: DataFrame, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """Insert every row of a DataFrame into a table using chunked executemany.
+
+    The statement is built once and the caller owns the transaction, so nothing
+    is committed here. Returns the number of rows inserted.
+    """
+    if df.empty:
+        return 0
+
+    columns = ", ".join(df.columns)
+    placeholders = ", ".join(["?"] * len(df.columns))
+    sql = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+
+    for records in iter_record_chunks(df, chunk_size):
+        conn.executemany(sql, records)
+
+    return len(df)
+
+
+def create_staging_table(conn, table_name: str) -> str:
+    """Create an empty staging copy of a table and return its name.
+
+    Every load stages into its own table, named after the live table with
+    the time it was created and a random token, so concurrent loads of the
+    same table never share one. Staging tables left behind by interrupted
+    loads are discarded once they are ``STALE_STAGING_SECONDS`` old.
+    """
+    drop_stale_staging_tables(conn, table_name)
+    staging_name = f"{table_name}__staging_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+    create_table(conn, table_name, staging_name)
+    conn.commit()
+    return staging_name
+
+
+def drop_stale_staging_tables(conn, table_name: str) -> None:
+    """Drop the staging and retired copies of a table left by interrupted loads."""
+    cutoff = time.time() - STALE_STAGING_SECONDS
+    names = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' "
+        "AND (name GLOB ? OR name GLOB ?)",
+        (f"{table_name}__staging_*", f"{table_name}__retired_*"),
+    ).fetchall()
+    for (name,) in names:
+        created = name.rsplit("_", 2)[-2]
+        if created.isdigit() and int(created) < cutoff:
+            conn.execute(f"DROP TABLE IF EXISTS {name}")
+
+
+def drop_staging_table(conn, staging_name: str) -> None:
+    """Discard a staging table after a failed load."""
+    conn.rollback()
+    conn.execute(f"DROP TABLE IF EXISTS {staging_name}")
+    conn.commit()
+
+
+def swap_staging_tables(conn, staging_names: dict[str, str], publish=None) -> None:
+    """Index loaded staging tables and atomically swap them in for the live tables.
+
+    ``staging_names`` maps each live table to its staging table. All renames
+    happen in one transaction, so readers see either the old tables or the
+    new ones and never a partial load. The index builds happen before the
+    swap and the old tables are dropped after it, which keeps the swap itself
+    down to two catalog updates per table, plus moving the counter triggers to
+    the new tables and rebuilding the summary tables derived from them. If
+    given, ``publish`` is called with the connection before the swap commits,
+    so whatever it writes about the load is committed together with it.
+    """
+    for table_name, staging_name in staging_names.items():
+        create_indexes(conn, table_name, staging_name)
+    conn.commit()
+
+    # Each live table is retired under its staging table's unique suffix
+    retired_names = {
+        table_name: staging_name.replace("__staging_", "__retired_", 1)
+        for table_name, staging_name in staging_names.items()
+    }
+
+    # Keep other tables' triggers and views pointing at the live table name
+    conn.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for table_name, staging_name in staging_names.items():
+            retired_name = retired_names[table_name]
+            conn.execute(f"ALTER TABLE {table_name} RENAME TO {retired_name}")
+            conn.execute(f"ALTER TABLE {staging_name} RENAME TO {table_name}")
+        create_summary_triggers(conn, staging_names)
+        rebuild_summaries(conn, staging_names)
+        if publish is not None:
+            publish(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("PRAGMA legacy_alter_table = OFF")
+
+    for retired_name in retired_names.values():
+        conn.execute(f"DROP TABLE {retired_name}")
+    conn.commit()
+
+
+def apply_staged_upsert(
+    conn,
+    table_name: str,
+    staging_name: str,
+    columns: list,
+    delete_missing: bool = False,
+    bridge_staging_name: str = None,
+    publish=None,
+) -> dict:
+    """Merge a loaded staging table into the live table on its key column.
+
+    New keys are inserted and existing rows are updated only when one of
+    ``columns`` actually changed, so unchanged rows cost no writes. When the
+    rows carry a ``ROW_HASH_COLUMN``, the hashes alone are compared. With
+    ``delete_missing``, live rows whose key is absent from the staging table
+    are deleted, along with their mart memberships. If given, the staged mart
+    memberships in ``bridge_staging_name`` replace those of every staged key.
+    Everything is applied in one transaction, in which triggers adjust the
+    summary counters for just the rows written, and the staging tables are
+    dropped afterwards. As with ``swap_staging_tables``, ``publish`` is called
+    inside that transaction.
+
+    Returns the inserted, updated, unchanged and deleted row counts.
+    """
+    key = UPSERT_KEYS[table_name]
+    bridge = MART_BRIDGES.get(table_name)
+    value_columns = [col for col in columns if col != key]
+    column_list = ", ".join(columns)
+    compared = [ROW_HASH_COLUMN] if ROW_HASH_COLUMN in columns else value_columns
+    changed = (
+        " OR ".join(f"{table_name}.{col} IS NOT excluded.{col}" for col in compared)
+        or "0"
+    )
+    assignments = ", ".join(f"{col} = excluded.{col}" for col in value_columns)
+
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        staged = conn.execute(f"SELECT COUNT(*) FROM {staging_name}").fetchone()[0]
+        inserted = conn.execute(
+            f"""
+            SELECT COUNT(*) FROM {staging_name} s
+            WHERE NOT EXISTS (SELECT 1 FROM {table_name} t WHERE t.{key} = s.{key})
+            """
+        ).fetchone()[0]
+
+        upsert = f"""
+            INSERT INTO {table_name} ({column_list})
+            SELECT {column_list} FROM {staging_name} WHERE true
+            ON CONFLICT ({key}) DO
+        """
+        if assignments:
+            upsert += f" UPDATE SET {assignments} WHERE {changed}"
+        else:
+            upsert += " NOTHING"
+        # Counts inserted rows plus rows whose DO UPDATE actually ran
+        written = conn.execute(upsert).rowcount
+
+        deleted = 0
+        if delete_missing:
+            deleted = conn.execute(
+                f"""
+                DELETE FROM {table_name}
+                WHERE {key} NOT IN (SELECT {key} FROM {staging_name})
+                """
+            ).rowcount
+            if bridge is not None:
+                conn.execute(
+                    f"""
+                    DELETE FROM {bridge}
+                    WHERE {key} NOT IN (SELECT {key} FROM {staging_name})
+                    """
+                )
+
+        if bridge_staging_name is not None:
+            # Only memberships that changed are written, which keeps the
+            # counter triggers on the bridge quiet for unchanged tests
+            conn.execute(
+                f"""
+                DELETE FROM {bridge}
+                WHERE {key} IN (SELECT {key} FROM {staging_name})
+                AND ({key}, MART) NOT IN (
+                    SELECT {key}, MART FROM {bridge_staging_name}
+                )
+                """
+            )
+            conn.execute(
+                f"INSERT OR IGNORE INTO {bridge} SELECT * FROM {bridge_staging_name}"
+            )
+
+        if publish is not None:
+            publish(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    conn.execute(f"DROP TABLE {staging_name}")
+    if bridge_staging_name is not None:
+        conn.execute(f"DROP TABLE {bridge_staging_name}")
+    conn.commit()
+
+    updated = written - inserted
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": staged - inserted - updated,
+        "deleted": deleted,
+    }
+
+
+def replace_table_data(
+    conn, table_name: str, df: DataFrame, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> dict:
+    """Replace the contents of a table with a DataFrame.
+
+    The rows are loaded into a staging table that is swapped in once complete,
+    together with the mart memberships of their ``FLAG_<mart>`` columns for
+    tables with a bridge table. The load is published like an upload, in the
+    swap's transaction (see ``publish_load``), except that the table matches
+    no uploaded file.
+    Returns load statistics: rows written, elapsed seconds and rows per second.
+    """
+    start = time.perf_counter()
+    set_upload_digest(conn, table_name, None)
+    conn.commit()
+    bridge = MART_BRIDGES.get(table_name)
+    flag_columns = mart_flag_columns(df.columns) if bridge else []
+    staging_names = {table_name: create_staging_table(conn, table_name)}
+    if bridge is not None:
+        staging_names[bridge] = create_staging_table(conn, bridge)
+    try:
+        rows = bulk_insert(conn, staging_names[table_name], df, chunk_size)
+        if bridge is not None:
+            bulk_insert(conn, staging_names[bridge], mart_memberships(df, flag_columns))
+        conn.commit()
+        swap_staging_tables(
+            conn,
+            staging_names,
+            publish=lambda conn: publish_load(
+                conn, table_name, None, rows, flag_columns
+            ),
+        )
+    except Exception:
+        for staging_name in staging_names.values():
+            drop_staging_table(conn, staging_name)
+        raise
+
+    return load_stats(rows, time.perf_counter() - start)
+
+
+def publish_load(
+    conn, table_name: str, digest: str | None, rows: int, flag_columns: list
+) -> None:
+    """Publish a completed load of a table.
+
+    Records the file the table now matches, if any, adds the marts named by
+    the load's flag columns to the registry and bumps the data version, which
+    invalidates cached query results in every worker. Runs inside the
+    transaction that swaps or merges in the load, so readers never see the
+    new data under the old version.
+    """
+    set_upload_digest(conn, table_name, digest, rows)
+    register_marts(conn, [col[len(MART_FLAG_PREFIX) :] for col in flag_columns])
+    bump_data_version(conn)
+
+
+def load_stats(rows: int, seconds: float) -> dict:
+    """Build the statistics dictionary reported for a load."""
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": int(rows / seconds) if seconds > 0 else rows,
+    }
+
+
+def ingest_upload(
+    conn,
+    contents: str,
+    chunk_size: int = DEFAULT_CSV_CHUNK_SIZE,
+    progress=None,
+    mode: str = INGEST_REPLACE,
+    delete_missing: bool = False,
+) -> dict:
+    """Stream an uploaded CSV into the database chunk by chunk.
+
+    Each chunk is parsed, filtered to the schema (and to severity levels 1-5
+    for test results) and written before the next chunk is read, so peak
+    memory depends on ``chunk_size`` rather than on the size of the file.
+    Chunks are committed to a staging table as they are written and the
+    staging table replaces the live table only once the whole file is loaded.
+
+    In ``INGEST_INCREMENTAL`` mode, tables with an upsert key are instead
+    merged row by row (see ``apply_staged_upsert``), optionally deleting rows
+    missing from the file. Tables without a key are always replaced.
+
+    A file identical to the one the table was last loaded from is skipped
+    without writing anything, and ``skipped`` is set in the summary. Rows of
+    tables with an upsert key are stored with a ``ROW_HASH_COLUMN`` so an
+    incremental load can spot changed rows by comparing a single column.
+
+    The ``FLAG_<mart>`` columns of test results are also loaded into the
+    ``test_mart`` bridge table, including flags of marts the schema has no
+    column for, and any new marts are added to the ``marts`` registry.
+
+    Chart metadata is loaded once per graph into ``chart_catalog``, along
+    with each graph's row count, filter values and axis kinds, while
+    ``chart_data`` gets the remaining columns, the axes parsed into typed
+    columns, and the graph's GRAPH_ID. Chart rows without a graph name are
+    dropped and counted in ``removed_rows``.
+
+    Timestamps and counts listed in ``TYPED_COLUMNS`` are stored as integers.
+    Values that cannot be parsed are stored as NULL and reported per column
+    in ``invalid_values`` (see ``add_invalid_values``).
+
+    Every completed load bumps the data version, which invalidates cached
+    query results in every worker. Every test results load is recorded as a
+    run in the test result history (see ``history_service.add_run``) and runs
+    outside the retention policy are deleted. All of this is committed in
+    the same transaction as the load itself, after which the free pages are
+    released (see ``history_service.compact_database``).
+
+    Returns a summary of the load. ``file_type`` is None when the CSV does not
+    look like a test results or chart data export, in which case nothing is
+    written. If given, ``progress`` is called after every chunk with the rows
+    written so far and the fraction of the upload read.
+    """
+    start = time.perf_counter()
+    summary = {
+        "file_type": None,
+        "rows": 0,
+        "removed_rows": 0,
+        "total_columns": 0,
+        "valid_columns": [],
+        "has_severity": False,
+        "invalid_values": {},
+        "graph_ids": {},
+        "preview": [],
+        "mode": INGEST_REPLACE,
+        "inserted": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "deleted": 0,
+        "skipped": False,
+        "run_id": None,
+    }
+
+    digest = upload_digest(contents)
+    stream = open_upload(contents)
+    staging_name = None
+    bridge = None
+    bridge_staging_name = None
+    catalog = None
+    catalog_staging_name = None
+    flag_columns = []
+    try:
+        for chunk in read_csv_chunks(stream, chunk_size):
+            if summary["file_type"] is None:
+                summary["file_type"] = detect_upload_type(chunk.columns)
+                if summary["file_type"] is None:
+                    break
+
+                schema_columns = get_table_columns(conn, summary["file_type"])
+                catalog = CHART_CATALOGS.get(summary["file_type"])
+                if catalog is not None:
+                    schema_columns += CHART_CATALOG_COLUMNS
+                summary["total_columns"] = len(chunk.columns)
+                summary["valid_columns"] = [
+                    col
+                    for col in chunk.columns
+                    if col in schema_columns and col != ROW_HASH_COLUMN
+                ]
+                summary["has_severity"] = "SEVERITY_LEVEL" in chunk.columns
+                if mode == INGEST_INCREMENTAL and summary["file_type"] in UPSERT_KEYS:
+                    summary["mode"] = INGEST_INCREMENTAL
+
+                if get_upload_digest(conn, summary["file_type"]) == digest:
+                    summary["skipped"] = True
+                    summary["preview"] = (
+                        chunk[summary["valid_columns"]]
+                        .head(PREVIEW_ROWS)
+                        .to_dict("records")
+                    )
+                    break
+
+                # Forget the previous file until this one is fully loaded, so
+                # an interrupted load is never mistaken for a completed one
+                set_upload_digest(conn, summary["file_type"], None)
+                conn.commit()
+                staging_name = create_staging_table(conn, summary["file_type"])
+
+                # A replace rebuilds every mart membership, while a merge only
+                # touches them when the file has mart flags
+                bridge = MART_BRIDGES.get(summary["file_type"])
+                flag_columns = mart_flag_columns(chunk.columns) if bridge else []
+                if bridge and (flag_columns or summary["mode"] == INGEST_REPLACE):
+                    bridge_staging_name = create_staging_table(conn, bridge)
+                if catalog is not None:
+                    catalog_staging_name = create_staging_table(conn, catalog)
+
+            if summary["file_type"] == "test_results":
+                chunk, removed = filter_severity_levels(chunk)
+                summary["removed_rows"] += removed
+            else:
+                # Chart rows without a graph name can never be shown
+                named = chunk["GRAPH_NAME"].notna()
+                summary["removed_rows"] += int((~named).sum())
+                chunk = chunk[named]
+
+            # Flags of marts the schema does not know yet are only in the file
+            if bridge_staging_name is not None:
+                bulk_insert(
+                    conn, bridge_staging_name, mart_memberships(chunk, flag_columns)
+                )
+            chunk = chunk[summary["valid_columns"]]
+
+            if not summary["preview"]:
+                summary["preview"] = chunk.head(PREVIEW_ROWS).to_dict("records")
+
+            column_types = TYPED_COLUMNS.get(summary["file_type"])
+            if column_types:
+                chunk, invalid = coerce_column_types(chunk, column_types)
+                add_invalid_values(summary["invalid_values"], invalid)
+            if summary["file_type"] in UPSERT_KEYS:
+                chunk = chunk.assign(**{ROW_HASH_COLUMN: row_hashes(chunk)})
+            if catalog_staging_name is not None:
+                catalog_rows, chunk = split_chart_rows(chunk, summary["graph_ids"])
+                bulk_insert(conn, catalog_staging_name, catalog_rows)
+            summary["rows"] += bulk_insert(conn, staging_name, chunk)
+            conn.commit()
+            if progress is not None:
+                progress(summary["rows"], stream.raw.fraction_read)
+
+        def publish(conn):
+            # After a merge that kept rows or columns the file did not have,
+            # the table no longer corresponds to any single file
+            matches_file = summary["mode"] == INGEST_REPLACE or (
+                delete_missing
+                and set(summary["valid_columns"])
+                == set(schema_columns) - {ROW_HASH_COLUMN}
+            )
+            publish_load(
+                conn,
+                summary["file_type"],
+                digest if matches_file else None,
+                summary["rows"],
+                flag_columns,
+            )
+            if summary["file_type"] == "test_results":
+                summary["run_id"] = add_run(conn, summary["mode"])
+                delete_expired_runs(conn)
+
+        if summary["mode"] == INGEST_INCREMENTAL:
+            summary.update(
+                apply_staged_upsert(
+                    conn,
+                    summary["file_type"],
+                    staging_name,
+                    [*summary["valid_columns"], ROW_HASH_COLUMN],
+                    delete_missing=delete_missing,
+                    bridge_staging_name=bridge_staging_name,
+                    publish=publish,
+                )
+            )
+        elif staging_name is not None:
+            staging_names = {summary["file_type"]: staging_name}
+            if bridge_staging_name is not None:
+                staging_names[bridge] = bridge_staging_name
+            if catalog_staging_name is not None:
+                count_chart_rows(conn, catalog_staging_name, staging_name)
+                conn.commit()
+                staging_names[catalog] = catalog_staging_name
+            swap_staging_tables(conn, staging_names, publish=publish)
+            summary["inserted"] = summary["rows"]
+    except Exception:
+        if staging_name is not None:
+            drop_staging_table(conn, staging_name)
+        if bridge_staging_name is not None:
+            drop_staging_table(conn, bridge_staging_name)
+        if catalog_staging_name is not None:
+            drop_staging_table(conn, catalog_staging_name)
+        raise
+
+    if staging_name is not None:
+        compact_database(conn)
+
+    summary["graph_count"] = len(summary.pop("graph_ids"))
+    summary.update(load_stats(summary["rows"], time.perf_counter() - start))
+    return summary
@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from db import get_db_connection, run_backfill_batch
+from services.history_service import vacuum_database
+from services.ingest_service import INGEST_REPLACE, ingest_upload
+
+# Job states recorded in the ingest_jobs table
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+# Seconds between checks of whether the database needs a full VACUUM
+VACUUM_INTERVAL_SECONDS = int(os.environ.get("VACUUM_INTERVAL_SECONDS", 24 * 60 * 60))
+
+# A single worker keeps uploads in this process from competing for the write lock
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _update_job(job_id: str, **fields) -> None:
+    """Write the given fields to a job row."""
+    fields["UPDATED_AT"] = _now()
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            f"UPDATE ingest_jobs SET {assignments} WHERE JOB_ID = ?",
+            [*fields.values(), job_id],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run_ingest_job(
+    job_id: str,
+    contents: str,
+    mode: str = INGEST_REPLACE,
+    delete_missing: bool = False,
+) -> None:
+    """Run an ingest job to completion, recording its outcome in ingest_jobs."""
+    _update_job(job_id, STATE=JOB_RUNNING)
+    try:
+        conn = get_db_connection()
+        try:
+            summary = ingest_upload(
+                conn,
+                contents,
+                # Chunks are committed to a staging table as they load, so
+                # progress can be recorded where any worker can poll it
+                progress=lambda rows, fraction: _update_job(
+                    job_id, ROWS_PROCESSED=rows, PROGRESS=fraction
+                ),
+                mode=mode,
+                delete_missing=delete_missing,
+            )
+        finally:
+            conn.close()
+
+        _update_job(
+            job_id,
+            STATE=JOB_SUCCEEDED,
+            ROWS_PROCESSED=summary["rows"],
+            PROGRESS=1.0,
+            RESULT=json.dumps(summary, default=str),
+        )
+    except Exception as e:
+        _update_job(
+            job_id,
+            STATE=JOB_FAILED,
+            ERROR=f"{str(e)}\n\n{traceback.format_exc()}",
+        )
+
+
+def submit_ingest_job(
+    contents: str,
+    filename: str,
+    mode: str = INGEST_REPLACE,
+    delete_missing: bool = False,
+) -> str:
+    """Queue an upload for background ingest and return its job id."""
+    job_id = uuid.uuid4().hex
+    now = _now()
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """
+            INSERT INTO ingest_jobs
+                (JOB_ID, FILENAME, STATE, ROWS_PROCESSED, PROGRESS, CREATED_AT, UPDATED_AT)
+            VALUES (?, ?, ?, 0, 0, ?, ?)
+            """,
+            (job_id, filename, JOB_QUEUED, now, now),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    _executor.submit(run_ingest_job, job_id, contents, mode, delete_missing)
+    return job_id
+
+
+def run_backfill_job() -> None:
+    """Run one batch of pending schema backfills, queueing the next if needed.
+
+    Each batch goes back to the end of the ingest queue, so an upload made
+    while a large table is being backfilled waits for one batch, not all.
+    """
+    conn = get_db_connection()
+    try:
+        pending = run_backfill_batch(conn)
+    except Exception as e:
+        print(f"Error running schema backfill: {str(e)}")
+        pending = False
+    finally:
+        conn.close()
+
+    if pending:
+        _executor.submit(run_backfill_job)
+
+
+def submit_backfill_job() -> None:
+    """Start running pending schema backfills in the background."""
+    _executor.submit(run_backfill_job)
+
+
+def run_vacuum_job() -> None:
+    """Rebuild the database with a full VACUUM if enough of it is free.
+
+    Ingest only releases free pages incrementally, so databases created
+    without incremental auto-vacuum are compacted here instead, on the ingest
+    queue so the rebuild never competes with an upload for the write lock.
+    """
+    conn = get_db_connection()
+    try:
+        vacuum_database(conn)
+    except Exception as e:
+        print(f"Error vacuuming database: {str(e)}")
+    finally:
+        conn.close()
+
+
+def schedule_vacuum_job(interval: int = VACUUM_INTERVAL_SECONDS) -> None:
+    """Queue the vacuum job now and again every ``interval`` seconds."""
+    _executor.submit(run_vacuum_job)
+    timer = threading.Timer(interval, schedule_vacuum_job, (interval,))
+    timer.daemon = True
+    timer.start()
+
+
+def get_ingest_job(job_id: str) -> dict | None:
+    """Get the state of an ingest job, or None if the job does not exist."""
+    conn = get_db_connection(read_only=True)
+    try:
+        row = conn.execute(
+            "SELECT * FROM ingest_jobs WHERE JOB_ID = ?", (job_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+    if row is None:
+        return None
+
+    return {
+        "job_id": row["JOB_ID"],
+        "filename": row["FILENAME"],
+        "state": row["STATE"],
+        "rows_processed": row["ROWS_PROCESSED"] or 0,
+        "progress": row["PROGRESS"] or 0.0,
+        "error": row["ERROR"],
+        "result": json.loads(row["RESULT"]) if row["RESULT"] else None,
+        "created_at": row["CREATED_AT"],
+        "updated_at": row["UPDATED_AT"],
+    }
@@ -0,0 +1,161 @@
+from db import FACET_COLUMNS, get_db_connection
+from services.cache import cached
+from services.dqi_service import TEST_PAGE_SIZE, explorer_filter_sql, read_test_rows
+
+# Facets of the test search; MART counts tests through the test_mart bridge
+# table and the others count test_results by the column of the same name
+SEARCH_FACETS = [
+    "TABLE_NAME",
+    "TEST_COLUMN_NAME",
+    "QUALITY_DIMENSION",
+    "TEST_CATEGORY",
+    "MART",
+    "SEVERITY_LEVEL",
+]
+
+# Facets of which a search selects at most one value. The facet counts are
+# summed per mart, which would count a test in several chosen marts more than
+# once, so a search of several marts would have to count test_results.
+SINGLE_VALUE_FACETS = ["MART"]
+
+# Most common values of each facet returned with their counts
+FACET_VALUE_LIMIT = 25
+
+
+def search_conditions(
+    selections: dict, status: str = None, filters=(), exclude: str = None
+) -> tuple[list, list, set, list]:
+    """Build the conditions selecting tests for a search.
+
+    Every selected facet value is combined with the status and column
+    filters of ``explorer_filter_sql``. The selection of ``exclude`` is left
+    out, so a facet's counts show what choosing another of its values would
+    match. The selected marts are returned apart from the conditions, which
+    only test columns of test_results, along with the columns they test.
+
+    Raises ValueError for an unknown facet, or for more than one value of a
+    facet in ``SINGLE_VALUE_FACETS``.
+    """
+    where, params = explorer_filter_sql(status, filters=filters)
+    conditions = [where]
+    columns = {column for column, _, _ in filters}
+    if status is not None:
+        columns.add("STATUS")
+    marts = []
+    for facet, values in selections.items():
+        if facet not in SEARCH_FACETS:
+            raise ValueError(f"Unknown search facet: {facet}")
+        if facet in SINGLE_VALUE_FACETS and len(values) > 1:
+            raise ValueError(f"Only one value of {facet} can be searched at a time")
+        if facet == exclude or not values:
+            continue
+        if facet == "MART":
+            marts = list(values)
+            continue
+        conditions.append(f"{facet} IN ({', '.join(['?'] * len(values))})")
+        params.extend(values)
+        columns.add(facet)
+    return conditions, params, columns, marts
+
+
+def mart_condition(marts) -> str:
+    """Build the condition matching tests of test_results in the selected mart.
+
+    The probe looks each test up in test_mart, so the scan of test_results
+    can follow the index its sort order uses.
+    """
+    return (
+        "EXISTS (SELECT 1 FROM test_mart WHERE test_mart.UNIQUE_ID = "
+        "test_results.UNIQUE_ID AND test_mart.MART IN "
+        f"({', '.join(['?'] * len(marts))}))"
+    )
+
+
+def read_test_counts(conn, facet, conditions, params, columns, marts) -> list:
+    """Count the tests matching a search, by each value of a facet.
+
+    Counts every matching test as one (None, tests) row when ``facet`` is
+    None. The counts are summed from facet_summary, or mart_facet_summary
+    when they are by mart or within the selected mart, as long as the
+    conditions only test columns the summaries are grouped by. Filters on any
+    other column have to count test_results itself.
+    """
+    params = list(params)
+    conditions = list(conditions)
+    if columns <= set(FACET_COLUMNS):
+        source = "facet_summary"
+        if facet == "MART" or marts:
+            source = "mart_facet_summary"
+            if marts:
+                conditions.append("MART = ?")
+                params.extend(marts)
+        tests = "SUM(TESTS)"
+    elif facet == "MART":
+        source = (
+            "test_results JOIN test_mart "
+            "ON test_mart.UNIQUE_ID = test_results.UNIQUE_ID"
+        )
+        tests = "COUNT(*)"
+    else:
+        source = "test_results"
+        if marts:
+            conditions.append(mart_condition(marts))
+            params.extend(marts)
+        tests = "COUNT(*)"
+
+    where = " AND ".join(conditions)
+    if facet is None:
+        total = conn.execute(f"SELECT {tests} FROM {source} WHERE {where}", params)
+        return [(None, total.fetchone()[0] or 0)]
+    rows = conn.execute(
+        f"""
+        SELECT {facet}, {tests} AS TESTS FROM {source}
+        WHERE {where} AND {facet} IS NOT NULL
+        GROUP BY {facet}
+        ORDER BY TESTS DESC, 1
+        LIMIT ?
+        """,
+        [*params, FACET_VALUE_LIMIT],
+    ).fetchall()
+    return [(row[0], row[1]) for row in rows if row[1]]
+
+
+@cached
+def search_tests(
+    selections=(),
+    status: str = None,
+    filters=(),
+    sort_by=(),
+    page: int = 1,
+    page_size: int = TEST_PAGE_SIZE,
+) -> dict:
+    """Search the tests by facet values and get the counts of every facet.
+
+    ``selections`` holds (facet, values) pairs; a test matches when it has
+    one of the selected values of every facet. Facets in
+    ``SINGLE_VALUE_FACETS``, the data mart, take one value at a time, which
+    keeps every count that only involves facets in the summary tables. The
+    status, filters, sort order and page work as in
+    ``get_test_explorer_page``; filters on columns other than the facets are
+    counted from test_results, so they cost a scan of the matching tests.
+
+    Returns the page's rows, the total number of matching tests and, for
+    each facet in ``SEARCH_FACETS``, the (value, tests) pairs of its most
+    common values. All of it is read over one connection.
+    """
+    selections = dict(selections)
+    conditions, params, columns, marts = search_conditions(selections, status, filters)
+    conn = get_db_connection(read_only=True)
+    try:
+        [(_, total)] = read_test_counts(conn, None, conditions, params, columns, marts)
+        where = " AND ".join(conditions + ([mart_condition(marts)] if marts else []))
+        rows = read_test_rows(conn, where, params + marts, sort_by, page, page_size)
+        facets = {
+            facet: read_test_counts(
+                conn, facet, *search_conditions(selections, status, filters, facet)
+            )
+            for facet in SEARCH_FACETS
+        }
+    finally:
+        conn.close()
+    return {"rows": rows, "total": total, "facets": facets}
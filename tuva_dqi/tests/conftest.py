@@ -1,9 +1,18 @@
 import os
 import sqlite3
 
+import pandas as pd
 import pytest
 
-from db import init_db
+from db import (
+    TYPED_COLUMNS,
+    close_db_connections,
+    count_chart_rows,
+    get_db_connection,
+    init_db,
+)
+from services.cache import clear_cache
+from services.ingest_service import bulk_insert, coerce_column_types, split_chart_rows
 
 
 @pytest.fixture
@@ -12,6 +21,18 @@ def test_db_path():
     return "test_app_data.db"
 
 
+@pytest.fixture(autouse=True)
+def isolated_query_cache(monkeypatch, test_db_path):
+    """Start every test with an empty query cache versioned by the test database."""
+    clear_cache()
+    monkeypatch.setattr(
+        "services.cache.get_db_connection",
+        lambda **kwargs: get_db_connection(test_db_path, **kwargs),
+    )
+    yield
+    clear_cache()
+
+
 @pytest.fixture
 def test_db_connection(test_db_path):
     """Create a test database connection."""
@@ -27,6 +48,7 @@ def test_db_connection(test_db_path):
 
     # Close and remove the test database
     conn.close()
+    close_db_connections()
     if os.path.exists(test_db_path):
         os.remove(test_db_path)
 
@@ -129,12 +151,16 @@ def sample_test_results(test_db_connection):
         },
     ]
 
-    # Insert the data
+    # Insert the data, with timestamps and counts converted as on ingest
+    typed, _ = coerce_column_types(pd.DataFrame(data), TYPED_COLUMNS["test_results"])
+    bulk_insert(test_db_connection, "test_results", typed)
     for row in data:
-        placeholders = ", ".join(["?"] * len(row))
-        columns = ", ".join(row.keys())
-        query = f"INSERT INTO test_results ({columns}) VALUES ({placeholders})"
-        test_db_connection.execute(query, list(row.values()))
+        for column, value in row.items():
+            if column.startswith("FLAG_") and value == 1:
+                test_db_connection.execute(
+                    "INSERT INTO test_mart (UNIQUE_ID, MART) VALUES (?, ?)",
+                    (row["UNIQUE_ID"], column.removeprefix("FLAG_")),
+                )
 
     test_db_connection.commit()
     return data
@@ -185,13 +211,11 @@ def sample_chart_data(test_db_connection):
         },
     ]
 
-    # Insert the data
-    for row in data:
-        placeholders = ", ".join(["?"] * len(row))
-        columns = ", ".join(row.keys())
-        query = f"INSERT INTO chart_data ({columns}) VALUES ({placeholders})"
-        test_db_connection.execute(query, list(row.values()))
-
+    # Insert the data, with the metadata split into the chart catalog
+    catalog, rows = split_chart_rows(pd.DataFrame(data), {})
+    bulk_insert(test_db_connection, "chart_catalog", catalog)
+    bulk_insert(test_db_connection, "chart_data", rows)
+    count_chart_rows(test_db_connection)
     test_db_connection.commit()
     return data
 
@@ -200,7 +224,7 @@ def sample_chart_data(test_db_connection):
 def mock_get_db_connection(monkeypatch, test_db_connection):
     """Mock the get_db_connection function to return our test connection."""
 
-    def mock_connection():
+    def mock_connection(**kwargs):
         return test_db_connection
 
     # Import the module that contains get_db_connection
@@ -209,3 +233,15 @@ def mock_get_db_connection(monkeypatch, test_db_connection):
     monkeypatch.setattr("services.dqi_service.get_db_connection", mock_connection)
 
     return mock_connection
+
+
+@pytest.fixture
+def managed_get_db_connection(monkeypatch, test_db_connection, test_db_path):
+    """Serve the services managed connections, for tests making several calls."""
+
+    def managed_connection(**kwargs):
+        return get_db_connection(test_db_path, **kwargs)
+
+    monkeypatch.setattr("services.dqi_service.get_db_connection", managed_connection)
+
+    return managed_connection
@@ -0,0 +1,147 @@
+import sqlite3
+
+import pandas as pd
+
+from db import bump_data_version, get_data_version, get_db_connection
+from services.cache import VersionedCache, cache_stats, cached
+from services.dqi_service import get_outstanding_errors, get_test_detail
+from services.ingest_service import ingest_upload
+from tests.test_ingest_service import encode_upload, make_test_results_df
+
+
+class TestVersionedCache:
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest untouched entry is evicted when full."""
+        cache = VersionedCache(max_entries=2)
+        cache.put(1, "a", 1)
+        cache.put(1, "b", 2)
+        cache.get(1, "a")
+        cache.put(1, "c", 3)
+
+        assert cache.get(1, "a") == (True, 1)
+        assert cache.get(1, "b") == (False, None)
+        assert cache.get(1, "c") == (True, 3)
+
+    def test_new_version_discards_entries(self):
+        """Test that entries from an older data version are never returned."""
+        cache = VersionedCache()
+        cache.put(1, "a", 1)
+
+        assert cache.get(2, "a") == (False, None)
+        cache.put(2, "b", 2)
+        assert cache.stats()["entries"] == 1
+
+    def test_counts_hits_and_misses(self):
+        """Test that lookups are counted."""
+        cache = VersionedCache()
+        cache.get(1, "a")
+        cache.put(1, "a", 1)
+        cache.get(1, "a")
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+
+class TestCached:
+    def test_reuses_result_until_version_changes(self, test_db_connection):
+        """Test that a load by any connection invalidates cached results."""
+        calls = []
+
+        @cached
+        def read(value):
+            calls.append(value)
+            return {"value": value}
+
+        read(1)
+        read(1)
+        # A load in another worker only touches the database
+        bump_data_version(test_db_connection)
+        test_db_connection.commit()
+        read(1)
+
+        assert calls == [1, 1]
+        assert cache_stats()["hits"] == 1
+
+    def test_returns_copies(self, test_db_connection):
+        """Test that callers cannot modify the cached value."""
+
+        @cached
+        def read():
+            return pd.DataFrame({"A": [1, 2]})
+
+        result = read()
+        result["A"] = 0
+        assert read()["A"].tolist() == [1, 2]
+
+    def test_does_not_cache_empty_frames(self, test_db_connection):
+        """Test that empty results, also returned on errors, are recomputed."""
+        calls = []
+
+        @cached
+        def read():
+            calls.append(1)
+            return pd.DataFrame()
+
+        read()
+        read()
+        assert len(calls) == 2
+
+    def test_does_not_cache_none(self, test_db_connection):
+        """Test that None, returned on errors by single-row reads, is recomputed."""
+        calls = []
+
+        @cached
+        def read():
+            calls.append(1)
+            return None
+
+        read()
+        read()
+        assert len(calls) == 2
+
+
+class TestServiceCaching:
+    def test_upload_invalidates_service_results(
+        self, test_db_connection, test_db_path, monkeypatch
+    ):
+        """Test that cached dashboard queries see the data from a new upload."""
+        monkeypatch.setattr(
+            "services.dqi_service.get_db_connection",
+            lambda **kwargs: get_db_connection(test_db_path, **kwargs),
+        )
+        ingest_upload(test_db_connection, encode_upload(make_test_results_df(6)))
+        before = get_outstanding_errors()
+        assert get_outstanding_errors().equals(before)
+
+        ingest_upload(test_db_connection, encode_upload(make_test_results_df(9)))
+
+        assert len(before) == 2
+        assert len(get_outstanding_errors()) == 3
+
+    def test_skipped_upload_keeps_version(self, test_db_connection):
+        """Test that re-uploading an identical file keeps cached results valid."""
+        contents = encode_upload(make_test_results_df(6))
+        ingest_upload(test_db_connection, contents)
+        version = get_data_version(test_db_connection)
+
+        ingest_upload(test_db_connection, contents)
+        assert get_data_version(test_db_connection) == version
+
+    def test_retries_test_detail_after_error(
+        self, monkeypatch, test_db_path, sample_test_results
+    ):
+        """Test that a test hidden by a transient read error shows up again."""
+        unique_id = sample_test_results[0]["UNIQUE_ID"]
+
+        def locked(**kwargs):
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr("services.dqi_service.get_db_connection", locked)
+        assert get_test_detail(unique_id) is None
+
+        monkeypatch.setattr(
+            "services.dqi_service.get_db_connection",
+            lambda **kwargs: get_db_connection(test_db_path, **kwargs),
+        )
+        assert get_test_detail(unique_id)["UNIQUE_ID"] == unique_id
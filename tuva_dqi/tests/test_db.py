@@ -0,0 +1,547 @@
+import gc
+import sqlite3
+import threading
+import weakref
+
+import pytest
+
+import db
+from db import (
+    BACKFILLS,
+    MIGRATIONS,
+    TABLE_INDEXES,
+    TABLE_SCHEMAS,
+    close_db_connections,
+    create_indexes,
+    create_table,
+    ensure_columns,
+    ensure_indexes,
+    get_db_connection,
+    get_schema_version,
+    init_db,
+    migrate,
+    run_backfill_batch,
+    run_backfills,
+    schedule_backfill,
+)
+from services.ingest_service import ingest_upload
+from tests.test_ingest_service import encode_upload, make_test_results_df
+
+
+def index_names(conn, table_name: str) -> list:
+    return [row[1] for row in conn.execute(f"PRAGMA index_list({table_name})")]
+
+
+class TestCreateTable:
+    def test_creates_copy_under_new_name(self, test_db_connection):
+        """Test that create_table can build a copy of a schema under another name."""
+        create_table(test_db_connection, "chart_data", "chart_data_copy")
+        columns = [
+            row[1]
+            for row in test_db_connection.execute("PRAGMA table_info(chart_data_copy)")
+        ]
+        assert "GRAPH_ID" in columns
+
+
+class TestEnsureColumns:
+    def test_adds_missing_columns(self, test_db_connection):
+        """Test that ensure_columns upgrades a table created without newer columns."""
+        test_db_connection.execute("DROP TABLE upload_digests")
+        test_db_connection.execute("CREATE TABLE upload_digests (TABLE_NAME TEXT)")
+        ensure_columns(test_db_connection, "upload_digests")
+        columns = [
+            row[1]
+            for row in test_db_connection.execute("PRAGMA table_info(upload_digests)")
+        ]
+        assert columns == ["TABLE_NAME", "DIGEST", "ROWS", "LOADED_AT"]
+
+
+class TestCreateIndexes:
+    def test_builds_every_index(self, test_db_connection):
+        """Test that create_indexes builds each configured index on a copy."""
+        create_table(test_db_connection, "chart_data", "chart_data_copy")
+        create_indexes(test_db_connection, "chart_data", "chart_data_copy")
+        assert len(index_names(test_db_connection, "chart_data_copy")) == len(
+            TABLE_INDEXES["chart_data"]
+        )
+
+
+class TestEnsureIndexes:
+    def test_is_idempotent(self, test_db_connection):
+        """Test that ensure_indexes does not duplicate existing indexes."""
+        before = index_names(test_db_connection, "test_results")
+        ensure_indexes(test_db_connection, "test_results")
+        assert index_names(test_db_connection, "test_results") == before
+
+    def test_restores_missing_index(self, test_db_connection):
+        """Test that ensure_indexes rebuilds an index that was dropped."""
+        (name,) = [
+            name
+            for name in index_names(test_db_connection, "chart_data")
+            if name.startswith("ix_chart_data_graph_filter_")
+        ]
+        test_db_connection.execute(f"DROP INDEX {name}")
+        ensure_indexes(test_db_connection, "chart_data")
+        assert any(
+            name.startswith("ix_chart_data_graph_filter_")
+            for name in index_names(test_db_connection, "chart_data")
+        )
+
+
+def connection_in_thread(db_path: str, **kwargs) -> sqlite3.Connection:
+    result = []
+    thread = threading.Thread(
+        target=lambda: result.append(get_db_connection(db_path, **kwargs))
+    )
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+class TestGetDbConnection:
+    def test_reuses_connection_within_thread(self, test_db_connection, test_db_path):
+        """Test that a thread gets the same connection back after closing it."""
+        conn = get_db_connection(test_db_path)
+        conn.close()
+        assert get_db_connection(test_db_path) is conn
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+
+    def test_separate_connection_per_thread(self, test_db_connection, test_db_path):
+        """Test that each thread gets its own connection."""
+        conn = get_db_connection(test_db_path)
+        assert connection_in_thread(test_db_path) is not conn
+
+    def test_applies_pragmas(self, test_db_connection, test_db_path):
+        """Test that connections use WAL and the tuned pragmas."""
+        conn = get_db_connection(test_db_path, read_only=True)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+    def test_read_only_connection_rejects_writes(
+        self, test_db_connection, test_db_path
+    ):
+        """Test that the service layer's connections cannot write."""
+        conn = get_db_connection(test_db_path, read_only=True)
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("DELETE FROM test_results")
+
+    def test_close_rolls_back_unfinished_work(
+        self, test_db_connection, test_db_path, sample_test_results
+    ):
+        """Test that closing a reused connection discards uncommitted changes."""
+        conn = get_db_connection(test_db_path)
+        conn.execute("DELETE FROM test_results")
+        conn.close()
+        assert conn.execute("SELECT COUNT(*) FROM test_results").fetchone()[0] == 3
+
+    def test_close_db_connections_reopens(self, test_db_connection, test_db_path):
+        """Test that connections closed for good are replaced on the next call."""
+        conn = get_db_connection(test_db_path)
+        close_db_connections()
+        assert get_db_connection(test_db_path) is not conn
+
+    def test_closes_connections_of_finished_threads(
+        self, test_db_connection, test_db_path
+    ):
+        """Test that short-lived threads do not leave connections open."""
+        connections = []
+
+        def query():
+            for read_only in (False, True):
+                conn = get_db_connection(test_db_path, read_only=read_only)
+                conn.execute("SELECT 1")
+                connections.append(weakref.ref(conn))
+
+        for _ in range(200):
+            thread = threading.Thread(target=query)
+            thread.start()
+            thread.join()
+        gc.collect()
+
+        assert all(ref() is None or ref().closed for ref in connections)
+        # Only this thread's connections are left
+        assert len([conn for conn in db._open_connections if not conn.closed]) <= 2
+
+    def test_reads_proceed_during_ingest(
+        self, test_db_connection, test_db_path, sample_test_results
+    ):
+        """Test that an open read does not block an ingest and sees a stable snapshot."""
+        reader = get_db_connection(test_db_path, read_only=True)
+        reader.execute("BEGIN")
+        assert reader.execute("SELECT COUNT(*) FROM test_results").fetchone()[0] == 3
+
+        results = []
+
+        def ingest():
+            conn = get_db_connection(test_db_path)
+            contents = encode_upload(make_test_results_df(50))
+            results.append(ingest_upload(conn, contents, chunk_size=10))
+
+        # With a rollback journal the swap could not commit until the read ends
+        writer = threading.Thread(target=ingest)
+        writer.start()
+        writer.join(timeout=10)
+
+        assert results[0]["rows"] == 50
+        assert reader.execute("SELECT COUNT(*) FROM test_results").fetchone()[0] == 3
+        reader.rollback()
+        assert reader.execute("SELECT COUNT(*) FROM test_results").fetchone()[0] == 50
+
+
+def column_names(conn, table_name: str) -> list:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+
+
+class TestMigrate:
+    def test_versions_are_consecutive(self):
+        """Test that migrations are registered in order without gaps."""
+        versions = [version for version, _, _ in MIGRATIONS]
+        assert versions == list(range(1, len(MIGRATIONS) + 1))
+
+    def test_new_database_is_at_latest_version(self, test_db_connection):
+        """Test that init_db migrates a new database all the way."""
+        assert get_schema_version(test_db_connection) == MIGRATIONS[-1][0]
+
+    def test_upgrades_unversioned_database(self, tmp_path):
+        """Test that a database from before versioning is upgraded in place."""
+        db_path = str(tmp_path / "legacy.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE test_results (UNIQUE_ID TEXT PRIMARY KEY, STATUS TEXT)"
+        )
+        conn.execute("INSERT INTO test_results VALUES ('test.a', 'pass')")
+        conn.commit()
+        conn.close()
+
+        try:
+            init_db(db_path)
+            conn = get_db_connection(db_path)
+            assert get_schema_version(conn) == MIGRATIONS[-1][0]
+            assert "SEVERITY_LEVEL" in column_names(conn, "test_results")
+            assert any(
+                name.startswith("ix_test_results_")
+                for name in index_names(conn, "test_results")
+            )
+            rows = conn.execute("SELECT UNIQUE_ID FROM test_results").fetchall()
+            assert [row[0] for row in rows] == ["test.a"]
+            assert conn.execute("SELECT TEST_COUNT FROM run_meta").fetchone()[0] == 1
+        finally:
+            close_db_connections()
+
+    def test_migrations_build_the_current_schema(self, tmp_path, test_db_connection):
+        """Test that the migrations alone bring a new database to TABLE_SCHEMAS."""
+        scratch = sqlite3.connect(str(tmp_path / "scratch.db"))
+        for table_name in TABLE_SCHEMAS:
+            create_table(scratch, table_name)
+            columns = f"PRAGMA table_info({table_name})"
+            expected = [row[1:3] for row in scratch.execute(columns)]
+            migrated = [tuple(row[1:3]) for row in test_db_connection.execute(columns)]
+            assert migrated == expected, table_name
+
+            prefixes = sorted(
+                f"ix_{table_name}_{suffix}_"
+                for suffix, _ in TABLE_INDEXES.get(table_name, [])
+            )
+            indexes = sorted(
+                name
+                for name in index_names(test_db_connection, table_name)
+                if name.startswith("ix_")
+            )
+            assert [name[: -len("01234567")] for name in indexes] == prefixes
+        scratch.close()
+
+    def test_first_migration_ignores_later_schema_changes(self, tmp_path, monkeypatch):
+        """Test that migration 1 builds its frozen schema, not the current one."""
+        monkeypatch.setitem(
+            TABLE_SCHEMAS,
+            "test_results",
+            TABLE_SCHEMAS["test_results"] + ",\nLATER_COLUMN TEXT",
+        )
+        conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+        MIGRATIONS[0][2](conn)
+        assert "LATER_COLUMN" not in column_names(conn, "test_results")
+        assert "GRAPH_NAME" in column_names(conn, "chart_data")
+        conn.close()
+
+    def test_backfills_mart_memberships_from_flags(self, tmp_path):
+        """Test that an upgraded database gets test_mart rows from its flag columns."""
+        db_path = str(tmp_path / "legacy.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE test_results "
+            "(UNIQUE_ID TEXT PRIMARY KEY, FLAG_CCSR INTEGER, FLAG_CMS_HCCS INTEGER)"
+        )
+        conn.executemany(
+            "INSERT INTO test_results VALUES (?, ?, ?)",
+            [("test.a", 1, 0), ("test.b", 1, 1), ("test.c", 0, None)],
+        )
+        conn.commit()
+        conn.close()
+
+        try:
+            init_db(db_path)
+            conn = get_db_connection(db_path)
+            run_backfills(conn, batch_size=2)
+            rows = conn.execute(
+                "SELECT UNIQUE_ID, MART FROM test_mart ORDER BY UNIQUE_ID, MART"
+            ).fetchall()
+            assert [tuple(row) for row in rows] == [
+                ("test.a", "CCSR"),
+                ("test.b", "CCSR"),
+                ("test.b", "CMS_HCCS"),
+            ]
+            # The summaries catch up once the backfill completes
+            mart_tests = conn.execute(
+                "SELECT MART, SUM(TESTS) FROM mart_summary GROUP BY MART ORDER BY MART"
+            ).fetchall()
+            assert [tuple(row) for row in mart_tests] == [("CCSR", 2), ("CMS_HCCS", 1)]
+        finally:
+            close_db_connections()
+
+    def test_converts_text_timestamps_and_counts(self, tmp_path):
+        """Test that stored text timestamps and counts are turned into integers."""
+        db_path = str(tmp_path / "legacy.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE test_results (UNIQUE_ID TEXT PRIMARY KEY, "
+            "GENERATED_AT TEXT, FAILED_ROW_COUNT TEXT, SEVERITY_LEVEL INTEGER)"
+        )
+        conn.executemany(
+            "INSERT INTO test_results VALUES (?, ?, ?, ?)",
+            [
+                ("test.a", "2025-03-05 20:24:04", "12", 1),
+                ("test.b", "2025-03-12T17:10:48.525Z", "", 2),
+                ("test.c", "soon", "many", 3),
+            ],
+        )
+        conn.commit()
+        conn.close()
+
+        try:
+            init_db(db_path)
+            conn = get_db_connection(db_path)
+            rows = conn.execute(
+                "SELECT UNIQUE_ID, GENERATED_AT, FAILED_ROW_COUNT FROM test_results "
+                "ORDER BY rowid"
+            ).fetchall()
+            assert [tuple(row) for row in rows] == [
+                ("test.a", 1741206244, 12),
+                ("test.b", 1741799448, None),
+                ("test.c", None, None),
+            ]
+            types = {
+                row["name"]: row["type"]
+                for row in conn.execute("PRAGMA table_info(test_results)")
+            }
+            assert types["GENERATED_AT"] == types["FAILED_ROW_COUNT"] == "INTEGER"
+            last_run = conn.execute("SELECT LAST_RUN FROM run_meta").fetchone()[0]
+            assert last_run == "2025-03-12 17:10:48"
+            # The counter triggers moved to the rebuilt table
+            conn.execute("DELETE FROM test_results WHERE UNIQUE_ID = 'test.b'")
+            assert conn.execute("SELECT TEST_COUNT FROM run_meta").fetchone()[0] == 2
+            conn.rollback()
+        finally:
+            close_db_connections()
+
+    def test_moves_chart_metadata_into_catalog(self, tmp_path):
+        """Test that wide chart rows are split into the catalog and slim rows."""
+        db_path = str(tmp_path / "legacy.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE chart_data (DATA_QUALITY_CATEGORY TEXT, GRAPH_NAME TEXT, "
+            "FILTER_DESCRIPTION TEXT, CHART_FILTER TEXT, VALUE REAL)"
+        )
+        conn.executemany(
+            "INSERT INTO chart_data VALUES ('timeliness', ?, 'year', ?, ?)",
+            [("a", "2019", 1), ("b", None, 2), ("a", "2018", 3)],
+        )
+        conn.commit()
+        conn.close()
+
+        try:
+            init_db(db_path)
+            conn = get_db_connection(db_path)
+            assert "GRAPH_NAME" not in column_names(conn, "chart_data")
+            catalog = conn.execute(
+                "SELECT GRAPH_NAME, FILTER_DESCRIPTION, FILTER_VALUES, ROW_COUNT "
+                "FROM chart_catalog ORDER BY GRAPH_ID"
+            ).fetchall()
+            assert [tuple(row) for row in catalog] == [
+                ("a", "year", '["2018","2019"]', 2),
+                ("b", "year", "[]", 1),
+            ]
+            rows = conn.execute(
+                "SELECT GRAPH_ID, VALUE FROM chart_data ORDER BY rowid"
+            ).fetchall()
+            assert [tuple(row) for row in rows] == [(1, 1.0), (2, 2.0), (1, 3.0)]
+        finally:
+            close_db_connections()
+
+    def test_parses_stored_chart_axes(self, tmp_path):
+        """Test that chart rows stored as text get their typed axis columns."""
+        db_path = str(tmp_path / "legacy.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE chart_catalog (GRAPH_ID INTEGER PRIMARY KEY, "
+            "GRAPH_NAME TEXT UNIQUE, FILTER_VALUES TEXT, ROW_COUNT INTEGER)"
+        )
+        conn.execute(
+            "CREATE TABLE chart_data (GRAPH_ID INTEGER, Y_AXIS TEXT, X_AXIS TEXT, "
+            "CHART_FILTER TEXT, VALUE REAL)"
+        )
+        conn.execute(
+            "CREATE INDEX ix_chart_data_graph_filter_0 ON chart_data (GRAPH_ID)"
+        )
+        conn.execute("INSERT INTO chart_catalog (GRAPH_NAME) VALUES ('a')")
+        conn.executemany(
+            "INSERT INTO chart_data VALUES (1, ?, ?, NULL, 1)",
+            [("2018-02-01", "3"), ("2018-01-01", None)],
+        )
+        conn.execute("PRAGMA user_version = 5")
+        conn.commit()
+        conn.close()
+
+        try:
+            init_db(db_path)
+            conn = get_db_connection(db_path)
+            rows = conn.execute(
+                "SELECT Y_AXIS_NUMBER, Y_AXIS_DATE, X_AXIS_NUMBER, X_AXIS_DATE "
+                "FROM chart_data ORDER BY rowid"
+            ).fetchall()
+            assert [tuple(row) for row in rows] == [
+                (None, 1517443200, 3.0, None),
+                (None, 1514764800, None, None),
+            ]
+            kinds = conn.execute(
+                "SELECT Y_AXIS_KIND, X_AXIS_KIND FROM chart_catalog"
+            ).fetchone()
+            assert tuple(kinds) == ("date", "number")
+            index_columns = [
+                column[2]
+                for index in conn.execute("PRAGMA index_list(chart_data)").fetchall()
+                for column in conn.execute(f"PRAGMA index_info({index[1]})")
+            ]
+            assert "Y_AXIS_DATE" in index_columns
+        finally:
+            close_db_connections()
+
+    def test_parses_years_on_stored_date_axes(self, test_db_path, test_db_connection):
+        """Test that stored years on axes described as dates get their dates."""
+        test_db_connection.execute(
+            "INSERT INTO chart_catalog (GRAPH_NAME, Y_AXIS_DESCRIPTION, Y_AXIS_KIND) "
+            "VALUES ('a', 'claim_end_date year', 'number')"
+        )
+        # Parsed before years on date axes were, as numbers only
+        test_db_connection.executemany(
+            "INSERT INTO chart_data (GRAPH_ID, Y_AXIS, Y_AXIS_NUMBER, VALUE) "
+            "VALUES (1, ?, ?, 1)",
+            [("2018", 2018.0), ("2017", 2017.0)],
+        )
+        test_db_connection.execute("PRAGMA user_version = 8")
+        test_db_connection.commit()
+
+        try:
+            init_db(test_db_path)
+            conn = get_db_connection(test_db_path)
+            rows = conn.execute(
+                "SELECT Y_AXIS_NUMBER, Y_AXIS_DATE FROM chart_data ORDER BY rowid"
+            ).fetchall()
+            assert [tuple(row) for row in rows] == [
+                (None, 1514764800),
+                (None, 1483228800),
+            ]
+            kind = conn.execute("SELECT Y_AXIS_KIND FROM chart_catalog").fetchone()
+            assert kind[0] == "date"
+        finally:
+            close_db_connections()
+
+    def test_skips_applied_migrations(self, test_db_connection):
+        """Test that migrating an up to date database does nothing."""
+        assert migrate(test_db_connection) == []
+
+    def test_failed_migration_rolls_back(self, monkeypatch, test_db_connection):
+        """Test that a failing migration leaves the schema and version untouched."""
+        latest = MIGRATIONS[-1][0]
+
+        def broken(conn):
+            conn.execute("CREATE TABLE half_done (ID INTEGER)")
+            raise ValueError("broken migration")
+
+        monkeypatch.setattr(db, "MIGRATIONS", [*MIGRATIONS, (latest + 1, "", broken)])
+        with pytest.raises(ValueError, match="broken migration"):
+            migrate(test_db_connection)
+
+        assert get_schema_version(test_db_connection) == latest
+        assert "half_done" not in {
+            row[0]
+            for row in test_db_connection.execute("SELECT name FROM sqlite_master")
+        }
+
+    def test_rejects_newer_database(self, test_db_connection):
+        """Test that an app older than the database refuses to migrate it."""
+        test_db_connection.execute(f"PRAGMA user_version = {len(MIGRATIONS) + 1}")
+        with pytest.raises(RuntimeError, match="newer"):
+            migrate(test_db_connection)
+
+
+@pytest.fixture
+def category_backfill(monkeypatch, test_db_connection):
+    """Register a backfill that fills TEST_CATEGORY, over 25 tests."""
+    test_db_connection.executemany(
+        "INSERT INTO test_results (UNIQUE_ID) VALUES (?)",
+        [(f"test.{i}",) for i in range(25)],
+    )
+    test_db_connection.commit()
+
+    batches = []
+
+    def fill_category(conn, first_rowid, last_rowid):
+        batches.append((first_rowid, last_rowid))
+        conn.execute(
+            "UPDATE test_results SET TEST_CATEGORY = 'filled' "
+            "WHERE rowid BETWEEN ? AND ?",
+            (first_rowid, last_rowid),
+        )
+
+    monkeypatch.setitem(BACKFILLS, "fill_category", ("test_results", fill_category))
+    schedule_backfill(test_db_connection, "fill_category")
+    test_db_connection.commit()
+    return batches
+
+
+def backfill_state(conn) -> tuple:
+    return tuple(
+        conn.execute(
+            "SELECT LAST_ROWID, COMPLETED_AT FROM schema_backfills WHERE NAME = ?",
+            ("fill_category",),
+        ).fetchone()
+    )
+
+
+class TestBackfills:
+    def test_runs_in_batches(self, test_db_connection, category_backfill):
+        """Test that a backfill covers every row in batches of the given size."""
+        run_backfills(test_db_connection, batch_size=10)
+
+        assert category_backfill == [(1, 10), (11, 20), (21, 25)]
+        assert (
+            test_db_connection.execute(
+                "SELECT COUNT(*) FROM test_results WHERE TEST_CATEGORY = 'filled'"
+            ).fetchone()[0]
+            == 25
+        )
+        assert backfill_state(test_db_connection)[1] is not None
+
+    def test_resumes_after_interruption(self, test_db_connection, category_backfill):
+        """Test that progress is committed with each batch and picked up again."""
+        assert run_backfill_batch(test_db_connection, batch_size=10)
+        assert backfill_state(test_db_connection) == (10, None)
+
+        run_backfills(test_db_connection, batch_size=10)
+        assert category_backfill == [(1, 10), (11, 20), (21, 25)]
+
+    def test_reports_when_nothing_is_pending(self, test_db_connection):
+        """Test that a batch with no pending backfill reports no work left."""
+        run_backfills(test_db_connection)
+        assert not run_backfill_batch(test_db_connection)
@@ -0,0 +1,394 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from db import MART_NAMES, get_data_version, get_db_connection
+from services.dqi_service import get_data_quality_grade, get_mart_statuses
+from services.history_service import (
+    DIFF_CATEGORIES,
+    compact_database,
+    diff_runs,
+    get_mart_status_trend,
+    get_run_results,
+    get_run_trend,
+    get_runs,
+    prune_runs,
+    record_run,
+    vacuum_database,
+)
+from services.ingest_service import INGEST_REPLACE, ingest_upload
+from tests.test_ingest_service import encode_upload, make_test_results_df
+
+
+@pytest.fixture
+def mock_history_db_connection(monkeypatch, test_db_connection, test_db_path):
+    """Point the history service at the test database."""
+    monkeypatch.setattr(
+        "services.history_service.get_db_connection",
+        lambda **kwargs: get_db_connection(test_db_path, **kwargs),
+    )
+
+
+def run_ids(conn) -> list:
+    return [row[0] for row in conn.execute("SELECT RUN_ID FROM ingest_runs")]
+
+
+class TestRecordRun:
+    def test_copies_current_results(self, test_db_connection, sample_test_results):
+        """Test that a run snapshots every row of test_results."""
+        run_id = record_run(test_db_connection, INGEST_REPLACE)
+
+        run = test_db_connection.execute(
+            "SELECT * FROM ingest_runs WHERE RUN_ID = ?", (run_id,)
+        ).fetchone()
+        history = test_db_connection.execute(
+            "SELECT COUNT(*) FROM test_result_history WHERE RUN_ID = ?", (run_id,)
+        ).fetchone()[0]
+        assert run["TEST_COUNT"] == len(sample_test_results)
+        assert run["GENERATED_AT"] == "2025-03-05 20:24:04"
+        assert history == len(sample_test_results)
+
+    def test_runs_are_kept_separately(self, test_db_connection, sample_test_results):
+        """Test that later runs do not overwrite earlier ones."""
+        first = record_run(test_db_connection, INGEST_REPLACE)
+        test_db_connection.execute("UPDATE test_results SET STATUS = 'fail'")
+        test_db_connection.commit()
+        second = record_run(test_db_connection, INGEST_REPLACE)
+
+        statuses = dict(
+            test_db_connection.execute(
+                "SELECT RUN_ID, GROUP_CONCAT(DISTINCT STATUS) "
+                "FROM test_result_history GROUP BY RUN_ID"
+            ).fetchall()
+        )
+        assert statuses == {first: "pass", second: "fail"}
+
+    def test_per_run_query_uses_primary_key(self, test_db_connection):
+        """Test that reading one run is a range scan rather than a table scan."""
+        plan = test_db_connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM test_result_history WHERE RUN_ID = 1"
+        ).fetchall()
+        assert "USING PRIMARY KEY (RUN_ID=?)" in plan[0]["detail"]
+
+
+class TestPruneRuns:
+    def test_keeps_most_recent_runs(self, test_db_connection, sample_test_results):
+        """Test that pruning by count keeps the newest runs and their rows."""
+        ids = [record_run(test_db_connection, INGEST_REPLACE) for _ in range(5)]
+
+        pruned = prune_runs(test_db_connection, keep_runs=2, keep_days=0)
+
+        remaining_history = test_db_connection.execute(
+            "SELECT DISTINCT RUN_ID FROM test_result_history ORDER BY RUN_ID"
+        ).fetchall()
+        assert pruned == 3
+        assert run_ids(test_db_connection) == ids[-2:]
+        assert [row[0] for row in remaining_history] == ids[-2:]
+
+    def test_prunes_old_runs(self, test_db_connection, sample_test_results):
+        """Test that pruning by age removes runs loaded before the cutoff."""
+        old = record_run(test_db_connection, INGEST_REPLACE)
+        new = record_run(test_db_connection, INGEST_REPLACE)
+        long_ago = datetime.now(timezone.utc) - timedelta(days=40)
+        test_db_connection.execute(
+            "UPDATE ingest_runs SET LOADED_AT = ? WHERE RUN_ID = ?",
+            (long_ago.strftime("%Y-%m-%d %H:%M:%S"), old),
+        )
+        test_db_connection.commit()
+
+        assert prune_runs(test_db_connection, keep_runs=0, keep_days=30) == 1
+        assert run_ids(test_db_connection) == [new]
+
+    def test_always_keeps_latest_run(self, test_db_connection, sample_test_results):
+        """Test that the latest run survives even an aggressive policy."""
+        latest = record_run(test_db_connection, INGEST_REPLACE)
+        test_db_connection.execute("UPDATE ingest_runs SET LOADED_AT = '2000-01-01'")
+        test_db_connection.commit()
+
+        prune_runs(test_db_connection, keep_runs=0, keep_days=1)
+        assert run_ids(test_db_connection) == [latest]
+
+    def test_disabled_policy_keeps_everything(
+        self, test_db_connection, sample_test_results
+    ):
+        """Test that a zero limit on both counts and days prunes nothing."""
+        for _ in range(3):
+            record_run(test_db_connection, INGEST_REPLACE)
+        assert prune_runs(test_db_connection, keep_runs=0, keep_days=0) == 0
+
+
+class TestCompactDatabase:
+    def test_new_databases_use_incremental_vacuum(self, test_db_connection):
+        """Test that init_db creates databases with incremental auto-vacuum."""
+        mode = test_db_connection.execute("PRAGMA auto_vacuum").fetchone()[0]
+        assert mode == 2
+
+    def test_releases_free_pages(self, test_db_connection):
+        """Test that pages freed by pruning are released."""
+        for _ in range(3):
+            ingest_upload(test_db_connection, encode_upload(make_test_results_df(500)))
+        prune_runs(test_db_connection, keep_runs=1, keep_days=0)
+
+        compact_database(test_db_connection)
+
+        free_pages = test_db_connection.execute("PRAGMA freelist_count").fetchone()[0]
+        assert free_pages == 0
+
+    def test_leaves_full_vacuum_to_periodic_job(self, tmp_path):
+        """Test that only vacuum_database rebuilds a database without auto-vacuum."""
+        conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+        conn.execute("CREATE TABLE filler (VALUE TEXT)")
+        conn.executemany(
+            "INSERT INTO filler VALUES (?)", [("x" * 1000,) for _ in range(200)]
+        )
+        conn.commit()
+        conn.execute("DELETE FROM filler")
+        conn.commit()
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+
+        compact_database(conn)
+        assert conn.execute("PRAGMA page_count").fetchone()[0] == page_count
+
+        assert vacuum_database(conn)
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        assert not vacuum_database(conn)
+        conn.close()
+
+
+class TestIngestRecordsRuns:
+    def test_test_results_upload_records_run(self, test_db_connection):
+        """Test that loading test results records a run with its id."""
+        result = ingest_upload(
+            test_db_connection, encode_upload(make_test_results_df(4))
+        )
+        assert run_ids(test_db_connection) == [result["run_id"]]
+
+    def test_run_is_committed_with_load(self, monkeypatch, test_db_connection):
+        """Test that a load whose run cannot be recorded is rolled back."""
+        ingest_upload(test_db_connection, encode_upload(make_test_results_df(4)))
+        version = get_data_version(test_db_connection)
+
+        def fail(conn, mode):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        monkeypatch.setattr("services.ingest_service.add_run", fail)
+        contents = encode_upload(make_test_results_df(6))
+        with pytest.raises(sqlite3.OperationalError):
+            ingest_upload(test_db_connection, contents)
+
+        count = test_db_connection.execute(
+            "SELECT COUNT(*) FROM test_results"
+        ).fetchone()[0]
+        assert count == 4
+        assert len(run_ids(test_db_connection)) == 1
+        assert get_data_version(test_db_connection) == version
+
+        # The failed file was never recorded as loaded, so it is not skipped
+        monkeypatch.undo()
+        assert not ingest_upload(test_db_connection, contents)["skipped"]
+
+    def test_skipped_upload_records_nothing(self, test_db_connection):
+        """Test that an identical re-upload does not add a run."""
+        contents = encode_upload(make_test_results_df(4))
+        ingest_upload(test_db_connection, contents)
+        result = ingest_upload(test_db_connection, contents)
+
+        assert result["run_id"] is None
+        assert len(run_ids(test_db_connection)) == 1
+
+
+class TestGetRuns:
+    def test_returns_newest_first(self, mock_history_db_connection, test_db_connection):
+        """Test that get_runs lists runs from newest to oldest."""
+        for rows in (3, 4, 5):
+            ingest_upload(test_db_connection, encode_upload(make_test_results_df(rows)))
+
+        runs = get_runs()
+        assert runs["TEST_COUNT"].tolist() == [5, 4, 3]
+        assert len(get_runs(limit=1)) == 1
+
+    def test_returns_run_results(self, mock_history_db_connection, test_db_connection):
+        """Test that get_run_results returns the rows recorded for one run."""
+        first = ingest_upload(
+            test_db_connection, encode_upload(make_test_results_df(3))
+        )
+        ingest_upload(test_db_connection, encode_upload(make_test_results_df(6)))
+
+        assert len(get_run_results(first["run_id"])) == 3
+
+
+class TestDiffRuns:
+    def make_run_df(self, rows: int):
+        df = make_test_results_df(rows)
+        df["STATUS"] = "pass"
+        df["FAILURES"] = 0
+        return df
+
+    def record(self, conn, df) -> int:
+        ingest_upload(conn, encode_upload(df))
+        return conn.execute("SELECT MAX(RUN_ID) FROM ingest_runs").fetchone()[0]
+
+    def test_classifies_changes(self, mock_history_db_connection, test_db_connection):
+        """Test that each kind of change lands in its category."""
+        base = self.make_run_df(6)
+        base.loc[1, "STATUS"] = "fail"
+        target = self.make_run_df(7)
+        target.loc[0, "STATUS"] = "fail"  # newly failing
+        target.loc[6, "STATUS"] = "warn"  # new test that fails
+        target.loc[3, "SEVERITY_LEVEL"] = 1
+        target.loc[4, "FAILURES"] = 12
+
+        diff = diff_runs(
+            self.record(test_db_connection, base),
+            self.record(test_db_connection, target),
+        )
+
+        assert set(diff) == set(DIFF_CATEGORIES)
+        assert diff["new_failures"]["UNIQUE_ID"].tolist() == ["test.0", "test.6"]
+        assert diff["resolved"]["UNIQUE_ID"].tolist() == ["test.1"]
+        assert diff["severity_changed"]["UNIQUE_ID"].tolist() == ["test.3"]
+        assert diff["failures_changed"]["UNIQUE_ID"].tolist() == ["test.4"]
+        assert diff["severity_changed"].loc[0, "TARGET_SEVERITY_LEVEL"] == 1
+
+    def test_reports_tests_missing_from_target(
+        self, mock_history_db_connection, test_db_connection
+    ):
+        """Test that tests dropped by the target run are reported as removed."""
+        base = self.make_run_df(5)
+        base.loc[3, "STATUS"] = "fail"
+        target = base.drop(index=[3, 4])
+
+        diff = diff_runs(
+            self.record(test_db_connection, base),
+            self.record(test_db_connection, target),
+        )
+
+        removed = diff["removed"]
+        assert removed["UNIQUE_ID"].tolist() == ["test.3", "test.4"]
+        assert removed["BASE_STATUS"].tolist() == ["fail", "pass"]
+        assert removed["TARGET_STATUS"].isna().all()
+        assert all(
+            diff[category].empty
+            for category in DIFF_CATEGORIES
+            if category != "removed"
+        )
+
+    def test_identical_runs_have_no_changes(
+        self, mock_history_db_connection, test_db_connection
+    ):
+        """Test that a run compared with itself reports nothing."""
+        run_id = self.record(test_db_connection, make_test_results_df(5))
+        diff = diff_runs(run_id, run_id)
+        assert all(df.empty for df in diff.values())
+
+    def test_uses_primary_key_join(self, test_db_connection):
+        """Test that the base run is looked up by primary key for each test."""
+        plan = test_db_connection.execute(
+            """
+            EXPLAIN QUERY PLAN
+            SELECT * FROM test_result_history t
+            LEFT JOIN test_result_history b
+                ON b.RUN_ID = 1 AND b.UNIQUE_ID = t.UNIQUE_ID
+            WHERE t.RUN_ID = 2
+            """
+        ).fetchall()
+        details = [row["detail"] for row in plan]
+        assert any("(RUN_ID=? AND UNIQUE_ID=?)" in detail for detail in details)
+
+
+class TestRunSummaries:
+    @pytest.mark.parametrize(
+        "status, severity, mart",
+        [
+            ("pass", 1, "CCSR"),
+            ("fail", 1, "CCSR"),
+            ("fail", 2, "CMS_HCCS"),
+            ("warn", 3, "READMISSION"),
+            ("fail", 4, "CCSR"),
+        ],
+    )
+    def test_matches_live_grade_and_mart_statuses(
+        self,
+        monkeypatch,
+        test_db_path,
+        test_db_connection,
+        sample_test_results,
+        status,
+        severity,
+        mart,
+    ):
+        """Test that a run summary agrees with the dashboard's live queries."""
+        unique_id = sample_test_results[0]["UNIQUE_ID"]
+        test_db_connection.execute(
+            "UPDATE test_results SET STATUS = ?, SEVERITY_LEVEL = ? WHERE UNIQUE_ID = ?",
+            (status, severity, unique_id),
+        )
+        test_db_connection.execute(
+            "INSERT INTO test_mart (UNIQUE_ID, MART) VALUES (?, ?)", (unique_id, mart)
+        )
+        test_db_connection.commit()
+        run_id = record_run(test_db_connection, INGEST_REPLACE)
+
+        grade = test_db_connection.execute(
+            "SELECT GRADE FROM run_summaries WHERE RUN_ID = ?", (run_id,)
+        ).fetchone()[0]
+        mart_statuses = dict(
+            test_db_connection.execute(
+                "SELECT MART, STATUS FROM run_mart_statuses WHERE RUN_ID = ?",
+                (run_id,),
+            ).fetchall()
+        )
+        monkeypatch.setattr(
+            "services.dqi_service.get_db_connection",
+            lambda **kwargs: get_db_connection(test_db_path, **kwargs),
+        )
+        assert mart_statuses == get_mart_statuses()
+        assert grade == get_data_quality_grade()
+
+    def test_counts_failures_by_severity(self, test_db_connection, sample_test_results):
+        """Test that failing tests are counted per severity level."""
+        test_db_connection.execute("UPDATE test_results SET STATUS = 'fail'")
+        test_db_connection.commit()
+        run_id = record_run(test_db_connection, INGEST_REPLACE)
+
+        summary = test_db_connection.execute(
+            "SELECT * FROM run_summaries WHERE RUN_ID = ?", (run_id,)
+        ).fetchone()
+        assert summary["TEST_COUNT"] == 3
+        assert summary["FAILING_COUNT"] == 3
+        assert [summary[f"SEV{level}_FAILURES"] for level in range(1, 6)] == [
+            1,
+            1,
+            1,
+            0,
+            0,
+        ]
+
+    def test_pruning_removes_summaries(self, test_db_connection, sample_test_results):
+        """Test that pruned runs take their summaries with them."""
+        for _ in range(3):
+            record_run(test_db_connection, INGEST_REPLACE)
+        prune_runs(test_db_connection, keep_runs=1, keep_days=0)
+
+        for table_name in ["run_summaries", "run_mart_statuses"]:
+            runs = test_db_connection.execute(
+                f"SELECT COUNT(DISTINCT RUN_ID) FROM {table_name}"
+            ).fetchone()[0]
+            assert runs == 1
+
+
+class TestGetRunTrend:
+    def test_returns_recent_runs_oldest_first(
+        self, mock_history_db_connection, test_db_connection, sample_test_results
+    ):
+        """Test that the trend lists the latest runs in chronological order."""
+        ids = [record_run(test_db_connection, INGEST_REPLACE) for _ in range(4)]
+
+        trend = get_run_trend(limit=3)
+        mart_trend = get_mart_status_trend(limit=3)
+
+        assert trend["RUN_ID"].tolist() == ids[-3:]
+        assert sorted(mart_trend["RUN_ID"].unique()) == ids[-3:]
+        assert len(mart_trend) == 3 * len(MART_NAMES)
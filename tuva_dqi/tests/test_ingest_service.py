@@ -0,0 +1,992 @@
+import base64
+import io
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from hypothesis import HealthCheck, given, settings
+from hypothesis import strategies as st
+
+from db import (
+    MART_NAMES,
+    SUMMARY_TABLES,
+    get_data_version,
+    get_db_connection,
+    rebuild_summaries,
+)
+from services.ingest_service import (
+    INGEST_INCREMENTAL,
+    ROW_HASH_COLUMN,
+    STALE_STAGING_SECONDS,
+    Base64Stream,
+    apply_staged_upsert,
+    bulk_insert,
+    coerce_column_types,
+    create_staging_table,
+    detect_upload_type,
+    filter_severity_levels,
+    filter_to_schema,
+    get_table_columns,
+    ingest_upload,
+    iter_record_chunks,
+    mart_flag_columns,
+    mart_memberships,
+    open_upload,
+    read_csv_chunks,
+    replace_table_data,
+    row_hashes,
+    swap_staging_tables,
+    upload_digest,
+)
+
+
+def make_test_results_df(rows: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "UNIQUE_ID": [f"test.{i}" for i in range(rows)],
+            "TEST_NAME": [f"test_{i}" for i in range(rows)],
+            "STATUS": ["pass" if i % 3 else "fail" for i in range(rows)],
+            "SEVERITY_LEVEL": [i % 5 + 1 for i in range(rows)],
+        }
+    )
+
+
+def encode_upload(df: pd.DataFrame) -> str:
+    """Encode a DataFrame as the contents string produced by dcc.Upload."""
+    payload = base64.b64encode(df.to_csv(index=False).encode("utf-8")).decode()
+    return f"data:text/csv;base64,{payload}"
+
+
+class TestBase64Stream:
+    def test_decodes_across_blocks(self):
+        """Test that Base64Stream decodes payloads spanning several blocks."""
+        payload = bytes(range(256)) * 40
+        encoded = base64.b64encode(payload).decode()
+        stream = io.BufferedReader(Base64Stream(encoded, block_size=64))
+        assert stream.read() == payload
+
+    def test_skips_data_url_prefix(self):
+        """Test that open_upload starts reading after the data URL header."""
+        stream = open_upload(
+            "data:text/csv;base64," + base64.b64encode(b"A,B").decode()
+        )
+        assert stream.read() == b"A,B"
+
+
+class TestReadCsvChunks:
+    def test_yields_uppercase_chunks(self):
+        """Test that read_csv_chunks upper-cases columns and respects chunk size."""
+        stream = io.BytesIO(b"unique_id,status\n" + b"a,pass\n" * 5)
+        chunks = list(read_csv_chunks(stream, chunk_size=2))
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        assert list(chunks[0].columns) == ["UNIQUE_ID", "STATUS"]
+
+
+class TestDetectUploadType:
+    def test_detects_chart_data(self):
+        """Test that chart data exports are recognised."""
+        assert detect_upload_type(["DATA_QUALITY_CATEGORY", "GRAPH_NAME"]) == (
+            "chart_data"
+        )
+
+    def test_detects_test_results(self):
+        """Test that test results exports are recognised."""
+        assert detect_upload_type(["UNIQUE_ID", "TEST_NAME"]) == "test_results"
+
+    def test_returns_none_for_unknown(self):
+        """Test that unrecognised files are rejected."""
+        assert detect_upload_type(["FOO"]) is None
+
+
+class TestGetTableColumns:
+    def test_returns_schema_columns(self, test_db_connection):
+        """Test that get_table_columns returns the columns in schema order."""
+        result = get_table_columns(test_db_connection, "chart_data")
+        assert result[0] == "GRAPH_ID"
+        assert "VALUE" in result
+
+
+class TestFilterToSchema:
+    def test_drops_unknown_columns(self, test_db_connection):
+        """Test that filter_to_schema drops columns missing from the schema."""
+        df = make_test_results_df(2)
+        df["NOT_A_COLUMN"] = 1
+        schema_columns = get_table_columns(test_db_connection, "test_results")
+
+        result = filter_to_schema(df, schema_columns)
+        assert "NOT_A_COLUMN" not in result.columns
+        assert list(result.columns) == list(df.columns[:-1])
+
+
+class TestFilterSeverityLevels:
+    def test_removes_out_of_range_rows(self):
+        """Test that filter_severity_levels keeps only severity levels 1-5."""
+        df = pd.DataFrame({"SEVERITY_LEVEL": [0, 1, 3, 5, 6, None]})
+        result, removed = filter_severity_levels(df)
+        assert result["SEVERITY_LEVEL"].tolist() == [1, 3, 5]
+        assert removed == 3
+
+    def test_removes_fractional_levels(self):
+        """Test that filter_severity_levels drops severities between levels."""
+        df = pd.DataFrame({"SEVERITY_LEVEL": [1.5, 2.0, "3", "x"]})
+        result, removed = filter_severity_levels(df)
+        assert result["SEVERITY_LEVEL"].tolist() == [2.0, "3"]
+        assert removed == 2
+
+    def test_passes_through_without_severity_column(self):
+        """Test that filter_severity_levels ignores files without severity."""
+        df = pd.DataFrame({"UNIQUE_ID": ["a", "b"]})
+        result, removed = filter_severity_levels(df)
+        assert len(result) == 2
+        assert removed == 0
+
+
+class TestCoerceColumnTypes:
+    COLUMN_TYPES = {"GENERATED_AT": "timestamp", "FAILED_ROW_COUNT": "integer"}
+
+    def test_converts_timestamps_and_counts(self):
+        """Test that timestamps become epoch seconds and counts integers."""
+        df = pd.DataFrame(
+            {
+                "GENERATED_AT": [
+                    "2025-03-05 20:24:04",
+                    "2025-03-12T17:10:48.525000000Z",
+                    None,
+                ],
+                "FAILED_ROW_COUNT": ["12", 3.0, None],
+                "STATUS": ["pass", "fail", "pass"],
+            }
+        )
+
+        result, invalid = coerce_column_types(df, self.COLUMN_TYPES)
+
+        assert result["GENERATED_AT"].tolist() == [1741206244, 1741799448, pd.NA]
+        assert result["FAILED_ROW_COUNT"].tolist() == [12, 3, pd.NA]
+        assert result["STATUS"].tolist() == ["pass", "fail", "pass"]
+        assert invalid == {}
+
+    def test_reports_unparseable_values(self):
+        """Test that unparseable values are nulled and returned, blanks are not."""
+        df = pd.DataFrame(
+            {
+                "GENERATED_AT": ["yesterday", "2025-03-05 20:24:04", ""],
+                "FAILED_ROW_COUNT": ["1.5", "many", " "],
+            }
+        )
+
+        result, invalid = coerce_column_types(df, self.COLUMN_TYPES)
+
+        assert result["GENERATED_AT"].isna().tolist() == [True, False, True]
+        assert result["FAILED_ROW_COUNT"].isna().all()
+        assert {col: values.tolist() for col, values in invalid.items()} == {
+            "GENERATED_AT": ["yesterday"],
+            "FAILED_ROW_COUNT": ["1.5", "many"],
+        }
+
+
+class TestIterRecordChunks:
+    def test_chunks_rows(self):
+        """Test that iter_record_chunks splits rows into chunks of the given size."""
+        chunks = list(iter_record_chunks(make_test_results_df(25), chunk_size=10))
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+
+    def test_maps_missing_values_to_none(self):
+        """Test that NaN values are converted to None for SQLite NULLs."""
+        df = pd.DataFrame({"A": [1.5, np.nan], "B": ["x", None]})
+        (records,) = iter_record_chunks(df)
+        assert records == [(1.5, "x"), (None, None)]
+
+    def test_converts_numpy_scalars(self):
+        """Test that numpy integers are converted to Python integers."""
+        df = pd.DataFrame({"A": np.array([1, 2], dtype=np.int64)})
+        (records,) = iter_record_chunks(df)
+        assert all(type(value) is int for (value,) in records)
+
+
+class TestBulkInsert:
+    def test_inserts_all_rows(self, test_db_connection):
+        """Test that bulk_insert writes every row across several chunks."""
+        df = make_test_results_df(25)
+        result = bulk_insert(test_db_connection, "test_results", df, chunk_size=10)
+        test_db_connection.commit()
+
+        count = test_db_connection.execute(
+            "SELECT COUNT(*) FROM test_results"
+        ).fetchone()[0]
+        assert result == 25
+        assert count == 25
+
+    def test_empty_dataframe_is_noop(self, test_db_connection):
+        """Test that bulk_insert does nothing for an empty DataFrame."""
+        result = bulk_insert(test_db_connection, "test_results", pd.DataFrame())
+        assert result == 0
+
+
+def table_names(conn) -> set:
+    return {
+        row[0]
+        for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+
+
+def staged_copies(conn, table_name: str) -> set:
+    """List the staging and retired copies of a table in the database."""
+    return {name for name in table_names(conn) if name.startswith(f"{table_name}__")}
+
+
+class TestStagingSwap:
+    def test_swaps_staging_into_place(self, test_db_connection, sample_test_results):
+        """Test that swap_staging_tables replaces the live table and cleans up."""
+        staging_name = create_staging_table(test_db_connection, "test_results")
+        bulk_insert(test_db_connection, staging_name, make_test_results_df(4))
+        test_db_connection.commit()
+
+        swap_staging_tables(test_db_connection, {"test_results": staging_name})
+
+        count = test_db_connection.execute(
+            "SELECT COUNT(*) FROM test_results"
+        ).fetchone()[0]
+        assert count == 4
+        assert not staged_copies(test_db_connection, "test_results")
+
+    def test_concurrent_loads_keep_their_staging(self, test_db_connection):
+        """Test that two loads of a table stage and swap without clobbering."""
+        first = create_staging_table(test_db_connection, "test_results")
+        bulk_insert(test_db_connection, first, make_test_results_df(4))
+        test_db_connection.commit()
+        second = create_staging_table(test_db_connection, "test_results")
+        bulk_insert(test_db_connection, second, make_test_results_df(6))
+        test_db_connection.commit()
+
+        assert first != second
+        swap_staging_tables(test_db_connection, {"test_results": first})
+        swap_staging_tables(test_db_connection, {"test_results": second})
+
+        count = test_db_connection.execute(
+            "SELECT COUNT(*) FROM test_results"
+        ).fetchone()[0]
+        assert count == 6
+        assert not staged_copies(test_db_connection, "test_results")
+
+    def test_drops_stale_staging(self, monkeypatch, test_db_connection):
+        """Test that staging tables of interrupted loads are dropped once stale."""
+        abandoned = create_staging_table(test_db_connection, "test_results")
+
+        later = time.time() + STALE_STAGING_SECONDS + 1
+        monkeypatch.setattr(time, "time", lambda: later)
+        in_use = create_staging_table(test_db_connection, "test_results")
+        latest = create_staging_table(test_db_connection, "test_results")
+
+        assert abandoned not in table_names(test_db_connection)
+        assert staged_copies(test_db_connection, "test_results") == {in_use, latest}
+
+    def test_builds_indexes_on_new_table(self, test_db_connection):
+        """Test that the swapped-in table carries the secondary indexes."""
+        for _ in range(2):  # A second swap must not collide with index names
+            staging_name = create_staging_table(test_db_connection, "test_results")
+            swap_staging_tables(test_db_connection, {"test_results": staging_name})
+
+        index_names = [
+            row[1]
+            for row in test_db_connection.execute("PRAGMA index_list(test_results)")
+        ]
+        assert any(name.startswith("ix_test_results_") for name in index_names)
+
+    def test_readers_see_old_data_during_load(
+        self, test_db_connection, sample_test_results, test_db_path
+    ):
+        """Test that a concurrent reader never sees a partial or empty table."""
+        reader = get_db_connection(test_db_path)
+        counts_during_load = []
+
+        def progress(rows, fraction):
+            counts_during_load.append(
+                reader.execute("SELECT COUNT(*) FROM test_results").fetchone()[0]
+            )
+
+        ingest_upload(
+            test_db_connection,
+            encode_upload(make_test_results_df(10)),
+            chunk_size=3,
+            progress=progress,
+        )
+        count_after_load = reader.execute(
+            "SELECT COUNT(*) FROM test_results"
+        ).fetchone()[0]
+        reader.close()
+
+        assert counts_during_load == [len(sample_test_results)] * 4
+        assert count_after_load == 10
+
+    def test_failed_load_drops_staging(self, test_db_connection, sample_test_results):
+        """Test that a failed upload discards its staging table."""
+        df = make_test_results_df(6)
+        df.loc[5, "UNIQUE_ID"] = df.loc[0, "UNIQUE_ID"]
+
+        with pytest.raises(sqlite3.IntegrityError):
+            ingest_upload(test_db_connection, encode_upload(df), chunk_size=2)
+
+        assert not staged_copies(test_db_connection, "test_results")
+
+
+class TestReplaceTableData:
+    def test_replaces_existing_rows(self, test_db_connection, sample_test_results):
+        """Test that replace_table_data swaps out the previous contents."""
+        df = make_test_results_df(5)
+        replace_table_data(test_db_connection, "test_results", df)
+
+        ids = [
+            row[0]
+            for row in test_db_connection.execute(
+                "SELECT UNIQUE_ID FROM test_results ORDER BY UNIQUE_ID"
+            )
+        ]
+        assert ids == sorted(df["UNIQUE_ID"])
+
+    def test_reports_load_stats(self, test_db_connection):
+        """Test that replace_table_data reports rows and throughput."""
+        result = replace_table_data(
+            test_db_connection, "test_results", make_test_results_df(5)
+        )
+        assert result["rows"] == 5
+        assert result["seconds"] >= 0
+        assert result["rows_per_second"] > 0
+
+    def test_publishes_load_like_an_upload(self, test_db_connection):
+        """Test that replacing a table loads its marts and invalidates caches."""
+        upload = encode_upload(make_test_results_df(3))
+        ingest_upload(test_db_connection, upload)
+        version = get_data_version(test_db_connection)
+
+        df = make_test_results_df(4).assign(FLAG_CCSR=[1, 0, 1, 0])
+        replace_table_data(test_db_connection, "test_results", df)
+
+        assert get_data_version(test_db_connection)[1] == version[1] + 1
+        marts = test_db_connection.execute(
+            "SELECT UNIQUE_ID, MART FROM test_mart ORDER BY UNIQUE_ID"
+        ).fetchall()
+        assert [tuple(row) for row in marts] == [("test.0", "CCSR"), ("test.2", "CCSR")]
+        tests = test_db_connection.execute(
+            "SELECT SUM(TESTS) FROM mart_summary WHERE MART = 'CCSR'"
+        ).fetchone()[0]
+        assert tests == 2
+        # The table no longer matches the file uploaded before
+        assert not ingest_upload(test_db_connection, upload)["skipped"]
+
+    def test_rolls_back_on_error(self, test_db_connection, sample_test_results):
+        """Test that a failed load leaves the previous data in place."""
+        df = make_test_results_df(2)
+        df["UNIQUE_ID"] = "duplicate"  # Violates the primary key
+
+        with pytest.raises(sqlite3.IntegrityError):
+            replace_table_data(test_db_connection, "test_results", df)
+
+        count = test_db_connection.execute(
+            "SELECT COUNT(*) FROM test_results"
+        ).fetchone()[0]
+        assert count == len(sample_test_results)
+
+
+class TestIngestUpload:
+    def test_streams_test_results(self, test_db_connection, sample_test_results):
+        """Test that ingest_upload replaces test results across many chunks."""
+        df = make_test_results_df(25)
+        df.columns = [col.lower() for col in df.columns]
+
+        result = ingest_upload(test_db_connection, encode_upload(df), chunk_size=4)
+
+        count = test_db_connection.execute(
+            "SELECT COUNT(*) FROM test_results"
+        ).fetchone()[0]
+        assert result["file_type"] == "test_results"
+        assert result["rows"] == 25
+        assert count == 25
+        assert len(result["preview"]) == 4
+
+    def test_filters_severity_per_chunk(self, test_db_connection):
+        """Test that out-of-range severities are removed from every chunk."""
+        df = make_test_results_df(10)
+        df["SEVERITY_LEVEL"] = [0, 1, 2, 6, 3, 4, 9, 5, 1, 7]
+
+        result = ingest_upload(test_db_connection, encode_upload(df), chunk_size=3)
+
+        assert result["rows"] == 6
+        assert result["removed_rows"] == 4
+        assert result["has_severity"]
+
+    def test_drops_columns_outside_schema(self, test_db_connection):
+        """Test that only schema columns are written."""
+        df = make_test_results_df(3)
+        df["EXTRA"] = "x"
+
+        result = ingest_upload(test_db_connection, encode_upload(df))
+
+        assert "EXTRA" not in result["valid_columns"]
+        assert result["total_columns"] == 5
+
+    def test_streams_chart_data(self, test_db_connection, sample_chart_data):
+        """Test that chart data uploads replace chart_data and count charts."""
+        df = pd.DataFrame(
+            {
+                "DATA_QUALITY_CATEGORY": ["timeliness"] * 6,
+                "GRAPH_NAME": ["a", "b", "c", "a", "b", "c"],
+                "VALUE": range(6),
+            }
+        )
+
+        result = ingest_upload(test_db_connection, encode_upload(df), chunk_size=2)
+
+        count = test_db_connection.execute(
+            "SELECT COUNT(*) FROM chart_data"
+        ).fetchone()[0]
+        assert result["file_type"] == "chart_data"
+        assert result["graph_count"] == 3
+        assert count == 6
+
+    def test_splits_chart_metadata_into_catalog(self, test_db_connection):
+        """Test that each graph gets one catalog row shared by its chart rows."""
+        df = pd.DataFrame(
+            {
+                "DATA_QUALITY_CATEGORY": ["timeliness"] * 5,
+                "GRAPH_NAME": ["a", "b", "a", None, "c"],
+                "FILTER_DESCRIPTION": ["year"] * 5,
+                "CHART_FILTER": ["2019", "x", "2018", "x", None],
+                "VALUE": range(5),
+            }
+        )
+
+        result = ingest_upload(test_db_connection, encode_upload(df), chunk_size=2)
+
+        catalog = test_db_connection.execute(
+            "SELECT GRAPH_ID, GRAPH_NAME, FILTER_VALUES, ROW_COUNT FROM chart_catalog "
+            "ORDER BY GRAPH_ID"
+        ).fetchall()
+        graph_ids = test_db_connection.execute(
+            "SELECT GRAPH_ID FROM chart_data ORDER BY rowid"
+        ).fetchall()
+        assert result["removed_rows"] == 1
+        assert [tuple(row) for row in catalog] == [
+            (1, "a", '["2018","2019"]', 2),
+            (2, "b", '["x"]', 1),
+            (3, "c", "[]", 1),
+        ]
+        assert [row[0] for row in graph_ids] == [1, 2, 1, 3]
+
+    def test_stores_typed_columns_and_reports_invalid_values(self, test_db_connection):
+        """Test that timestamps and counts are stored as integers when loaded."""
+        df = make_test_results_df(6)
+        df["GENERATED_AT"] = "2025-03-05 20:24:04"
+        df["FAILED_ROW_COUNT"] = ["4", "none", "0", "lots", "none", "7"]
+
+        result = ingest_upload(test_db_connection, encode_upload(df), chunk_size=4)
+
+        rows = test_db_connection.execute(
+            "SELECT typeof(GENERATED_AT), FAILED_ROW_COUNT FROM test_results "
+            "ORDER BY rowid"
+        ).fetchall()
+        assert [tuple(row) for row in rows] == [
+            ("integer", 4),
+            ("integer", None),
+            ("integer", 0),
+            ("integer", None),
+            ("integer", None),
+            ("integer", 7),
+        ]
+        assert result["invalid_values"] == {
+            "FAILED_ROW_COUNT": {"count": 3, "examples": ["none", "lots"]}
+        }
+
+    def test_parses_chart_axes_into_typed_columns(self, test_db_connection):
+        """Test that chart axes get typed columns and each graph its axis kinds."""
+        df = pd.DataFrame(
+            {
+                "DATA_QUALITY_CATEGORY": ["timeliness"] * 4,
+                "GRAPH_NAME": ["a", "a", "b", "b"],
+                "Y_AXIS": ["2018-02-01", "2018-01-01", "10", "2.5"],
+                "X_AXIS": ["1", "2", "later", "2018-01-01"],
+                "VALUE": range(4),
+            }
+        )
+
+        ingest_upload(test_db_connection, encode_upload(df), chunk_size=3)
+
+        rows = test_db_connection.execute(
+            "SELECT Y_AXIS_NUMBER, Y_AXIS_DATE, X_AXIS_NUMBER, X_AXIS_DATE "
+            "FROM chart_data ORDER BY rowid"
+        ).fetchall()
+        kinds = test_db_connection.execute(
+            "SELECT Y_AXIS_KIND, X_AXIS_KIND FROM chart_catalog ORDER BY GRAPH_ID"
+        ).fetchall()
+        assert [tuple(row) for row in rows] == [
+            (None, 1517443200, 1.0, None),
+            (None, 1514764800, 2.0, None),
+            (10.0, None, None, None),
+            (2.5, None, None, 1514764800),
+        ]
+        assert [tuple(row) for row in kinds] == [("date", "number"), ("number", "text")]
+
+    def test_parses_years_on_date_axes(self, test_db_connection):
+        """Test that years and other date formats on date axes are parsed."""
+        df = pd.DataFrame(
+            {
+                "DATA_QUALITY_CATEGORY": ["timeliness"] * 3,
+                "GRAPH_NAME": ["a"] * 3,
+                "Y_AXIS_DESCRIPTION": ["claim_end_date year"] * 3,
+                "X_AXIS_DESCRIPTION": ["claim count"] * 3,
+                "Y_AXIS": ["2018", "03/15/2017", "2018-01-01"],
+                "X_AXIS": ["2018", "1", "2"],
+                "VALUE": range(3),
+            }
+        )
+
+        ingest_upload(test_db_connection, encode_upload(df))
+
+        rows = test_db_connection.execute(
+            "SELECT Y_AXIS_NUMBER, Y_AXIS_DATE, X_AXIS_NUMBER, X_AXIS_DATE "
+            "FROM chart_data ORDER BY rowid"
+        ).fetchall()
+        kinds = test_db_connection.execute(
+            "SELECT Y_AXIS_KIND, X_AXIS_KIND FROM chart_catalog"
+        ).fetchone()
+        assert [tuple(row) for row in rows] == [
+            (None, 1514764800, 2018.0, None),
+            (None, 1489536000, 1.0, None),
+            (None, 1514764800, 2.0, None),
+        ]
+        assert tuple(kinds) == ("date", "number")
+
+    def test_ignores_unrecognised_files(self, test_db_connection, sample_test_results):
+        """Test that unrecognised CSVs leave the database untouched."""
+        df = pd.DataFrame({"FOO": [1, 2]})
+
+        result = ingest_upload(test_db_connection, encode_upload(df))
+
+        count = test_db_connection.execute(
+            "SELECT COUNT(*) FROM test_results"
+        ).fetchone()[0]
+        assert result["file_type"] is None
+        assert count == len(sample_test_results)
+
+    def test_rolls_back_failed_upload(self, test_db_connection, sample_test_results):
+        """Test that an error mid-stream keeps the previous data."""
+        df = make_test_results_df(6)
+        df.loc[5, "UNIQUE_ID"] = df.loc[0, "UNIQUE_ID"]  # Duplicate in a later chunk
+
+        with pytest.raises(sqlite3.IntegrityError):
+            ingest_upload(test_db_connection, encode_upload(df), chunk_size=2)
+
+        count = test_db_connection.execute(
+            "SELECT COUNT(*) FROM test_results"
+        ).fetchone()[0]
+        assert count == len(sample_test_results)
+
+
+class TestIncrementalIngest:
+    def load(self, conn, df, **kwargs):
+        return ingest_upload(
+            conn, encode_upload(df), mode=INGEST_INCREMENTAL, chunk_size=4, **kwargs
+        )
+
+    def test_reports_change_counts(self, test_db_connection):
+        """Test that an incremental load counts inserts, updates and no-ops."""
+        self.load(test_db_connection, make_test_results_df(10))
+
+        df = make_test_results_df(12)
+        df.loc[0, "STATUS"] = "warn"
+        df.loc[1, "SEVERITY_LEVEL"] = 5
+        result = self.load(test_db_connection, df)
+
+        assert result["mode"] == INGEST_INCREMENTAL
+        assert result["inserted"] == 2
+        assert result["updated"] == 2
+        assert result["unchanged"] == 8
+        assert result["deleted"] == 0
+
+    def test_applies_updates(self, test_db_connection):
+        """Test that changed values are written to the live table."""
+        self.load(test_db_connection, make_test_results_df(5))
+        df = make_test_results_df(5)
+        df.loc[2, "STATUS"] = "error"
+        self.load(test_db_connection, df)
+
+        status = test_db_connection.execute(
+            "SELECT STATUS FROM test_results WHERE UNIQUE_ID = 'test.2'"
+        ).fetchone()[0]
+        assert status == "error"
+
+    def test_keeps_missing_rows_by_default(self, test_db_connection):
+        """Test that tests absent from the file are kept unless asked otherwise."""
+        self.load(test_db_connection, make_test_results_df(6))
+        result = self.load(test_db_connection, make_test_results_df(4))
+
+        count = test_db_connection.execute(
+            "SELECT COUNT(*) FROM test_results"
+        ).fetchone()[0]
+        assert result["deleted"] == 0
+        assert count == 6
+
+    def test_deletes_missing_rows(self, test_db_connection):
+        """Test that delete_missing removes tests absent from the file."""
+        self.load(test_db_connection, make_test_results_df(6))
+        result = self.load(
+            test_db_connection, make_test_results_df(4), delete_missing=True
+        )
+
+        count = test_db_connection.execute(
+            "SELECT COUNT(*) FROM test_results"
+        ).fetchone()[0]
+        assert result["deleted"] == 2
+        assert count == 4
+        assert not staged_copies(test_db_connection, "test_results")
+
+    def test_leaves_untouched_columns(self, test_db_connection, sample_test_results):
+        """Test that columns missing from the file keep their stored values."""
+        unique_id = sample_test_results[0]["UNIQUE_ID"]
+        df = pd.DataFrame(
+            {
+                "UNIQUE_ID": [unique_id],
+                "TEST_NAME": ["renamed"],
+                "SEVERITY_LEVEL": [1],
+            }
+        )
+        result = self.load(test_db_connection, df)
+
+        row = test_db_connection.execute(
+            "SELECT TEST_NAME, TABLE_NAME FROM test_results WHERE UNIQUE_ID = ?",
+            (unique_id,),
+        ).fetchone()
+        assert result["updated"] == 1
+        assert row["TEST_NAME"] == "renamed"
+        assert row["TABLE_NAME"] == sample_test_results[0]["TABLE_NAME"]
+
+    def test_chart_data_is_always_replaced(self, test_db_connection, sample_chart_data):
+        """Test that chart data, which has no key, falls back to a replace."""
+        df = pd.DataFrame(
+            {"DATA_QUALITY_CATEGORY": ["timeliness"], "GRAPH_NAME": ["a"], "VALUE": [1]}
+        )
+        result = self.load(test_db_connection, df)
+
+        count = test_db_connection.execute(
+            "SELECT COUNT(*) FROM chart_data"
+        ).fetchone()[0]
+        assert result["mode"] == "replace"
+        assert count == 1
+
+
+class TestUploadDigest:
+    def test_matches_for_identical_payloads(self):
+        """Test that the digest depends on the payload, not the block size."""
+        contents = encode_upload(make_test_results_df(50))
+        assert upload_digest(contents) == upload_digest(contents, block_size=8)
+
+    def test_differs_for_changed_payloads(self):
+        """Test that changing a single value changes the digest."""
+        df = make_test_results_df(5)
+        before = upload_digest(encode_upload(df))
+        df.loc[3, "STATUS"] = "warn"
+        assert upload_digest(encode_upload(df)) != before
+
+
+class TestRowHashes:
+    def test_ignores_int_float_parsing(self):
+        """Test that a whole number hashes the same whether parsed as int or float."""
+        as_int = pd.DataFrame({"A": ["x"], "B": [3]})
+        as_float = pd.DataFrame({"A": ["x"], "B": [3.0]})
+        assert row_hashes(as_int).tolist() == row_hashes(as_float).tolist()
+
+    def test_detects_changed_values(self):
+        """Test that rows with different values get different hashes."""
+        df = pd.DataFrame({"A": ["x", "x", "y"], "B": [1, 2, 1]})
+        assert row_hashes(df).nunique() == 3
+
+
+class TestChangeDetection:
+    def test_identical_file_is_skipped(self, test_db_connection):
+        """Test that re-uploading the last loaded file writes nothing."""
+        contents = encode_upload(make_test_results_df(8))
+        ingest_upload(test_db_connection, contents)
+        # Edit the table behind the loader's back to prove nothing is rewritten
+        test_db_connection.execute("UPDATE test_results SET STATUS = 'edited'")
+        test_db_connection.commit()
+
+        result = ingest_upload(test_db_connection, contents)
+
+        statuses = test_db_connection.execute(
+            "SELECT DISTINCT STATUS FROM test_results"
+        ).fetchall()
+        assert result["skipped"] is True
+        assert result["rows"] == 0
+        assert [row[0] for row in statuses] == ["edited"]
+
+    def test_changed_file_is_loaded(self, test_db_connection):
+        """Test that a file differing from the last load is not skipped."""
+        ingest_upload(test_db_connection, encode_upload(make_test_results_df(8)))
+        result = ingest_upload(
+            test_db_connection, encode_upload(make_test_results_df(9))
+        )
+        assert result["skipped"] is False
+        assert result["rows"] == 9
+
+    def test_merge_forgets_file_digest(self, test_db_connection):
+        """Test that a merge keeping old rows means the file must load again."""
+        full = encode_upload(make_test_results_df(8))
+        ingest_upload(test_db_connection, full)
+        ingest_upload(
+            test_db_connection,
+            encode_upload(make_test_results_df(4)),
+            mode=INGEST_INCREMENTAL,
+        )
+        result = ingest_upload(test_db_connection, full)
+        assert result["skipped"] is False
+
+    def test_stores_row_hashes(self, test_db_connection):
+        """Test that test results are stored with a hash of their values."""
+        ingest_upload(test_db_connection, encode_upload(make_test_results_df(3)))
+        hashes = test_db_connection.execute(
+            f"SELECT {ROW_HASH_COLUMN} FROM test_results"
+        ).fetchall()
+        assert all(row[0] for row in hashes)
+
+    def test_incremental_skips_rows_with_same_hash(self, test_db_connection):
+        """Test that only rows whose hash changed are rewritten."""
+        ingest_upload(test_db_connection, encode_upload(make_test_results_df(10)))
+        df = make_test_results_df(10)
+        df.loc[4, "STATUS"] = "error"
+        result = ingest_upload(
+            test_db_connection, encode_upload(df), mode=INGEST_INCREMENTAL
+        )
+        assert result["updated"] == 1
+        assert result["unchanged"] == 9
+
+
+def make_flagged_df(rows: int) -> pd.DataFrame:
+    """Test results flagging even tests for CCSR and every third for a new mart."""
+    df = make_test_results_df(rows)
+    df["FLAG_CCSR"] = [int(i % 2 == 0) for i in range(rows)]
+    df["FLAG_NEW_MART"] = [int(i % 3 == 0) for i in range(rows)]
+    return df
+
+
+def memberships(conn) -> set:
+    return {
+        (row[0], row[1])
+        for row in conn.execute("SELECT UNIQUE_ID, MART FROM test_mart")
+    }
+
+
+class TestMartBridge:
+    def test_mart_memberships(self):
+        """Test that flags equal to 1 become UNIQUE_ID, MART rows."""
+        df = pd.DataFrame(
+            {
+                "UNIQUE_ID": ["a", "b"],
+                "FLAG_CCSR": [1, 0],
+                "FLAG_READMISSION": [1.0, None],
+            }
+        )
+        result = mart_memberships(df, mart_flag_columns(df.columns))
+        assert set(result.itertuples(index=False, name=None)) == {
+            ("a", "CCSR"),
+            ("a", "READMISSION"),
+        }
+
+    def test_loads_memberships_and_registers_new_marts(self, test_db_connection):
+        """Test that a load fills the bridge and registers marts it has not seen."""
+        ingest_upload(test_db_connection, encode_upload(make_flagged_df(6)), 4)
+
+        assert memberships(test_db_connection) == {
+            ("test.0", "CCSR"),
+            ("test.2", "CCSR"),
+            ("test.4", "CCSR"),
+            ("test.0", "NEW_MART"),
+            ("test.3", "NEW_MART"),
+        }
+        marts = [
+            row[0]
+            for row in test_db_connection.execute(
+                "SELECT MART FROM marts ORDER BY SORT_ORDER"
+            )
+        ]
+        assert marts == [*MART_NAMES, "NEW_MART"]
+
+    def test_replace_drops_old_memberships(self, test_db_connection):
+        """Test that replacing the test results replaces their memberships."""
+        ingest_upload(test_db_connection, encode_upload(make_flagged_df(6)))
+        ingest_upload(test_db_connection, encode_upload(make_test_results_df(6)))
+        assert memberships(test_db_connection) == set()
+
+    def test_incremental_replaces_memberships_of_loaded_tests(self, test_db_connection):
+        """Test that a merge rewrites the memberships of the tests in the file."""
+        ingest_upload(test_db_connection, encode_upload(make_flagged_df(6)))
+        df = make_flagged_df(2)
+        df["FLAG_CCSR"] = 0
+        ingest_upload(test_db_connection, encode_upload(df), mode=INGEST_INCREMENTAL)
+
+        assert ("test.0", "CCSR") not in memberships(test_db_connection)
+        assert ("test.0", "NEW_MART") in memberships(test_db_connection)
+        assert ("test.4", "CCSR") in memberships(test_db_connection)
+
+    def test_incremental_without_flags_keeps_memberships(self, test_db_connection):
+        """Test that a merge of a file without mart flags leaves the bridge alone."""
+        ingest_upload(test_db_connection, encode_upload(make_flagged_df(6)))
+        before = memberships(test_db_connection)
+        ingest_upload(
+            test_db_connection,
+            encode_upload(make_test_results_df(6)),
+            mode=INGEST_INCREMENTAL,
+        )
+        assert memberships(test_db_connection) == before
+
+    def test_delete_missing_drops_memberships(self, test_db_connection):
+        """Test that deleting tests absent from the file drops their memberships."""
+        ingest_upload(test_db_connection, encode_upload(make_flagged_df(6)))
+        ingest_upload(
+            test_db_connection,
+            encode_upload(make_test_results_df(3)),
+            mode=INGEST_INCREMENTAL,
+            delete_missing=True,
+        )
+        assert memberships(test_db_connection) == {
+            ("test.0", "CCSR"),
+            ("test.2", "CCSR"),
+            ("test.0", "NEW_MART"),
+        }
+
+
+def stale_summaries(conn) -> list:
+    """List the summary tables whose rows differ from a fresh aggregate."""
+    stale = []
+    for summary, (_, query) in SUMMARY_TABLES.items():
+        stored = sorted(map(tuple, conn.execute(f"SELECT * FROM {summary}")), key=repr)
+        fresh = sorted(map(tuple, conn.execute(query)), key=repr)
+        if stored != fresh:
+            stale.append(summary)
+    return stale
+
+
+class TestSummaryTables:
+    def test_replace_rebuilds_summaries(self, test_db_connection, sample_test_results):
+        """Test that a replacing load leaves every summary up to date."""
+        ingest_upload(test_db_connection, encode_upload(make_flagged_df(30)), 8)
+        assert stale_summaries(test_db_connection) == []
+        assert (
+            test_db_connection.execute("SELECT TEST_COUNT FROM run_meta").fetchone()[0]
+            == 30
+        )
+
+    def test_incremental_updates_summaries(self, test_db_connection):
+        """Test that a merge that updates, inserts and deletes tests is reflected."""
+        ingest_upload(test_db_connection, encode_upload(make_flagged_df(30)))
+        df = make_flagged_df(40).iloc[10:].copy()
+        df["STATUS"] = "fail"
+        ingest_upload(
+            test_db_connection,
+            encode_upload(df),
+            mode=INGEST_INCREMENTAL,
+            delete_missing=True,
+        )
+        assert stale_summaries(test_db_connection) == []
+
+    def test_chart_load_replaces_catalog(self, test_db_connection, sample_chart_data):
+        """Test that loading chart data replaces the chart catalog."""
+        df = pd.DataFrame(
+            {
+                "DATA_QUALITY_CATEGORY": ["timeliness"] * 3,
+                "GRAPH_NAME": ["a", "a", "b"],
+                "CHART_FILTER": ["x", "y", "x"],
+                "VALUE": [1, 2, 3],
+            }
+        )
+        ingest_upload(test_db_connection, encode_upload(df))
+        rows = test_db_connection.execute(
+            "SELECT GRAPH_NAME, ROW_COUNT FROM chart_catalog ORDER BY GRAPH_NAME"
+        ).fetchall()
+        assert [tuple(row) for row in rows] == [("a", 2), ("b", 1)]
+
+    def test_failed_load_keeps_summaries(self, test_db_connection, sample_test_results):
+        """Test that a load that fails leaves the summaries of the old data."""
+        before = test_db_connection.execute("SELECT * FROM run_meta").fetchall()
+        with pytest.raises(Exception):
+            replace_table_data(
+                test_db_connection,
+                "test_results",
+                pd.DataFrame({"UNIQUE_ID": ["dup", "dup"]}),
+            )
+        after = test_db_connection.execute("SELECT * FROM run_meta").fetchall()
+        assert list(map(tuple, after)) == list(map(tuple, before))
+
+
+test_ids = st.sampled_from([f"test.{i}" for i in range(8)])
+test_columns = {
+    "UNIQUE_ID": test_ids,
+    "DATABASE_NAME": st.just("dev"),
+    "STATUS": st.sampled_from(["pass", "fail", "warn", None]),
+    "SEVERITY_LEVEL": st.sampled_from([1, 2, 3, 4, 5, None]),
+    "TEST_CATEGORY": st.sampled_from(["completeness", "validity", None]),
+    "TABLE_NAME": st.sampled_from(["claims", "eligibility", None]),
+    "QUALITY_DIMENSION": st.sampled_from(["validity", None]),
+    "GENERATED_AT": st.sampled_from(["2025-01-01", "2025-02-01", None]),
+}
+test_rows = st.fixed_dictionaries(
+    {**test_columns, "MARTS": st.sets(st.sampled_from(["CCSR", "READMISSION"]))}
+)
+upserts = st.tuples(
+    st.just("upsert"),
+    st.lists(test_rows, max_size=6, unique_by=lambda row: row["UNIQUE_ID"]),
+    st.booleans(),
+)
+deletes = st.tuples(st.just("delete"), st.sets(test_ids), st.just(False))
+
+
+def upsert_rows(conn, rows: list, delete_missing: bool) -> None:
+    """Merge rows through the staged upsert, replacing their mart memberships."""
+    df = pd.DataFrame(rows, columns=[*test_columns, "MARTS"]).drop(columns="MARTS")
+    bridge = pd.DataFrame(
+        [(row["UNIQUE_ID"], mart) for row in rows for mart in row["MARTS"]],
+        columns=["UNIQUE_ID", "MART"],
+    )
+    staging_name = create_staging_table(conn, "test_results")
+    bridge_staging_name = create_staging_table(conn, "test_mart")
+    bulk_insert(conn, staging_name, df)
+    bulk_insert(conn, bridge_staging_name, bridge)
+    conn.commit()
+    apply_staged_upsert(
+        conn,
+        "test_results",
+        staging_name,
+        list(df.columns),
+        delete_missing=delete_missing,
+        bridge_staging_name=bridge_staging_name,
+    )
+
+
+class TestSummaryCounters:
+    @settings(
+        max_examples=50,
+        deadline=None,
+        suppress_health_check=[HealthCheck.function_scoped_fixture],
+    )
+    @given(operations=st.lists(st.one_of(upserts, deletes), max_size=8))
+    def test_counters_match_recount(self, test_db_connection, operations):
+        """Test that trigger-kept counters equal a full recount after any changes."""
+        conn = test_db_connection
+        conn.execute("DELETE FROM test_results")
+        conn.execute("DELETE FROM test_mart")
+        rebuild_summaries(conn)
+        conn.commit()
+
+        for action, rows, delete_missing in operations:
+            if action == "upsert":
+                upsert_rows(conn, rows, delete_missing)
+            else:
+                placeholders = ", ".join(["?"] * len(rows))
+                for table_name in ("test_results", "test_mart"):
+                    conn.execute(
+                        f"DELETE FROM {table_name} "
+                        f"WHERE UNIQUE_ID IN ({placeholders})",
+                        list(rows),
+                    )
+                conn.commit()
+            assert stale_summaries(conn) == []
@@ -0,0 +1,167 @@
+import functools
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from db import BACKFILLS, get_db_connection, run_backfill_batch, schedule_backfill
+from services.ingest_service import INGEST_INCREMENTAL
+from services.job_service import (
+    JOB_FAILED,
+    JOB_SUCCEEDED,
+    get_ingest_job,
+    submit_backfill_job,
+    submit_ingest_job,
+)
+from tests.test_ingest_service import encode_upload, make_test_results_df
+
+
+@pytest.fixture
+def mock_job_db_connection(monkeypatch, test_db_connection, test_db_path):
+    """Point the job service at the test database with a fresh connection per call."""
+    monkeypatch.setattr(
+        "services.job_service.get_db_connection",
+        lambda **kwargs: get_db_connection(test_db_path, **kwargs),
+    )
+
+
+def wait_for_job(job_id: str, timeout: float = 10.0) -> dict:
+    """Poll a job until it leaves the queued/running states."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = get_ingest_job(job_id)
+        if job["state"] in (JOB_SUCCEEDED, JOB_FAILED):
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(f"Job {job_id} did not finish")
+
+
+class TestSubmitIngestJob:
+    def test_runs_upload_in_background(
+        self, mock_job_db_connection, test_db_connection
+    ):
+        """Test that a submitted job loads the upload and records success."""
+        job_id = submit_ingest_job(
+            encode_upload(make_test_results_df(12)), "results.csv"
+        )
+        job = wait_for_job(job_id)
+
+        count = test_db_connection.execute(
+            "SELECT COUNT(*) FROM test_results"
+        ).fetchone()[0]
+        assert job["state"] == JOB_SUCCEEDED
+        assert job["rows_processed"] == 12
+        assert job["progress"] == 1.0
+        assert job["result"]["file_type"] == "test_results"
+        assert count == 12
+
+    def test_records_failure(self, mock_job_db_connection):
+        """Test that a failing upload marks the job failed with its error."""
+        df = make_test_results_df(3)
+        df["UNIQUE_ID"] = "duplicate"
+
+        job = wait_for_job(submit_ingest_job(encode_upload(df), "results.csv"))
+
+        assert job["state"] == JOB_FAILED
+        assert "UNIQUE constraint failed" in job["error"]
+
+
+class TestRunIngestJob:
+    def test_reports_progress(self, mock_job_db_connection, monkeypatch):
+        """Test that live progress is visible while the job is running."""
+        seen = []
+        submitted = threading.Event()
+
+        def fake_ingest(conn, contents, progress, **kwargs):
+            submitted.wait(timeout=5)
+            progress(5, 0.5)
+            seen.append(get_ingest_job(job_id))
+            return {"rows": 5}
+
+        monkeypatch.setattr("services.job_service.ingest_upload", fake_ingest)
+        job_id = submit_ingest_job("data:text/csv;base64,", "results.csv")
+        submitted.set()
+        wait_for_job(job_id)
+
+        assert seen[0]["rows_processed"] == 5
+        assert seen[0]["progress"] == 0.5
+
+    def test_unknown_upload_format_succeeds_without_rows(self, mock_job_db_connection):
+        """Test that an unrecognised CSV finishes with no file type."""
+        job = wait_for_job(
+            submit_ingest_job(encode_upload(pd.DataFrame({"FOO": [1]})), "other.csv")
+        )
+
+        assert job["state"] == JOB_SUCCEEDED
+        assert job["result"]["file_type"] is None
+
+    def test_passes_ingest_mode(self, mock_job_db_connection, test_db_connection):
+        """Test that the ingest mode chosen at submit time reaches the loader."""
+        wait_for_job(
+            submit_ingest_job(encode_upload(make_test_results_df(6)), "results.csv")
+        )
+        job = wait_for_job(
+            submit_ingest_job(
+                encode_upload(make_test_results_df(4)),
+                "results.csv",
+                mode=INGEST_INCREMENTAL,
+                delete_missing=True,
+            )
+        )
+
+        assert job["state"] == JOB_SUCCEEDED
+        assert job["result"]["unchanged"] == 4
+        assert job["result"]["deleted"] == 2
+
+
+class TestGetIngestJob:
+    def test_returns_none_for_unknown_job(self, mock_job_db_connection):
+        """Test that get_ingest_job returns None for an unknown id."""
+        assert get_ingest_job("missing") is None
+
+
+class TestSubmitBackfillJob:
+    def test_runs_backfill_in_background(
+        self, monkeypatch, mock_job_db_connection, test_db_connection
+    ):
+        """Test that a scheduled backfill runs batch by batch until complete."""
+        test_db_connection.executemany(
+            "INSERT INTO test_results (UNIQUE_ID) VALUES (?)",
+            [(f"test.{i}",) for i in range(5)],
+        )
+        monkeypatch.setitem(
+            BACKFILLS,
+            "fill_category",
+            (
+                "test_results",
+                lambda conn, first, last: conn.execute(
+                    "UPDATE test_results SET TEST_CATEGORY = 'filled' "
+                    "WHERE rowid BETWEEN ? AND ?",
+                    (first, last),
+                ),
+            ),
+        )
+        # Small batches so the job has to queue itself again
+        monkeypatch.setattr(
+            "services.job_service.run_backfill_batch",
+            functools.partial(run_backfill_batch, batch_size=2),
+        )
+        schedule_backfill(test_db_connection, "fill_category")
+        test_db_connection.commit()
+
+        submit_backfill_job()
+
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            completed_at = test_db_connection.execute(
+                "SELECT COMPLETED_AT FROM schema_backfills"
+            ).fetchone()[0]
+            if completed_at:
+                break
+            time.sleep(0.05)
+        filled = test_db_connection.execute(
+            "SELECT COUNT(*) FROM test_results WHERE TEST_CATEGORY = 'filled'"
+        ).fetchone()[0]
+        assert completed_at is not None
+        assert filled == 5
@@ -0,0 +1,205 @@
+import json
+from contextvars import copy_context
+
+import dash
+import pandas as pd
+import pytest
+from dash import html
+from dash._callback import GLOBAL_CALLBACK_MAP
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+
+import app  # noqa: F401  Pages can only be registered once the app exists
+from db import count_chart_rows
+from pages import page_analytics
+from pages.charts import create_chart, create_run_trend_chart
+from services.ingest_service import bulk_insert, split_chart_rows
+
+
+def component_ids(component) -> set:
+    """Collect the ids of a component and all of its descendants.
+
+    Pattern-matching ids are reduced to their type.
+    """
+    ids = set()
+    for child in [component, *component._traverse()]:
+        component_id = getattr(child, "id", None)
+        if isinstance(component_id, dict):
+            ids.add(component_id["type"])
+        elif component_id is not None:
+            ids.add(component_id)
+    return ids
+
+
+def callback_output_ids(module) -> list:
+    """List (callback name, output id) pairs of the callbacks in a module."""
+    outputs = []
+    for key, registered in GLOBAL_CALLBACK_MAP.items():
+        func = getattr(registered.get("callback"), "__wrapped__", None)
+        if func is None or func.__module__ != module.__name__:
+            continue
+        for output in key.strip(".").split("..."):
+            output_id = output.split("@")[0].rsplit(".", 1)[0]
+            if output_id.startswith("{"):
+                output_id = json.loads(output_id)["type"]
+            outputs.append((func.__name__, output_id))
+    return outputs
+
+
+def call_triggered_by(prop_id, callback, *args):
+    """Call a callback as if a change of ``prop_id`` had triggered it."""
+
+    def run():
+        context_value.set(
+            AttributeDict(triggered_inputs=[{"prop_id": prop_id, "value": None}])
+        )
+        return callback(*args)
+
+    return copy_context().run(run)
+
+
+# Explorer callbacks with their arguments on page 3 of a query; each returns
+# the page it loads as its third output
+EXPLORER_CALLBACKS = {
+    "error-explorer": (
+        page_analytics.update_error_explorer,
+        (3, 10, [], "", None, None),
+    ),
+    "failing-explorer": (
+        page_analytics.update_failing_explorer,
+        (3, 10, [], "", "CCSR"),
+    ),
+    "passing-explorer": (
+        page_analytics.update_passing_explorer,
+        (3, 10, [], "", "CCSR"),
+    ),
+    "search-explorer": (
+        page_analytics.update_test_search,
+        ([], 3, 10, [], "", None, []),
+    ),
+}
+
+
+class TestAnalyticsLayout:
+    def test_callback_outputs_exist(self, sample_test_results):
+        """Test that every callback output of the page has a component to update."""
+        # The test details are rendered into the modal when a test is opened
+        modal = html.Div(
+            page_analytics.create_test_modal_content(sample_test_results[0])
+        )
+        ids = component_ids(page_analytics.layout) | component_ids(modal)
+
+        outputs = callback_output_ids(page_analytics)
+        assert outputs
+        missing = [
+            (name, output_id) for name, output_id in outputs if output_id not in ids
+        ]
+        assert not missing
+
+    @pytest.mark.parametrize("callback", ["refresh_dashboard", "update_test_search"])
+    def test_callback_is_registered(self, callback):
+        """Test that the page's callbacks are found by the output check."""
+        assert callback in {name for name, _ in callback_output_ids(page_analytics)}
+
+
+class TestRefreshDashboard:
+    def test_refresh_is_one_callback(self):
+        """Test that refreshing and uploading trigger only refresh_dashboard."""
+        triggers = {"refresh-button.n_clicks", "output-data-upload.children"}
+        refreshed = {
+            registered["callback"].__wrapped__.__name__
+            for registered in GLOBAL_CALLBACK_MAP.values()
+            if "callback" in registered
+            and triggers
+            & {f"{item['id']}.{item['property']}" for item in registered["inputs"]}
+        }
+        assert refreshed == {"refresh_dashboard"}
+
+    def test_reloads_only_changed_data(
+        self, monkeypatch, managed_get_db_connection, sample_test_results
+    ):
+        """Test that the stored data version only changes along with the data."""
+        monkeypatch.setattr(
+            "services.history_service.get_db_connection", managed_get_db_connection
+        )
+        outputs = page_analytics.refresh_dashboard(None, None, None)
+        data_version = outputs[7]
+        assert data_version is not dash.no_update
+
+        outputs = page_analytics.refresh_dashboard(1, None, data_version)
+        assert outputs[0] is not dash.no_update
+        assert all(output is dash.no_update for output in outputs[7:])
+
+
+class TestExplorerPaging:
+    @pytest.fixture(autouse=True)
+    def serve_search(self, monkeypatch, managed_get_db_connection):
+        monkeypatch.setattr(
+            "services.search_service.get_db_connection", managed_get_db_connection
+        )
+
+    @pytest.mark.parametrize("explorer_id", EXPLORER_CALLBACKS)
+    @pytest.mark.parametrize(
+        "prop, page", [("sort_by", 0), ("filter_query", 0), ("page_current", 3)]
+    )
+    def test_new_query_starts_from_first_page(self, explorer_id, prop, page):
+        """Test that a new sort order or filter goes back to the first page."""
+        callback, args = EXPLORER_CALLBACKS[explorer_id]
+        outputs = call_triggered_by(f"{explorer_id}.{prop}", callback, *args)
+        assert outputs[2] == page
+
+    def test_new_mart_starts_from_first_page(self):
+        """Test that choosing another mart of the errors goes back to page one."""
+        callback, args = EXPLORER_CALLBACKS["error-explorer"]
+        outputs = call_triggered_by("error-explorer-mart.value", callback, *args)
+        assert outputs[2] == 0
+
+
+class TestCreateChart:
+    def test_plots_years_on_a_date_axis(
+        self, managed_get_db_connection, test_db_connection
+    ):
+        """Test that year values on an axis described as a date are plotted."""
+        rows = pd.DataFrame(
+            {
+                "GRAPH_NAME": "claims_by_year",
+                "DATA_QUALITY_CATEGORY": "timeliness",
+                "Y_AXIS_DESCRIPTION": "claim_end_date year",
+                "X_AXIS_DESCRIPTION": "N/A",
+                "FILTER_DESCRIPTION": "N/A",
+                "Y_AXIS": ["2018", "2017"],
+                "VALUE": [20, 10],
+            }
+        )
+        catalog, chart_rows = split_chart_rows(rows, {})
+        bulk_insert(test_db_connection, "chart_catalog", catalog)
+        bulk_insert(test_db_connection, "chart_data", chart_rows)
+        count_chart_rows(test_db_connection)
+        test_db_connection.commit()
+
+        figure = create_chart("claims_by_year").figure
+        dates = pd.to_datetime(figure.data[0].x)
+
+        assert list(dates) == [pd.Timestamp("2017-01-01"), pd.Timestamp("2018-01-01")]
+
+
+class TestCreateRunTrendChart:
+    def test_labels_marts_with_display_names(self):
+        """Test that the mart heatmap labels marts like the rest of the dashboard."""
+        trend = pd.DataFrame(
+            {
+                "RUN_ID": [1],
+                "GENERATED_AT": ["2024-01-01 00:00:00"],
+                "LOADED_AT": ["2024-01-02 00:00:00"],
+                "GRADE": ["A"],
+                "FAILING_COUNT": [0],
+                **{f"SEV{severity}_FAILURES": [0] for severity in range(1, 6)},
+            }
+        )
+        mart_trend = pd.DataFrame(
+            {"RUN_ID": [1, 1], "MART": ["CMS_HCCS", "ED_CLASSIFICATION"]}
+        ).assign(STATUS="pass")
+
+        heatmap = create_run_trend_chart(trend, mart_trend).children[1].figure
+
+        assert list(heatmap.data[0].y) == ["CMS HCCs", "ED Classification"]
@@ -0,0 +1,168 @@
+import pandas as pd
+import pytest
+
+from db import get_db_connection
+from services import search_service
+from services.search_service import SEARCH_FACETS, search_tests
+
+# Values the search tests cycle through, so every facet has several values
+SEARCH_VALUES = {
+    "TABLE_NAME": ["claims", "eligibility", "pharmacy"],
+    "TEST_COLUMN_NAME": ["member_id", "paid_amount"],
+    "QUALITY_DIMENSION": ["validity", "completeness"],
+    "TEST_CATEGORY": ["timeliness", "validity", "completeness", "uniqueness"],
+    "SEVERITY_LEVEL": [1, 2, 3, 4, 5],
+    "STATUS": ["pass", "fail", "pass", "warn"],
+    "TEST_TYPE": ["generic", "singular", "generic"],
+}
+
+# Marts of each test, with some tests in two marts and some in none
+SEARCH_MARTS = [["CCSR"], ["CCSR", "READMISSION"], [], ["READMISSION"], ["CMS_HCCS"]]
+
+
+@pytest.fixture
+def search_test_results(monkeypatch, test_db_connection, test_db_path):
+    """Load tests with varied facet values and serve the search service."""
+    tests = pd.DataFrame(
+        [
+            {
+                "UNIQUE_ID": f"test.{i}",
+                **{
+                    column: values[i % len(values)]
+                    for column, values in SEARCH_VALUES.items()
+                },
+            }
+            for i in range(60)
+        ]
+    )
+    tests.to_sql("test_results", test_db_connection, if_exists="append", index=False)
+    marts = pd.DataFrame(
+        [
+            (unique_id, mart)
+            for i, unique_id in enumerate(tests["UNIQUE_ID"])
+            for mart in SEARCH_MARTS[i % len(SEARCH_MARTS)]
+        ],
+        columns=["UNIQUE_ID", "MART"],
+    )
+    marts.to_sql("test_mart", test_db_connection, if_exists="append", index=False)
+    test_db_connection.commit()
+
+    def managed_connection(**kwargs):
+        return get_db_connection(test_db_path, **kwargs)
+
+    monkeypatch.setattr(search_service, "get_db_connection", managed_connection)
+    return tests, marts
+
+
+def count_matches(tests, marts, selections: dict, status=None, exclude=None):
+    """Recount the search with pandas, by the values of ``exclude`` if given."""
+    matched = tests
+    if status == "failing":
+        matched = matched[matched["STATUS"] != "pass"]
+    for facet, values in selections.items():
+        if facet == exclude:
+            continue
+        if facet == "MART":
+            in_marts = marts.loc[marts["MART"].isin(values), "UNIQUE_ID"]
+            matched = matched[matched["UNIQUE_ID"].isin(in_marts)]
+        else:
+            matched = matched[matched[facet].isin(values)]
+    if exclude is None:
+        return len(matched)
+    if exclude == "MART":
+        counts = marts[marts["UNIQUE_ID"].isin(matched["UNIQUE_ID"])]["MART"]
+    else:
+        counts = matched[exclude]
+    return dict(counts.value_counts())
+
+
+class TestSearchTests:
+    @pytest.mark.parametrize(
+        "selections, status",
+        [
+            ({}, None),
+            ({}, "failing"),
+            ({"SEVERITY_LEVEL": (1, 2)}, None),
+            ({"MART": ("CCSR",)}, None),
+            ({"MART": ("READMISSION",)}, "failing"),
+            ({"MART": ("READMISSION",), "TEST_CATEGORY": ("validity",)}, None),
+            ({"TABLE_NAME": ("claims",), "TEST_COLUMN_NAME": ("member_id",)}, None),
+        ],
+    )
+    def test_counts_match_recount(self, search_test_results, selections, status):
+        """Test that the total and every facet's counts match a full recount."""
+        tests, marts = search_test_results
+        result = search_tests(selections=tuple(selections.items()), status=status)
+
+        assert result["total"] == count_matches(tests, marts, selections, status)
+        for facet in SEARCH_FACETS:
+            expected = count_matches(tests, marts, selections, status, facet)
+            assert dict(result["facets"][facet]) == expected, facet
+
+    def test_counts_tests_filtered_on_other_columns(self, search_test_results):
+        """Test that filters on columns outside the facets still narrow counts."""
+        tests, marts = search_test_results
+        result = search_tests(
+            selections=(("MART", ("CCSR",)),),
+            filters=(("TEST_TYPE", "=", "singular"),),
+        )
+        singular = tests[tests["TEST_TYPE"] == "singular"]
+        assert result["total"] == count_matches(singular, marts, {"MART": ("CCSR",)})
+        assert dict(result["facets"]["MART"]) == count_matches(
+            singular, marts, {}, exclude="MART"
+        )
+
+    def test_pages_through_matching_tests(self, search_test_results):
+        """Test that pages hold consecutive matching tests in the sort order."""
+        tests, marts = search_test_results
+        selections = (("MART", ("CCSR",)),)
+        pages = [
+            search_tests(
+                selections=selections,
+                sort_by=(("TABLE_NAME", "asc"),),
+                page=page,
+                page_size=10,
+            )
+            for page in (1, 2, 3)
+        ]
+        paged = pd.concat([page["rows"] for page in pages])
+
+        in_mart = marts.loc[marts["MART"] == "CCSR", "UNIQUE_ID"]
+        assert sorted(paged["UNIQUE_ID"]) == sorted(in_mart)
+        assert list(paged["TABLE_NAME"]) == sorted(paged["TABLE_NAME"])
+
+    def test_rejects_unknown_facets(self, search_test_results):
+        """Test that only the search facets can be selected."""
+        with pytest.raises(ValueError):
+            search_tests(selections=(("TEST_RESULTS_QUERY", ("x",)),))
+
+    def test_rejects_several_marts(self, search_test_results):
+        """Test that a search selects one mart at a time."""
+        with pytest.raises(ValueError, match="MART"):
+            search_tests(selections=(("MART", ("CCSR", "READMISSION")),))
+
+    @pytest.mark.parametrize(
+        "selections, status",
+        [
+            ((), None),
+            ((("SEVERITY_LEVEL", (1, 2)),), "failing"),
+            ((("MART", ("CCSR",)), ("TEST_CATEGORY", ("validity",))), None),
+        ],
+        ids=["everything", "severity", "one mart"],
+    )
+    def test_counts_from_summaries(
+        self, monkeypatch, search_test_results, test_db_path, selections, status
+    ):
+        """Test that facet selections are counted without grouping test_results."""
+        conn = get_db_connection(test_db_path)
+        monkeypatch.setattr(search_service, "get_db_connection", lambda **kw: conn)
+        statements = []
+        conn.set_trace_callback(statements.append)
+        search_tests(selections=selections, status=status)
+        conn.set_trace_callback(None)
+
+        # Only the page of rows is read from test_results
+        reads = [sql for sql in statements if "FROM test_results" in sql]
+        assert len(reads) == 1
+        assert "GROUP BY" not in reads[0]
+        assert any("facet_summary" in sql for sql in statements)
@@ -1,10 +1,16 @@
 import pandas as pd
+import pytest
 
+from db import get_db_connection, register_marts
+from services import dqi_service
+from services.cache import cache_stats
 from services.dqi_service import (
     get_all_tests,
     get_available_charts,
     get_chart_data,
     get_chart_filter_values,
+    get_chart_info,
+    get_dashboard_snapshot,
     get_data_availability,
     get_data_from_test_results,
     get_data_quality_grade,
@@ -14,6 +20,9 @@ from services.dqi_service import (
     get_mart_tests,
     get_outstanding_errors,
     get_test_category_summary,
+    get_test_detail,
+    get_test_explorer_page,
+    get_test_result_summary,
     get_tests_completed_count,
 )
 
@@ -68,6 +77,29 @@ class TestGetChartData:
         result = get_chart_data("medical_paid_amount_vs_end_date_matrix", "2017-01-01")
         assert all(row["CHART_FILTER"] == "2017-01-01" for _, row in result.iterrows())
 
+    def test_returns_parsed_dates_in_order(
+        self, mock_get_db_connection, sample_chart_data
+    ):
+        """Test that get_chart_data returns the axis dates parsed and sorted."""
+        result = get_chart_data("medical_paid_amount_vs_end_date_matrix")
+        assert result["Y_AXIS"].tolist() == ["2017-09-01", "2017-12-01"]
+        assert result["Y_AXIS_DATE"].tolist() == [
+            pd.Timestamp("2017-09-01"),
+            pd.Timestamp("2017-12-01"),
+        ]
+        assert result["Y_AXIS_KIND"].iloc[0] == "date"
+
+    def test_caches_chart_until_data_changes(
+        self, managed_get_db_connection, sample_chart_data
+    ):
+        """Test that a chart is read once per data version."""
+        get_chart_data("medical_paid_amount_vs_end_date_matrix")
+        hits = cache_stats()["hits"]
+        result = get_chart_data("medical_paid_amount_vs_end_date_matrix")
+
+        assert cache_stats()["hits"] == hits + 1
+        assert not result.empty
+
     def test_returns_empty_for_nonexistent_chart(
         self, mock_get_db_connection, sample_chart_data
     ):
@@ -100,6 +132,21 @@ class TestGetChartFilterValues:
         assert len(result) == 0
 
 
+class TestGetChartInfo:
+    def test_returns_catalog_entry(self, mock_get_db_connection, sample_chart_data):
+        """Test that get_chart_info returns the chart's metadata and filters."""
+        result = get_chart_info("medical_paid_amount_vs_end_date_matrix")
+        assert result["FILTER_DESCRIPTION"] == "paid_year"
+        assert result["FILTER_VALUES"] == ["2017-01-01"]
+        assert result["ROW_COUNT"] == 2
+
+    def test_returns_none_for_nonexistent_chart(
+        self, mock_get_db_connection, sample_chart_data
+    ):
+        """Test that get_chart_info returns None for a chart not in the catalog."""
+        assert get_chart_info("nonexistent_chart") is None
+
+
 class TestGetDataFromTestResults:
     def test_returns_dataframe(self, mock_get_db_connection, sample_test_results):
         """Test that get_data_from_test_results returns a DataFrame."""
@@ -199,6 +246,40 @@ class TestGetDataQualityGrade:
         assert result == "A"
 
 
+class TestGetTestResultSummary:
+    def test_uses_a_single_query(
+        self, mock_get_db_connection, sample_test_results, test_db_connection
+    ):
+        """Test that the whole summary comes from one statement."""
+        statements = []
+        test_db_connection.set_trace_callback(statements.append)
+        get_test_result_summary()
+        assert len(statements) == 1
+
+    def test_counts_passing_and_failing(
+        self, mock_get_db_connection, sample_test_results, test_db_connection
+    ):
+        """Test that passing and failing counts ignore tests without a status."""
+        unique_ids = [row["UNIQUE_ID"] for row in sample_test_results]
+        test_db_connection.execute(
+            "UPDATE test_results SET STATUS = 'warn' WHERE UNIQUE_ID = ?",
+            (unique_ids[1],),
+        )
+        test_db_connection.execute(
+            "UPDATE test_results SET STATUS = NULL WHERE UNIQUE_ID = ?",
+            (unique_ids[2],),
+        )
+        test_db_connection.commit()
+
+        summary = get_test_result_summary()
+
+        assert summary["tests_completed"] == 3
+        assert summary["passing_count"] == 1
+        assert summary["failing_count"] == 1
+        assert summary["failures_by_severity"] == {3: 1}
+        assert summary["grade"] == "C"
+
+
 class TestGetTestsCompletedCount:
     def test_returns_integer(self, mock_get_db_connection, sample_test_results):
         """Test that get_tests_completed_count returns an integer."""
@@ -375,6 +456,151 @@ class TestGetDataAvailability:
         assert result["chart_data"] == 3  # We have 3 sample chart data points
 
 
+class TestGetTestExplorerPage:
+    def test_pages_through_failing_tests_in_order(
+        self, managed_get_db_connection, sample_test_results, test_db_connection
+    ):
+        """Test that pages hold consecutive failing tests and the total count."""
+        test_db_connection.execute("UPDATE test_results SET STATUS = 'fail'")
+        test_db_connection.commit()
+        errors = get_outstanding_errors()
+
+        pages = [
+            get_test_explorer_page(status="failing", page=page, page_size=2)
+            for page in (1, 2)
+        ]
+
+        assert [page["total"] for page in pages] == [3, 3]
+        assert [len(page["rows"]) for page in pages] == [2, 1]
+        paged_ids = [uid for page in pages for uid in page["rows"]["UNIQUE_ID"]]
+        assert paged_ids == list(errors["UNIQUE_ID"])
+        assert "TEST_RESULTS_QUERY" not in pages[0]["rows"].columns
+
+    def test_filters_and_sorts_in_sql(
+        self, managed_get_db_connection, sample_test_results, test_db_connection
+    ):
+        """Test that filters, marts and sort orders narrow and order the tests."""
+        test_db_connection.execute(
+            "INSERT INTO test_mart SELECT UNIQUE_ID, 'CCSR' FROM test_results"
+        )
+        test_db_connection.commit()
+
+        page = get_test_explorer_page(
+            mart="CCSR",
+            filters=(("TABLE_NAME", "contains", "ELIGIBILITY"),),
+        )
+        assert page["total"] == len(page["rows"]) > 0
+        assert page["rows"]["TABLE_NAME"].str.contains("eligibility", case=False).all()
+
+        page = get_test_explorer_page(
+            filters=(("SEVERITY_LEVEL", ">=", 1.0),),
+            sort_by=(("TABLE_NAME", "desc"),),
+        )
+        names = list(page["rows"]["TABLE_NAME"])
+        assert names == sorted(names, reverse=True)
+
+        assert get_test_explorer_page(mart="MISSING")["total"] == 0
+
+    def test_treats_like_wildcards_as_text(
+        self, mock_get_db_connection, sample_test_results
+    ):
+        """Test that a contains filter matches % and _ literally."""
+        page = get_test_explorer_page(filters=(("TABLE_NAME", "contains", "%"),))
+        assert page["total"] == 0
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"status": "stale"},
+            {"filters": (("TEST_RESULTS_QUERY", "=", "x"),)},
+            {"filters": (("TABLE_NAME", "LIKE", "x"),)},
+            {"sort_by": (("rowid; DROP TABLE test_results", "asc"),)},
+        ],
+    )
+    def test_rejects_unknown_columns_and_operators(
+        self, mock_get_db_connection, sample_test_results, kwargs
+    ):
+        """Test that anything outside the explorer columns and operators raises."""
+        with pytest.raises(ValueError):
+            get_test_explorer_page(**kwargs)
+
+
+class TestGetTestDetail:
+    def test_returns_one_test(
+        self, mock_get_db_connection, sample_test_results, test_db_connection
+    ):
+        """Test that get_test_detail returns the details of the requested test."""
+        unique_id = test_db_connection.execute(
+            "SELECT UNIQUE_ID FROM test_results ORDER BY UNIQUE_ID LIMIT 1"
+        ).fetchone()[0]
+
+        detail = get_test_detail(unique_id)
+
+        assert detail["UNIQUE_ID"] == unique_id
+        assert "TEST_RESULTS_QUERY" in detail
+        assert detail["MARTS"] == [("CMS_CHRONIC_CONDITIONS", "CMS Chronic Conditions")]
+
+    def test_lists_marts_without_flag_columns(
+        self, mock_get_db_connection, sample_test_results, test_db_connection
+    ):
+        """Test that a mart known only from the registry is listed, in order."""
+        unique_id = sample_test_results[0]["UNIQUE_ID"]
+        add_failing_new_mart(test_db_connection, unique_id)
+
+        detail = get_test_detail(unique_id)
+
+        assert [mart for mart, _ in detail["MARTS"]] == [
+            "CMS_CHRONIC_CONDITIONS",
+            "NEW_MART",
+        ]
+        assert detail["MARTS"][1][1] == "New Mart"
+
+    def test_returns_none_for_unknown_test(
+        self, mock_get_db_connection, sample_test_results
+    ):
+        """Test that get_test_detail returns None for a test that does not exist."""
+        assert get_test_detail("test.missing") is None
+
+
+class TestGetDashboardSnapshot:
+    def test_reads_every_panel(
+        self,
+        mock_get_db_connection,
+        sample_test_results,
+        sample_chart_data,
+        test_db_connection,
+    ):
+        """Test that the snapshot holds every figure the dashboard shows."""
+        test_db_connection.execute(
+            "UPDATE test_results SET STATUS = 'fail' WHERE SEVERITY_LEVEL = 1"
+        )
+        test_db_connection.commit()
+
+        snapshot = get_dashboard_snapshot()
+
+        assert snapshot.grade == "F"
+        assert snapshot.tests_completed == 3
+        assert snapshot.last_run == "2025-03-05 20:24:04"
+        assert snapshot.mart_statuses["CMS_CHRONIC_CONDITIONS"] == "fail"
+        assert len(snapshot.available_charts) == 2
+        assert snapshot.data_availability["chart_data"] == 3
+
+    def test_opens_one_connection_per_data_version(
+        self, monkeypatch, sample_test_results, test_db_path
+    ):
+        """Test that building a snapshot uses one connection and is cached."""
+        connections = []
+
+        def counting_connection(**kwargs):
+            connections.append(kwargs)
+            return get_db_connection(test_db_path, **kwargs)
+
+        monkeypatch.setattr(dqi_service, "get_db_connection", counting_connection)
+        get_dashboard_snapshot()
+        get_dashboard_snapshot()
+        assert len(connections) == 1
+
+
 class TestGetAllTests:
     def test_returns_dataframe(self, mock_get_db_connection, sample_test_results):
         """Test that get_all_tests returns a DataFrame."""
@@ -403,6 +629,18 @@ class TestGetAllTests:
         assert result.iloc[0]["STATUS"] == "fail"
 
 
+def add_failing_new_mart(conn, unique_id: str) -> None:
+    """Register a mart the schema has no flag column for, with one failing test."""
+    register_marts(conn, ["NEW_MART"])
+    conn.execute(
+        "INSERT INTO test_mart (UNIQUE_ID, MART) VALUES (?, 'NEW_MART')", (unique_id,)
+    )
+    conn.execute(
+        "UPDATE test_results SET STATUS = 'fail' WHERE UNIQUE_ID = ?", (unique_id,)
+    )
+    conn.commit()
+
+
 class TestGetMartTestSummary:
     def test_returns_list(self, mock_get_db_connection, sample_test_results):
         """Test that get_mart_test_summary returns a list."""
@@ -449,6 +687,34 @@ class TestGetMartTestSummary:
         ]
         assert all(all(field in mart for field in expected_fields) for mart in result)
 
+    def test_counts_tests_per_mart(self, mock_get_db_connection, sample_test_results):
+        """Test that each mart counts the tests linked to it in test_mart."""
+        result = {mart["mart"]: mart for mart in get_mart_test_summary()}
+        assert result["CMS_CHRONIC_CONDITIONS"]["total_tests"] == 2
+        assert result["CMS_HCCS"]["total_tests"] == 1
+        assert result["CCSR"]["total_tests"] == 0
+        assert result["CCSR"]["status"] == "Usable"
+
+    def test_includes_newly_registered_mart(
+        self, mock_get_db_connection, sample_test_results, test_db_connection
+    ):
+        """Test that a mart added to the registry is summarized without code changes."""
+        add_failing_new_mart(test_db_connection, sample_test_results[1]["UNIQUE_ID"])
+
+        result = get_mart_test_summary()
+
+        assert result[-1]["mart"] == "NEW_MART"
+        assert result[-1]["display_name"] == "New Mart"
+        assert result[-1]["sev3_fails"] == 1
+        assert result[-1]["status"] == "Use with Caution"
+
+    def test_new_mart_gets_a_status(
+        self, mock_get_db_connection, sample_test_results, test_db_connection
+    ):
+        """Test that the mart statuses cover marts added to the registry."""
+        add_failing_new_mart(test_db_connection, sample_test_results[1]["UNIQUE_ID"])
+        assert get_mart_statuses()["NEW_MART"] == "warn"
+
 
 class TestGetTestCategorySummary:
     def test_returns_dataframe(self, mock_get_db_connection, sample_test_results):
@@ -527,3 +793,132 @@ class TestGetMartTests:
         result = get_mart_tests("NONEXISTENT_MART")
         assert isinstance(result, pd.DataFrame)
         assert result.empty
+
+
+class TestQueryPlans:
+    # get_all_tests and get_data_from_test_results read every row by design
+    # and are left out
+    SERVICE_CALLS = [
+        ("get_chart_data", lambda: get_chart_data("chart", "filter")),
+        ("get_chart_info", lambda: get_chart_info("chart")),
+        ("get_mart_tests", lambda: get_mart_tests("CCSR")),
+        ("get_mart_tests", lambda: get_mart_tests("CCSR", status="pass")),
+        ("get_outstanding_errors", get_outstanding_errors),
+        (
+            "get_test_explorer_page",
+            lambda: get_test_explorer_page(status="failing", page=2),
+        ),
+        (
+            "get_test_explorer_page",
+            lambda: get_test_explorer_page(
+                status="passing", mart="CCSR", sort_by=(("SEVERITY_LEVEL", "desc"),)
+            ),
+        ),
+        (
+            "get_test_explorer_page",
+            lambda: get_test_explorer_page(
+                status="failing", filters=(("SEVERITY_LEVEL", "<=", 2.0),)
+            ),
+        ),
+        ("get_test_detail", lambda: get_test_detail("test.missing")),
+    ]
+
+    # Service tables whose query plans are checked
+    PLANNED_TABLES = ("test_results", "chart_data", "chart_catalog")
+
+    # Dashboard aggregates served from the summary tables and chart catalog
+    SUMMARY_CALLS = [
+        ("get_available_charts", get_available_charts),
+        ("get_chart_filter_values", lambda: get_chart_filter_values("chart")),
+        ("get_data_availability", get_data_availability),
+        ("get_last_test_run_time", get_last_test_run_time),
+        ("get_mart_test_summary", get_mart_test_summary),
+        ("get_test_category_summary", get_test_category_summary),
+        ("get_test_result_summary", get_test_result_summary),
+    ]
+
+    @staticmethod
+    def trace_statements(monkeypatch, test_db_path, call) -> list:
+        """Run a service call and return the SQL statements it executed."""
+        # A managed connection survives the services closing it
+        conn = get_db_connection(test_db_path)
+        monkeypatch.setattr(dqi_service, "get_db_connection", lambda **kwargs: conn)
+        statements = []
+        conn.set_trace_callback(statements.append)
+        call()
+        conn.set_trace_callback(None)
+        return statements
+
+    @staticmethod
+    def reads_whole_table(step: str, conn) -> bool:
+        """Check whether a query plan step visits every row of a service table.
+
+        Scans of a covering index, index searches on a constraint and scans of
+        a partial index all stay within a narrow or filtered set of rows.
+        """
+        words = step.split()
+        if len(words) < 2 or words[1] not in TestQueryPlans.PLANNED_TABLES:
+            return False
+        if "COVERING INDEX" in step or "?)" in step:
+            return False
+        partial_indexes = [
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND sql LIKE '%WHERE%'"
+            )
+        ]
+        return not any(step.endswith(f"INDEX {name}") for name in partial_indexes)
+
+    @pytest.mark.parametrize(
+        "call", [call for _, call in SERVICE_CALLS], ids=[n for n, _ in SERVICE_CALLS]
+    )
+    def test_service_queries_use_indexes(
+        self,
+        monkeypatch,
+        sample_test_results,
+        sample_chart_data,
+        test_db_path,
+        call,
+    ):
+        """Test that no service query falls back to a full table scan."""
+        conn = get_db_connection(test_db_path)
+        queries = [
+            sql
+            for sql in self.trace_statements(monkeypatch, test_db_path, call)
+            if sql.lstrip().upper().startswith("SELECT")
+            and any(table in sql for table in self.PLANNED_TABLES)
+        ]
+        assert queries
+        for sql in queries:
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            full_scans = [step for step in plan if self.reads_whole_table(step, conn)]
+            assert not full_scans, f"{sql}\n{plan}"
+
+    def test_chart_rows_arrive_in_index_order(
+        self, monkeypatch, sample_chart_data, test_db_path
+    ):
+        """Test that a filtered chart is read in axis order without a sort step."""
+        conn = get_db_connection(test_db_path)
+        (sql,) = self.trace_statements(
+            monkeypatch, test_db_path, lambda: get_chart_data("chart", "filter")
+        )
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        assert not [step for step in plan if "TEMP B-TREE" in step], plan
+
+    @pytest.mark.parametrize(
+        "call", [call for _, call in SUMMARY_CALLS], ids=[n for n, _ in SUMMARY_CALLS]
+    )
+    def test_aggregates_skip_raw_tables(
+        self,
+        monkeypatch,
+        sample_test_results,
+        sample_chart_data,
+        test_db_path,
+        call,
+    ):
+        """Test that dashboard aggregates never read test_results or chart_data."""
+        statements = self.trace_statements(monkeypatch, test_db_path, call)
+        assert statements
+        assert not [
+            sql for sql in statements if "test_results" in sql or "chart_data" in sql
+        ]